@@ -15,7 +15,6 @@ import streamlit as st
 import pandas as pd
 import uuid
 from datetime import datetime, timedelta, timezone
-from collections import defaultdict
 from supabase import create_client, Client
 import re
 import urllib.parse
@@ -25,19 +24,28 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.units import inch
 import io  # Added to fix 'name io is not defined' error
-from itertools import combinations
 from dateutil import parser
 import plotly.graph_objects as go # Added for the new chart
 import random
 from fpdf import FPDF
-import zipfile
 import io
+import hashlib
 from datetime import datetime
 import urllib.parse
-import requests
-from bookings import load_all_bookings, load_upcoming_bookings
+from backup import ImageCache, create_backup_zip, manifest_hash
+from bookings import clear_bookings_cache, load_all_bookings, load_upcoming_bookings
 from email_notification import send_email
+from ids import IdAllocator
 from locations import add_court, load_locations
+from tourney import BYE, Bracket, GroupStage, completed_results, result_grid, round_robin_schedule, schedule_by_court, seed_teams, unsaved_results
+from rankings import RankingAccumulator, compute_rankings, differs_only_by, filter_matches, player_index
+from ratings import EloRatings
+from pairing import balance_courts, booking_odds, doubles_pairings, performance_scores, recent_partner_pairs, singles_odds
+from scores import SCORE_COLUMNS, add_score_columns, tie_break_winner
+from match_index import MatchIndex
+from head_to_head import HeadToHead
+from nerd_stats import compute_nerd_stats
+from match_sync import MatchSync, batched, diff_matches, merge_snapshot, prepare_matches_for_save
 from util import handle_non_english_charcters
 
 
@@ -304,6 +312,13 @@ players_table_name = "players"
 matches_table_name = "matches"
 bookings_table_name = "bookings"
 
+# Table reads are cached process-wide and shared by every session. Every write path clears the
+# cache explicitly; the TTL only bounds how stale data edited outside the app can get.
+DATA_CACHE_TTL = 600  # seconds
+RANKING_CACHE_ENTRIES = 32  # (data version, filter) combinations kept by the ranking cache
+COMMUNITY_DAYS = 7  # Window of the Nerd Stuff community activity stats
+RANKING_VIEWS = [None, "Doubles", "Singles"]  # Ranking views kept up to date incrementally (None = combined)
+
 # --- Session state initialization ---
 if 'players_df' not in st.session_state:
     st.session_state.players_df = pd.DataFrame(columns=["name", "profile_image_url", "birthday"])
@@ -316,15 +331,87 @@ if 'bookings_df' not in st.session_state:
     st.session_state.bookings_df = pd.DataFrame(columns=["booking_id", "date", "time", "match_type", "court_name", "player1", "player2", "player3", "player4", "screenshot_url"])
 
 # --- Functions ---
+def data_version(df):
+    """Returns a short digest of a DataFrame's contents, used to key caches to the data they were built from."""
+    hashed = pd.util.hash_pandas_object(df.astype(str), index=False)
+    digest = hashlib.sha1(",".join(map(str, df.columns)).encode())
+    digest.update(hashed.values.tobytes())
+    return digest.hexdigest()[:16]
+
+@st.cache_data(ttl=DATA_CACHE_TTL, show_spinner=False)
+def fetch_players_table():
+    response = supabase.table(players_table_name).select("name, profile_image_url, birthday").execute()
+    return pd.DataFrame(response.data)
+
+@st.cache_resource
+def get_match_sync():
+    """Process-wide incremental copy of the matches table, shared by every session."""
+    return MatchSync(supabase, matches_table_name)
+
+@st.cache_data(ttl=DATA_CACHE_TTL, show_spinner=False)
+def fetch_matches_table():
+    # After a write or TTL expiry this only pulls rows changed since the last sync.
+    # Set scores are parsed here once per data version rather than on every rerun.
+    return add_score_columns(get_match_sync().sync())
+
+@st.cache_data(ttl=DATA_CACHE_TTL, show_spinner=False)
+def fetch_bookings_table():
+    response = supabase.table(bookings_table_name).select("*").execute()
+    return pd.DataFrame(response.data)
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def cached_player_index(players_version, _players_df):
+    return player_index(_players_df)
+
+def get_player_index():
+    """Name -> player row dict for the loaded players, built once per players data version."""
+    return cached_player_index(st.session_state.get("players_version", ""), st.session_state.players_df)
+
+@st.cache_resource(max_entries=2)
+def cached_match_index(matches_version, _matches_df):
+    return MatchIndex(_matches_df)
+
+def get_match_index():
+    """Integer-coded index of the loaded matches, built once per matches data version and shared read-only."""
+    return cached_match_index(st.session_state.get("matches_version", ""), st.session_state.matches_df)
+
+@st.cache_resource(max_entries=2)
+def cached_match_id_allocator(matches_version, _matches_df):
+    return IdAllocator(_matches_df, "match_id", "KR", "AR")
+
+def get_match_id_allocator():
+    """Per-quarter match id counters for the loaded matches, built once per matches data version and
+    shared, so ids handed out to one session are never handed out again."""
+    return cached_match_id_allocator(st.session_state.get("matches_version", ""), st.session_state.matches_df)
+
+@st.cache_resource(max_entries=2)
+def cached_head_to_head(matches_version, _match_index):
+    return HeadToHead(_match_index)
+
+def get_head_to_head():
+    """Head-to-head matrices of the loaded matches, built from the shared match index once per
+    matches data version and shared read-only."""
+    return cached_head_to_head(st.session_state.get("matches_version", ""), get_match_index())
+
+def invalidate_table_cache(table_name):
+    """Drops the shared cache for a table after a write so every session reloads fresh rows."""
+    if table_name == players_table_name:
+        fetch_players_table.clear()
+    elif table_name == matches_table_name:
+        fetch_matches_table.clear()
+    elif table_name == bookings_table_name:
+        fetch_bookings_table.clear()
+        clear_bookings_cache()
+
 def load_players():
     try:
-        response = supabase.table(players_table_name).select("name, profile_image_url, birthday").execute()
-        df = pd.DataFrame(response.data)
+        df = fetch_players_table()
         expected_columns = ["name", "profile_image_url", "birthday"]
         for col in expected_columns:
             if col not in df.columns:
                 df[col] = ""
         st.session_state.players_df = df
+        st.session_state.players_version = data_version(df)
     except Exception as e:
         st.error(f"Error loading players: {str(e)}")
 
@@ -339,6 +426,8 @@ def save_players(players_df):
         supabase.table(players_table_name).upsert(players_df_to_save.to_dict("records")).execute()
     except Exception as e:
         st.error(f"Error saving players: {str(e)}")
+    finally:
+        invalidate_table_cache(players_table_name)
       
 def delete_player_from_db(player_name):
     try:
@@ -346,6 +435,8 @@ def delete_player_from_db(player_name):
         send_email(NOTIFICATION, f"player deleted:{player_name}")
     except Exception as e:
         st.error(f"Error deleting player from database: {str(e)}")
+    finally:
+        invalidate_table_cache(players_table_name)
 
 def generate_pdf_reportlab(rank_df_combined, rank_df_doubles, rank_df_singles):
     # Format the current date
@@ -436,48 +527,72 @@ def generate_pdf_reportlab(rank_df_combined, rank_df_doubles, rank_df_singles):
     return pdf_data
   
 
+@st.cache_resource(max_entries=2)
+def shared_matches_frame(matches_version, _matches_df):
+    """The loaded matches of one data version, held once per process.
+
+    Every session on that version keeps a reference instead of its own copy, so the frame is
+    read-only: views derive filtered frames or copies, and writes build a new frame to save.
+    """
+    return _matches_df
+
+@st.cache_resource(max_entries=2)
+def shared_matches_snapshot(matches_version, _matches_df):
+    return prepare_matches_for_save(_matches_df)[0]
+
 def load_matches():
     try:
-        response = supabase.table(matches_table_name).select("*").execute()
-        df = pd.DataFrame(response.data)
+        df = fetch_matches_table()
         expected_columns = ["match_id", "date", "match_type", "team1_player1", "team1_player2", "team2_player1", "team2_player2", "set1", "set2", "set3", "winner", "match_image_url"]
         for col in expected_columns:
             if col not in df.columns:
                 df[col] = ""
-        st.session_state.matches_df = df
+        st.session_state.matches_version = data_version(df)
+        st.session_state.matches_df = shared_matches_frame(st.session_state.matches_version, df)
     except Exception as e:
         st.error(f"Error loading matches: {str(e)}")
+        return
+    # Snapshot of what the database holds, so save_matches can send only the rows that changed
+    try:
+        st.session_state.matches_snapshot = shared_matches_snapshot(st.session_state.matches_version, st.session_state.matches_df)
+    except Exception:
+        st.session_state.matches_snapshot = None
 
 def save_matches(df):
-    try:
-        df_to_save = df.copy()
-        if 'date' in df_to_save.columns:
-            df_to_save['date'] = pd.to_datetime(df_to_save['date'], errors='coerce')
-            df_to_save = df_to_save.dropna(subset=['date'])
-            df_to_save['date'] = df_to_save['date'].dt.strftime('%Y-%m-%d %H:%M:%S')
-        
-        duplicates = df_to_save[df_to_save.duplicated(subset=['match_id'], keep=False)]
-        if not duplicates.empty:
-            st.warning(f"Found duplicate match_id values: {duplicates['match_id'].tolist()}")
-            df_to_save = df_to_save.drop_duplicates(subset=['match_id'], keep='last')
+    """Upserts only the matches inserted or edited since the last load, in batches.
 
-        # Replace NaN with None for JSON compliance before saving
-        df_to_save = df_to_save.where(pd.notna(df_to_save), None)
-            
-        supabase.table(matches_table_name).upsert(df_to_save.to_dict("records")).execute()
+    Never deletes: rows missing from df are left alone, deletes go through delete_match_from_db.
+    """
+    try:
+        df_to_save, duplicates = prepare_matches_for_save(df)
+        if duplicates:
+            st.warning(f"Found duplicate match_id values: {duplicates}")
+
+        snapshot = st.session_state.get("matches_snapshot")
+        changed = diff_matches(snapshot, df_to_save)
+        for records in batched(changed.to_dict("records")):
+            supabase.table(matches_table_name).upsert(records).execute()
+        st.session_state.matches_snapshot = merge_snapshot(snapshot, df_to_save)
     except Exception as e:
         st.error(f"Error saving matches: {str(e)}")
+    finally:
+        invalidate_table_cache(matches_table_name)
 
 def delete_match_from_db(match_id):
     try:
         temp_match_df = supabase.table(matches_table_name).select().eq("match_id", match_id).execute()
         supabase.table(matches_table_name).delete().eq("match_id", match_id).execute()
+        get_match_sync().forget(match_id)
         send_email(NOTIFICATION,f"match deleted:{match_id} winner:{temp_match_df.data[0]['winner']}")
         # Remove the match from session state
         st.session_state.matches_df = st.session_state.matches_df[st.session_state.matches_df["match_id"] != match_id].reset_index(drop=True)
-        save_matches(st.session_state.matches_df)  # Save to ensure consistency
+        snapshot = st.session_state.get("matches_snapshot")
+        if snapshot is not None:
+            st.session_state.matches_snapshot = snapshot[snapshot["match_id"] != match_id]
     except Exception as e:
         st.error(f"Error deleting match from database: {str(e)}")
+    finally:
+        invalidate_table_cache(matches_table_name)
 
 def upload_image_to_supabase(file, file_name, image_type="match"):
     try:
@@ -523,73 +638,11 @@ def tennis_scores():
 
 
 
-def download_image(url):
-    """Download image bytes from a public Supabase URL."""
-    try:
-        response = requests.get(url, timeout=10)
-        if response.status_code == 200:
-            return response.content
-    except Exception as e:
-        st.error(f"Failed to download {url}: {e}")
-    return None
-
-
-def get_quarter(month):
-    if 1 <= month <= 3:
-        return "Q1"
-    elif 4 <= month <= 6:
-        return "Q2"
-    elif 7 <= month <= 9:
-        return "Q3"
-    else:
-        return "Q4"
-
 def generate_match_id(matches_df, match_datetime):
-    year = match_datetime.year
-    quarter = get_quarter(match_datetime.month)
-    if not matches_df.empty and 'date' in matches_df.columns:
-        matches_df['date'] = pd.to_datetime(matches_df['date'], errors='coerce')
-        filtered_matches = matches_df[
-            (matches_df['date'].dt.year == year) &
-            (matches_df['date'].apply(lambda d: get_quarter(d.month) == quarter))
-        ]
-        serial_number = len(filtered_matches) + 1
-        new_id = f"KR{quarter}{year}-{serial_number:02d}"
-        # Ensure the ID is unique
-        while new_id in matches_df['match_id'].values:
-            serial_number += 1
-            new_id = f"AR{quarter}{year}-{serial_number:02d}"
-    else:
-        serial_number = 1
-        new_id = f"KR{quarter}{year}-{serial_number:02d}"
-    return new_id
-
-def get_player_trend(player, matches, max_matches=5):
-    player_matches = matches[
-        (matches['team1_player1'] == player) |
-        (matches['team1_player2'] == player) |
-        (matches['team2_player1'] == player) |
-        (matches['team2_player2'] == player)
-    ].copy()
-    player_matches['date'] = pd.to_datetime(player_matches['date'], errors='coerce')
-    player_matches = player_matches.sort_values(by='date', ascending=False)
-    trend = []
-    for _, row in player_matches.head(max_matches).iterrows():
-        if row['match_type'] == 'Doubles':
-            team1 = [row['team1_player1'], row['team1_player2']]
-            team2 = [row['team2_player1'], row['team2_player2']]
-        else:
-            team1 = [row['team1_player1']]
-            team2 = [row['team2_player1']]
-        if player in team1 and row['winner'] == 'Team 1':
-            trend.append('W')
-        elif player in team2 and row['winner'] == 'Team 2':
-            trend.append('W')
-        elif row['winner'] != 'Tie':
-            trend.append('L')
-    return ' '.join(trend) if trend else 'No recent matches'
-
-def display_player_insights(selected_players, players_df, matches_df, rank_df, partner_stats, key_prefix=""):
+    """A new match id for a one-off frame; the loaded matches use get_match_id_allocator() instead."""
+    return IdAllocator(matches_df, "match_id", "KR", "AR").allocate(match_datetime)[0]
+
+def display_player_insights(selected_players, rank_df, partner_stats, match_type=None, key_prefix=""):
     # If selected_players is a single string, convert to a list for uniform handling
     if isinstance(selected_players, str):
         selected_players = [selected_players] if selected_players else []
@@ -607,8 +660,9 @@ def display_player_insights(selected_players, players_df, matches_df, rank_df, p
     if view_option == "Birthdays":
         # ... (Birthday view code remains unchanged)
         birthday_data = []
+        players_by_name = get_player_index()
         for player in selected_players:
-            player_info = players_df[players_df["name"] == player].iloc[0] if player in players_df["name"].values else None
+            player_info = players_by_name.get(player)
             if player_info is None:
                 continue
             birthday = player_info.get("birthday", "")
@@ -669,19 +723,25 @@ def display_player_insights(selected_players, players_df, matches_df, rank_df, p
         st.markdown('<div class="rankings-table-container">', unsafe_allow_html=True)
         st.markdown('<div class="rankings-table-scroll">', unsafe_allow_html=True)
 
+        players_by_name = get_player_index()
+        match_index = get_match_index()
+        # In a Doubles or Singles view only that format's matches are counted
+        doubles_rows = match_index.type_mask('Doubles') & (match_type in (None, 'Doubles'))
+        singles_rows = match_index.type_mask('Singles') & (match_type in (None, 'Singles'))
+        # Each player's matches are a slice of the shared participation index
         for selected_player in active_players:
-            player_info = players_df[players_df["name"] == selected_player].iloc[0] if selected_player in players_df["name"].values else None
+            player_info = players_by_name.get(selected_player)
             if player_info is None:
                 continue
             birthday = player_info.get("birthday", "Not set")
             profile_image = player_info.get("profile_image_url", "")
-            trend = get_player_trend(selected_player, matches_df)
 
             profile_html = f'<a href="{profile_image}" target="_blank"><img src="{profile_image}" class="profile-image" alt="Profile"></a>' if profile_image else ''
 
             player_styled = f"<span style='font-weight:bold; color:#fff500;'>{selected_player}</span>"
 
             player_data = rank_df[rank_df["Player"] == selected_player].iloc[0]
+            trend = player_data["Recent Trend"]  # rank_df is computed for the same match_type
             rank = player_data["Rank"]
             points = player_data["Points"]
             win_percent = player_data["Win %"]
@@ -693,14 +753,9 @@ def display_player_insights(selected_players, players_df, matches_df, rank_df, p
             games_won = int(player_data["Games Won"])
 
             # --- START: New calculation for D/S matches ---
-            player_matches_df = matches_df[
-                (matches_df['team1_player1'] == selected_player) |
-                (matches_df['team1_player2'] == selected_player) |
-                (matches_df['team2_player1'] == selected_player) |
-                (matches_df['team2_player2'] == selected_player)
-            ]
-            doubles_count = player_matches_df[player_matches_df['match_type'] == 'Doubles'].shape[0]
-            singles_count = player_matches_df[player_matches_df['match_type'] == 'Singles'].shape[0]
+            played = match_index.positions_for(selected_player)
+            doubles_count = int(doubles_rows[played].sum())
+            singles_count = int(singles_rows[played].sum())
             # --- END: New calculation for D/S matches ---
 
             # Partners and most effective partner, excluding "Visitor"
@@ -767,220 +822,82 @@ def display_player_insights(selected_players, players_df, matches_df, rank_df, p
         st.markdown('</div>', unsafe_allow_html=True)
 
 
-def calculate_rankings(matches_to_rank):
-    scores = defaultdict(float)
-    wins = defaultdict(int)
-    losses = defaultdict(int)
-    matches_played = defaultdict(int)
-    singles_matches = defaultdict(int) # Added
-    doubles_matches = defaultdict(int) # Added
-    games_won = defaultdict(int)
-    game_diff = defaultdict(float)
-    cumulative_game_diff = defaultdict(int) # New: For cumulative game difference
-    partner_stats = defaultdict(lambda: defaultdict(lambda: {'wins': 0, 'losses': 0, 'ties': 0, 'matches': 0, 'game_diff_sum': 0}))
-
-    for _, row in matches_to_rank.iterrows():
-        match_type = row['match_type'] # Added
-        
-        if match_type == 'Doubles':
-            t1 = [row['team1_player1'], row['team1_player2']]
-            t2 = [row['team2_player1'], row['team2_player2']]
-        else:
-            t1 = [row['team1_player1']]
-            t2 = [row['team2_player1']]
-
-        team1_total_games = 0
-        team2_total_games = 0
-        match_gd_sum = 0
-        set_count = 0
-        for set_score in [row['set1'], row['set2'], row['set3']]:
-            if set_score and ('-' in set_score or 'Tie Break' in set_score):
-                try:
-                    team1_games, team2_games = 0, 0
-                    is_tie_break = "Tie Break" in set_score
-                    
-                    if is_tie_break:
-                        # For tie breaks, the game score is always 7-6 or 6-7
-                        tie_break_scores = [int(s) for s in set_score.replace("Tie Break", "").strip().split('-')]
-                        if tie_break_scores[0] > tie_break_scores[1]:
-                            team1_games, team2_games = 7, 6
-                        else:
-                            team1_games, team2_games = 6, 7
-                    else:
-                        # Regular set scores
-                        team1_games, team2_games = map(int, set_score.split('-'))
-
-                    team1_total_games += team1_games
-                    team2_total_games += team2_games
-                    match_gd_sum += team1_games - team2_games
-                    set_count += 1
-
-                    # New: Calculate cumulative game difference for each player per set
-                    set_difference = team1_games - team2_games
-                    for p in t1:
-                        if p != "Visitor":
-                            games_won[p] += team1_games
-                            cumulative_game_diff[p] += set_difference
-                    for p in t2:
-                        if p != "Visitor":
-                            games_won[p] += team2_games
-                            cumulative_game_diff[p] -= set_difference
-
-                except ValueError:
-                    continue
-        match_gd_avg = match_gd_sum / set_count if set_count > 0 else 0
-
-        # Update individual player stats for non-Visitor players
-        if row["winner"] == "Team 1":
-            for p in t1:
-                if p != "Visitor":
-                    scores[p] += 3
-                    wins[p] += 1
-                    matches_played[p] += 1
-                    game_diff[p] += match_gd_avg
-                    if match_type == 'Doubles': doubles_matches[p] += 1 # Added
-                    else: singles_matches[p] += 1 # Added
-            for p in t2:
-                if p != "Visitor":
-                    scores[p] += 1
-                    losses[p] += 1
-                    matches_played[p] += 1
-                    game_diff[p] -= match_gd_avg
-                    if match_type == 'Doubles': doubles_matches[p] += 1 # Added
-                    else: singles_matches[p] += 1 # Added
-        elif row["winner"] == "Team 2":
-            for p in t2:
-                if p != "Visitor":
-                    scores[p] += 3
-                    wins[p] += 1
-                    matches_played[p] += 1
-                    game_diff[p] -= match_gd_avg
-                    if match_type == 'Doubles': doubles_matches[p] += 1 # Added
-                    else: singles_matches[p] += 1 # Added
-            for p in t1:
-                if p != "Visitor":
-                    scores[p] += 1
-                    losses[p] += 1
-                    matches_played[p] += 1
-                    game_diff[p] += match_gd_avg
-                    if match_type == 'Doubles': doubles_matches[p] += 1 # Added
-                    else: singles_matches[p] += 1 # Added
-        else:
-            # Tie
-            for p in t1 + t2:
-                if p != "Visitor":
-                    scores[p] += 1.5
-                    matches_played[p] += 1
-                    game_diff[p] += match_gd_avg if p in t1 else -match_gd_avg
-                    if match_type == 'Doubles': doubles_matches[p] += 1 # Added
-                    else: singles_matches[p] += 1 # Added
-
-        # Update partner stats for doubles matches
-        if row['match_type'] == 'Doubles':
-            for p1 in t1:
-                for p2 in t1:
-                    if p1 != p2 and p1 != "Visitor" and p2 != "Visitor":
-                        partner_stats[p1][p2]['matches'] += 1
-                        partner_stats[p1][p2]['game_diff_sum'] += match_gd_sum
-                        if row["winner"] == "Team 1":
-                            partner_stats[p1][p2]['wins'] += 1
-                        elif row["winner"] == "Team 2":
-                            partner_stats[p1][p2]['losses'] += 1
-                        else:
-                            partner_stats[p1][p2]['ties'] += 1
-            for p1 in t2:
-                for p2 in t2:
-                    if p1 != p2 and p1 != "Visitor" and p2 != "Visitor":
-                        partner_stats[p1][p2]['matches'] += 1
-                        partner_stats[p1][p2]['game_diff_sum'] -= match_gd_sum  # Reverse for losing team
-                        if row["winner"] == "Team 2":
-                            partner_stats[p1][p2]['wins'] += 1
-                        elif row["winner"] == "Team 1":
-                            partner_stats[p1][p2]['losses'] += 1
-                        else:
-                            partner_stats[p1][p2]['ties'] += 1
-
-    rank_data = []
-    players_df = st.session_state.players_df
-    for player in scores:
-        if player == "Visitor":
-            continue # Skip Visitor in rankings
-        win_percentage = (wins[player] / matches_played[player] * 100) if matches_played[player] > 0 else 0
-        game_diff_avg = (game_diff[player] / matches_played[player]) if matches_played[player] > 0 else 0
-        profile_image = players_df[players_df["name"] == player]["profile_image_url"].iloc[0] if player in players_df["name"].values else ""
-        player_trend = get_player_trend(player, matches_to_rank)
-        rank_data.append({
-            "Rank": f"🏆 {len(rank_data) + 1}",
-            "Profile": profile_image,
-            "Player": player,
-            "Points": scores[player],
-            "Win %": round(win_percentage, 2),
-            "Matches": matches_played[player],
-            "Doubles Matches": doubles_matches[player], # Added
-            "Singles Matches": singles_matches[player], # Added
-            "Wins": wins[player],
-            "Losses": losses[player],
-            "Games Won": games_won[player],
-            "Game Diff Avg": round(game_diff_avg, 2),
-            "Cumulative Game Diff": cumulative_game_diff[player], # New: Add to rank data
-            "Recent Trend": player_trend
-        })
-
-    rank_df = pd.DataFrame(rank_data)
-    if not rank_df.empty:
-        rank_df = rank_df.sort_values(
-            by=["Points", "Win %", "Game Diff Avg", "Games Won", "Player"],
-            ascending=[False, False, False, False, True]
-        ).reset_index(drop=True)
-        rank_df["Rank"] = [f"🏆 {i}" for i in range(1, len(rank_df) + 1)]
-    return rank_df, partner_stats
-
-def display_community_stats(matches_df):
+@st.cache_resource
+def get_ranking_accumulator(match_type):
+    """Process-wide ranking counters for one view (None = combined), updated match by match on writes."""
+    return RankingAccumulator(match_type)
+
+@st.cache_data(show_spinner=False, max_entries=RANKING_CACHE_ENTRIES)
+def cached_rankings(matches_version, players_version, match_type, date_window, _matches_df, _players_df):
+    """Rankings for one view, computed once per (data version, filter) and shared by every tab and session."""
+    if date_window is None:
+        # Full rebuild only when the counters are out of step; check, rebuild and read share the accumulator's lock
+        return get_ranking_accumulator(match_type).snapshot(_matches_df, _players_df, matches_version)
+    return compute_rankings(filter_matches(_matches_df, match_type, date_window), _players_df)
+
+def update_rankings(old_version, old_matches, removed=(), added_ids=()):
+    """After a write and reload, moves the ranking counters from old_version (the data in old_matches)
+    to the new data by retracting the removed rows and applying the reloaded rows of added_ids.
+
+    If the reload also picked up other sessions' writes, the counters are left stale and the next
+    read rebuilds them, since only our own rows would be applied. The counters themselves move by
+    O(1) work per changed match (under each engine's lock, via advance()), but confirming that the
+    reload differs only by our rows is one vectorized pass over the whole frame, so a write still
+    costs O(n) in the number of matches, on top of the O(n) reload itself. What it saves is the
+    per-view re-melt, groupby and Strength fit that a rebuild would do.
     """
-    Calculates and displays interesting community stats for the last 7 days.
-    """
-    #st.subheader("AR Tennis Community Interesting Facts (Last 7 Days)")
-
-    # Ensure the 'date' column is in datetime format
-    matches_df['date'] = pd.to_datetime(matches_df['date'], errors='coerce')
-
-    # Get the date 7 days ago from today
-    seven_days_ago = datetime.now() - pd.Timedelta(days=7)
-
-    # Filter matches from the last 7 days
-    recent_matches = matches_df[matches_df['date'] >= seven_days_ago]
+    new_version = st.session_state.get("matches_version", "")
+    if new_version == old_version:
+        return
+    matches_df = st.session_state.matches_df
+    if not differs_only_by(old_matches, matches_df, [row["match_id"] for row in removed], added_ids):
+        return
+    added = [row for _, row in matches_df[matches_df["match_id"].isin(added_ids)].iterrows()]
+    for match_type in RANKING_VIEWS:
+        get_ranking_accumulator(match_type).advance(old_version, new_version, removed, added)
+    get_elo_engine().advance(old_version, new_version, removed, added)  # Stays stale (and rebuilds on next read) for edits, deletes and back-dated matches
+
+@st.cache_resource
+def get_elo_engine():
+    """Process-wide Elo ratings, moved forward match by match when new matches are added."""
+    return EloRatings()
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def cached_elo_ratings(matches_version, _matches_df):
+    # The version check, any rebuild and the read all happen under the engine's lock
+    return get_elo_engine().snapshot(_matches_df, matches_version)
+
+def get_elo_ratings():
+    """(ratings table, per-match rating changes) of the loaded matches, as a snapshot taken once per
+    matches data version. The engine is replayed in full only when it is out of step with the data."""
+    return cached_elo_ratings(st.session_state.get("matches_version", ""), st.session_state.matches_df)
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def cached_nerd_stats(matches_version, players_version, community_since, _matches_df, _rank_df, _partner_stats, _match_index):
+    """All Nerd Stuff metrics, computed together once per data version (and community window)."""
+    return compute_nerd_stats(_matches_df, _rank_df, _partner_stats, _match_index, community_since)
+
+def calculate_rankings(match_type=None, date_window=None):
+    """Returns (rank_df, partner_stats) for the loaded matches, optionally limited to one match type and date window."""
+    return cached_rankings(
+        st.session_state.get("matches_version", ""), st.session_state.get("players_version", ""),
+        match_type, date_window, st.session_state.matches_df, st.session_state.players_df,
+    )
 
-    if recent_matches.empty:
-        st.info("No matches played in the last 7 days.")
+def display_community_stats(community):
+    """Displays the community stats for the last COMMUNITY_DAYS days (computed with the Nerd Stuff metrics)."""
+    if community["matches"] == 0:
+        st.info(f"No matches played in the last {COMMUNITY_DAYS} days.")
         return
 
-    # 1. Number of matches played in the last 7 days
-    num_matches = len(recent_matches)
-    st.metric("Matches Played", num_matches)
-
-    # 2. Number of active players in the last 7 days
-    player_columns = ['team1_player1', 'team1_player2', 'team2_player1', 'team2_player2']
-    active_players = pd.unique(recent_matches[player_columns].values.ravel('K'))
-    # Remove any potential 'None' or empty values
-    active_players = [player for player in active_players if pd.notna(player) and player != '']
-    num_active_players = len(active_players)
-    st.metric("Active Players", num_active_players)
-
-    # 4. Other interesting item: Top 5 players with the most wins in the last 7 days
-    st.markdown("##### Top 5 Winners (Last 7 Days)")
-    winners = []
-    for index, row in recent_matches.iterrows():
-        if row['winner'] == 'Team 1':
-            winners.extend([row['team1_player1'], row['team1_player2']])
-        elif row['winner'] == 'Team 2':
-            winners.extend([row['team2_player1'], row['team2_player2']])
-
-    winners = [w for w in winners if pd.notna(w) and w != '']
-    if winners:
-        win_counts = pd.Series(winners).value_counts().nlargest(5)
-        st.table(win_counts)
+    st.metric("Matches Played", community["matches"])
+    st.metric("Active Players", community["active_players"])
+
+    st.markdown(f"##### Top 5 Winners (Last {COMMUNITY_DAYS} Days)")
+    if not community["top_winners"].empty:
+        st.table(community["top_winners"])
     else:
-        st.info("No wins recorded in the last 7 days.")
+        st.info(f"No wins recorded in the last {COMMUNITY_DAYS} days.")
 
 # Chart --------------
 
@@ -1145,6 +1062,7 @@ def save_bookings(bookings_df):
             on_conflict="booking_id",
             returning="representation"
         ).execute()
+        invalidate_table_cache(bookings_table_name)
         st.write(f"Supabase save response: {response.data}")
         return response
     except Exception as e:
@@ -1154,10 +1072,8 @@ def save_bookings(bookings_df):
 
 
 def load_bookings():
-    load_upcoming_bookings()
     try:
-        response = supabase.table("bookings").select("*").execute()
-        df = pd.DataFrame(response.data)
+        df = fetch_bookings_table()
         expected_columns = ['booking_id', 'date', 'time', 'match_type', 'court_name',
                             'player1', 'player2', 'player3', 'player4',
                             'standby_player', 'screenshot_url']
@@ -1189,6 +1105,8 @@ def load_bookings():
                     supabase.table("bookings").delete().eq("booking_id", row['booking_id']).execute()
                 except Exception as e:
                     st.error(f"Failed to delete expired booking {row['booking_id']}: {e}")
+            if not expired.empty:
+                invalidate_table_cache(bookings_table_name)
 
             # Keep only valid ones
             df = df[df['booking_datetime'].isnull() | (df['booking_datetime'] >= cutoff)]
@@ -1216,6 +1134,7 @@ def save_bookings(bookings_df):
             on_conflict="booking_id",
             returning="representation"
         ).execute()
+        invalidate_table_cache(bookings_table_name)
         return response
     except Exception as e:
         raise Exception(f"Supabase save failed: {str(e)}")
@@ -1223,93 +1142,43 @@ def save_bookings(bookings_df):
 
 
       
-def create_backup_zip(players_df, matches_df, bookings_df):
-    """Create a zip file with CSV tables + images from Supabase URLs."""
-    buffer = io.BytesIO()
-    with zipfile.ZipFile(buffer, "w") as zf:
-        # --- CSVs ---
-        zf.writestr("players.csv", players_df.to_csv(index=False))
-        zf.writestr("matches.csv", matches_df.to_csv(index=False))
-        zf.writestr("bookings.csv", bookings_df.to_csv(index=False))
-
-        # --- Profile images ---
-        for _, row in players_df.iterrows():
-            url = row.get("profile_image_url")
-            if url:
-                img_data = download_image(url)
-                if img_data:
-                    safe_name = re.sub(r'[^a-zA-Z0-9_-]', '_', row["name"])  # sanitize filename
-                    filename = f"profile_images/{safe_name}.jpg"
-                    zf.writestr(filename, img_data)
-
-        # --- Match images ---
-        for _, row in matches_df.iterrows():
-            url = row.get("match_image_url")
-            if url:
-                img_data = download_image(url)
-                if img_data:
-                    match_id = row.get("match_id", str(uuid.uuid4()))
-                    filename = f"match_images/{match_id}.jpg"
-                    zf.writestr(filename, img_data)
-
-    buffer.seek(0)
-    return buffer
+@st.cache_data(show_spinner="Preparing backup...", max_entries=2)
+def build_backup_archive(version, delta, _players_df, _matches_df, _bookings_df, _base_manifest=None):
+    """Builds the backup ZIP once per data version; later requests for the same version reuse the cached bytes.
 
+    For a delta the version must include the base manifest's hash, so a cached delta is only
+    reused while it was taken against the current full backup.
+    """
+    _matches_df = _matches_df.drop(columns=SCORE_COLUMNS, errors="ignore")
+    buffer, errors = create_backup_zip(_players_df, _matches_df, _bookings_df, delta=delta, base_manifest=_base_manifest)
+    return buffer.getvalue(), errors
 
 
 def generate_booking_id(bookings_df, booking_date):
-    year = booking_date.year
-    quarter = get_quarter(booking_date.month)
-    if not bookings_df.empty and 'date' in bookings_df.columns:
-        bookings_df['date'] = pd.to_datetime(bookings_df['date'], errors='coerce')
-        filtered_bookings = bookings_df[
-            (bookings_df['date'].dt.year == year) &
-            (bookings_df['date'].apply(lambda d: get_quarter(d.month) == quarter))
-        ]
-        serial_number = len(filtered_bookings) + 1
-        new_id = f"BK{quarter}{year}-{serial_number:02d}"
-        while new_id in bookings_df['booking_id'].values:
-            serial_number += 1
-            new_id = f"BK{quarter}{year}-{serial_number:02d}"
-    else:
-        serial_number = 1
-        new_id = f"BK{quarter}{year}-{serial_number:02d}"
-    return new_id
+    return IdAllocator(bookings_df, "booking_id", "BK").allocate(booking_date)[0]
 
 
 # ==============================================================================
 # START: NEW COMPLEX ODDS CALCULATION FUNCTIONS
 # ==============================================================================
 
-def _calculate_performance_score(player_stats, full_dataset):
-    """
-    Calculates a weighted performance score for a player based on normalized stats.
-    """
-    # Define weights for each component
-    w_wp = 0.50  # Win Percentage
-    w_agd = 0.35 # Average Game Difference
-    w_ef = 0.15  # Experience Factor (Matches Played)
-
-    # --- 1. Normalize Win Percentage (WP) ---
-    max_wp = full_dataset['Win %'].max()
-    wp_norm = player_stats['Win %'] / max_wp if max_wp > 0 else 0
-
-    # --- 2. Normalize Average Game Difference (AGD) ---
-    max_agd = full_dataset['Game Diff Avg'].max()
-    min_agd = full_dataset['Game Diff Avg'].min()
-    if max_agd == min_agd:
-        agd_norm = 0.5 # Avoid division by zero if all values are the same
-    else:
-        agd_norm = (player_stats['Game Diff Avg'] - min_agd) / (max_agd - min_agd)
+def style_doubles_pairing(team1, team2):
+    """Pairing text for two doubles teams, player names highlighted."""
+    t1p1_styled = f"<span style='font-weight:bold; color:#fff500;'>{team1[0]}</span>"
+    t1p2_styled = f"<span style='font-weight:bold; color:#fff500;'>{team1[1]}</span>"
+    t2p1_styled = f"<span style='font-weight:bold; color:#fff500;'>{team2[0]}</span>"
+    t2p2_styled = f"<span style='font-weight:bold; color:#fff500;'>{team2[1]}</span>"
+    return f"Team 1: {t1p1_styled} & {t1p2_styled} vs Team 2: {t2p1_styled} & {t2p2_styled}"
 
-    # --- 3. Normalize Experience Factor (EF) ---
-    max_matches = full_dataset['Matches'].max()
-    ef_norm = player_stats['Matches'] / max_matches if max_matches > 0 else 0
+@st.cache_data(show_spinner=False, max_entries=RANKING_CACHE_ENTRIES)
+def cached_performance_scores(matches_version, players_version, match_type, _rank_df):
+    """{player: performance score} for one ranking view, computed once per data version."""
+    return performance_scores(_rank_df)
 
-    # --- 4. Calculate Final Performance Score ---
-    performance_score = (w_wp * wp_norm) + (w_agd * agd_norm) + (w_ef * ef_norm)
-    
-    return performance_score
+def get_performance_scores(match_type, rank_df):
+    return cached_performance_scores(
+        st.session_state.get("matches_version", ""), st.session_state.get("players_version", ""), match_type, rank_df,
+    )
 
 def calculate_enhanced_doubles_odds(players, doubles_rank_df):
     """
@@ -1318,51 +1187,8 @@ def calculate_enhanced_doubles_odds(players, doubles_rank_df):
     if len(players) != 4 or "" in players or doubles_rank_df.empty:
         return ("Please select four players with doubles match history.", None, None)
 
-    player_scores = {}
-    for player in players:
-        player_data = doubles_rank_df[doubles_rank_df["Player"] == player]
-        if not player_data.empty:
-            # Calculate performance score for this player
-            player_scores[player] = _calculate_performance_score(player_data.iloc[0], doubles_rank_df)
-        else:
-            # Player has no doubles history, assign a baseline score (e.g., 0)
-            player_scores[player] = 0
-
-    # Find the most balanced pairing based on the new Performance Score
-    min_diff = float('inf')
-    best_pairing = None
-    
-    for team1_combo in combinations(players, 2):
-        team2_combo = tuple(p for p in players if p not in team1_combo)
-        
-        team1_score = sum(player_scores.get(p, 0) for p in team1_combo)
-        team2_score = sum(player_scores.get(p, 0) for p in team2_combo)
-        
-        diff = abs(team1_score - team2_score)
-        
-        if diff < min_diff:
-            min_diff = diff
-            best_pairing = (team1_combo, team2_combo)
-
-    if not best_pairing:
-        return ("Could not determine a balanced pairing.", None, None)
-
-    team1, team2 = best_pairing
-    team1_total_score = sum(player_scores.get(p, 0) for p in team1)
-    team2_total_score = sum(player_scores.get(p, 0) for p in team2)
-    total_match_score = team1_total_score + team2_total_score
-
-    team1_odds = (team1_total_score / total_match_score) * 100 if total_match_score > 0 else 50.0
-    team2_odds = (team2_total_score / total_match_score) * 100 if total_match_score > 0 else 50.0
-
-    # Styled output
-    t1p1_styled = f"<span style='font-weight:bold; color:#fff500;'>{team1[0]}</span>"
-    t1p2_styled = f"<span style='font-weight:bold; color:#fff500;'>{team1[1]}</span>"
-    t2p1_styled = f"<span style='font-weight:bold; color:#fff500;'>{team2[0]}</span>"
-    t2p2_styled = f"<span style='font-weight:bold; color:#fff500;'>{team2[1]}</span>"
-    pairing_text = f"Team 1: {t1p1_styled} & {t1p2_styled} vs Team 2: {t2p1_styled} & {t2p2_styled}"
-    
-    return (pairing_text, team1_odds, team2_odds)
+    team1, team2, team1_odds, team2_odds = doubles_pairings([list(players)], get_performance_scores("Doubles", doubles_rank_df))[0]
+    return (style_doubles_pairing(team1, team2), team1_odds, team2_odds)
 
 def calculate_enhanced_singles_odds(players, singles_rank_df):
     """
@@ -1371,22 +1197,7 @@ def calculate_enhanced_singles_odds(players, singles_rank_df):
     if len(players) != 2 or "" in players or singles_rank_df.empty:
         return (None, None)
 
-    player_scores = {}
-    for player in players:
-        player_data = singles_rank_df[singles_rank_df["Player"] == player]
-        if not player_data.empty:
-            player_scores[player] = _calculate_performance_score(player_data.iloc[0], singles_rank_df)
-        else:
-            player_scores[player] = 0
-
-    p1_score = player_scores.get(players[0], 0)
-    p2_score = player_scores.get(players[1], 0)
-    total_score = p1_score + p2_score
-
-    p1_odds = (p1_score / total_score) * 100 if total_score > 0 else 50.0
-    p2_odds = (p2_score / total_score) * 100 if total_score > 0 else 50.0
-
-    return (p1_odds, p2_odds)
+    return singles_odds([list(players)], get_performance_scores("Singles", singles_rank_df))[0]
 
 # ==============================================================================
 # UPDATED: Original functions now call the new enhanced versions
@@ -1416,6 +1227,7 @@ def delete_booking_from_db(booking_id):
         temp_df= supabase.table(bookings_table_name).select("*").eq("booking_id", booking_id).execute()
         # print(f"temp_df:{temp_df}")
         supabase.table(bookings_table_name).delete().eq("booking_id", booking_id).execute()
+        invalidate_table_cache(bookings_table_name)
         st.session_state.bookings_df = st.session_state.bookings_df[st.session_state.bookings_df["booking_id"] != booking_id].reset_index(drop=True)
         send_email(NOTIFICATION, f"booking deleted. court name:{temp_df.data[0]['court_name']} date:{temp_df.data[0]['date']} time:{temp_df.data[0]['time']}")
         save_bookings(st.session_state.bookings_df)
@@ -1426,10 +1238,11 @@ def display_rankings_table(rank_df, title):
     if rank_df.empty:
         st.info(f"No {title} ranking data available.")
         return
-    display_df = rank_df[["Rank", "Player", "Points", "Win %", "Matches", "Wins", "Losses", "Games Won", "Game Diff Avg", "Recent Trend"]].copy()
+    display_df = rank_df[["Rank", "Player", "Points", "Win %", "Matches", "Wins", "Losses", "Games Won", "Game Diff Avg", "Strength", "Recent Trend"]].copy()
     display_df["Points"] = display_df["Points"].map("{:.1f}".format)
     display_df["Win %"] = display_df["Win %"].map("{:.1f}%".format)
     display_df["Game Diff Avg"] = display_df["Game Diff Avg"].map("{:.2f}".format)
+    display_df["Strength"] = display_df["Strength"].map("{:+.2f}".format)
     display_df["Matches"] = display_df["Matches"].astype(int)
     display_df["Wins"] = display_df["Wins"].astype(int)
     display_df["Losses"] = display_df["Losses"].astype(int)
@@ -1493,14 +1306,13 @@ def generate_whatsapp_link(row):
 
     # Scores and date
     scores_list = []
-    for s in [row['set1'], row['set2'], row['set3']]:
+    for set_col in ['set1', 'set2', 'set3']:
+        s = row[set_col]
         if s:
-            if "Tie Break" in s:
-                tie_break_scores = s.replace("Tie Break", "").strip().split('-')
-                if int(tie_break_scores[0]) > int(tie_break_scores[1]):
-                    scores_list.append(f'*7-6({tie_break_scores[0]}:{tie_break_scores[1]})*')
-                else:
-                    scores_list.append(f'*6-7({tie_break_scores[0]}:{tie_break_scores[1]})*')
+            tb_winner = tie_break_winner(row, set_col)
+            if tb_winner:
+                tb_points = f"{row[f'{set_col}_tb_t1']}:{row[f'{set_col}_tb_t2']}"
+                scores_list.append(f'*7-6({tb_points})*' if tb_winner == 1 else f'*6-7({tb_points})*')
             else:
                 scores_list.append(f'*{s.replace("-", ":")}*')
                 
@@ -1577,6 +1389,9 @@ def display_birthday_message(birthday_players):
 load_players()
 load_matches()
 load_bookings()
+players_version = st.session_state.get("players_version", "")
+matches_version = st.session_state.get("matches_version", "")
+bookings_version = data_version(st.session_state.bookings_df)
 krakow_courts = load_locations().to_dict('records')
 # Check for and display birthday messages
 todays_birthdays = check_birthdays(st.session_state.players_df)
@@ -1591,12 +1406,16 @@ matches = st.session_state.matches_df
 players = sorted([p for p in players_df["name"].dropna().tolist() if p != "Visitor"]) if "name" in players_df.columns else []
 
 if not matches.empty and ("match_id" not in matches.columns or matches["match_id"].isnull().any()):
+    matches = matches.copy()  # The loaded frame is shared read-only
     matches['date'] = pd.to_datetime(matches['date'], errors='coerce')
-    for i in matches.index:
-        if pd.isna(matches.at[i, "match_id"]):
-            match_date_for_id = matches.at[i, "date"] if pd.notna(matches.at[i, "date"]) else datetime.now()
-            matches.at[i, "match_id"] = generate_match_id(matches, match_date_for_id)
+    missing_ids = matches["match_id"].isna() if "match_id" in matches.columns else pd.Series(True, index=matches.index)
+    # One scan for the counters, then one id per missing row
+    matches.loc[missing_ids, "match_id"] = IdAllocator(matches, "match_id", "KR", "AR").allocate_many(
+        matches.loc[missing_ids, "date"].fillna(pd.Timestamp(datetime.now()))
+    )
     save_matches(matches)
+    load_matches()
+    matches = st.session_state.matches_df
 
 st.image("krakow_tennis_league.jpeg", use_container_width=True)
 
@@ -1608,8 +1427,7 @@ with tabs[0]:
     st.header(f"Rankings as of {datetime.now().strftime('%d %b')}")
     ranking_type = st.radio("Select Ranking View", ["Combined", "Doubles", "Singles", "Nerd Stuff", "Table View"], horizontal=True, key="ranking_type_selector")
     if ranking_type == "Doubles":
-        filtered_matches = matches[matches['match_type'] == 'Doubles'].copy()
-        rank_df, partner_stats = calculate_rankings(filtered_matches)
+        rank_df, partner_stats = calculate_rankings("Doubles")
         #st.subheader(f"Rankings as of {datetime.now().strftime('%d/%m')}")
         st.markdown('<div class="rankings-table-container">', unsafe_allow_html=True)
         st.markdown('<div class="rankings-table-scroll">', unsafe_allow_html=True)
@@ -1643,12 +1461,11 @@ with tabs[0]:
         st.subheader("Player Insights")
         selected_player_rankings = st.selectbox("Select a player for insights", [""] + players, index=0, key="insights_player_rankings_doubles")
         if selected_player_rankings:
-            display_player_insights(selected_player_rankings, players_df, filtered_matches, rank_df, partner_stats, key_prefix="rankings_doubles_")
+            display_player_insights(selected_player_rankings, rank_df, partner_stats, match_type="Doubles", key_prefix="rankings_doubles_")
         else:
             st.info("Player insights will be available once a player is selected.")
     elif ranking_type == "Singles":
-        filtered_matches = matches[matches['match_type'] == 'Singles'].copy()
-        rank_df, partner_stats = calculate_rankings(filtered_matches)
+        rank_df, partner_stats = calculate_rankings("Singles")
         current_date_formatted = datetime.now().strftime("%d/%m")
         st.subheader(f"Rankings as of {current_date_formatted}")
         st.markdown('<div class="rankings-table-container">', unsafe_allow_html=True)
@@ -1683,31 +1500,24 @@ with tabs[0]:
         st.subheader("Player Insights")
         selected_player_rankings = st.selectbox("Select a player for insights", [""] + players, index=0, key="insights_player_rankings_singles")
         if selected_player_rankings:
-            display_player_insights(selected_player_rankings, players_df, filtered_matches, rank_df, partner_stats, key_prefix="rankings_singles_")
+            display_player_insights(selected_player_rankings, rank_df, partner_stats, match_type="Singles", key_prefix="rankings_singles_")
         else:
             st.info("Player insights will be available once a player is selected.")
     elif ranking_type == "Nerd Stuff":
         if matches.empty or players_df.empty:
             st.info("No match data available to generate interesting stats.")
         else:
-            rank_df, partner_stats = calculate_rankings(matches)
+            rank_df, partner_stats = calculate_rankings()
+            nerd_stats = cached_nerd_stats(
+                st.session_state.get("matches_version", ""), st.session_state.get("players_version", ""),
+                # The community window moves on the hour, so its stats are recomputed at most hourly
+                pd.Timestamp.now().floor("h") - pd.Timedelta(days=COMMUNITY_DAYS),
+                matches, rank_df, partner_stats, get_match_index(),
+            )
 
             # Most Effective Partnership
             st.markdown("### 🤝 Most Effective Partnership")
-            best_partner = None
-            max_value = -1
-            for player, partners in partner_stats.items():
-                if player == "Visitor":
-                    continue
-                for partner, stats in partners.items():
-                    if partner == "Visitor" or player < partner:  # Avoid double counting
-                        win_rate = stats['wins'] / stats['matches'] if stats['matches'] > 0 else 0
-                        avg_game_diff = stats['game_diff_sum'] / stats['matches'] if stats['matches'] > 0 else 0
-                        score = win_rate + (avg_game_diff / 10)  # Adjust weight of game diff
-                        if score > max_value:
-                            max_value = score
-                            best_partner = (player, partner, stats)
-
+            best_partner = nerd_stats["most_effective_partnership"]
             if best_partner:
                 p1, p2, stats = best_partner
                 p1_styled = f"<span style='font-weight:bold; color:#fff500;'>{p1}</span>"
@@ -1721,74 +1531,14 @@ with tabs[0]:
 
             # Best Player to Partner With
             st.markdown("### 🥇 Best Player to Partner With")
-            player_stats = defaultdict(lambda: {'wins': 0, 'gd_sum': 0, 'partners': set()})
-            for _, row in matches.iterrows():
-                if row['match_type'] == 'Doubles':
-                    t1 = [row['team1_player1'], row['team1_player2']]
-                    t2 = [row['team2_player1'], row['team2_player2']]
-
-                    match_gd_sum = 0
-                    set_count = 0
-                    for set_score in [row['set1'], row['set2'], row['set3']]:
-                        if set_score and '-' in set_score:
-                            try:
-                                team1_games, team2_games = map(int, set_score.split('-'))
-                                match_gd_sum += team1_games - team2_games
-                                set_count += 1
-                            except ValueError:
-                                continue
-
-                    if set_count > 0:
-                        if row["winner"] == "Team 1":
-                            for p in t1:
-                                if p != "Visitor":
-                                    player_stats[p]['wins'] += 1
-                                    player_stats[p]['gd_sum'] += match_gd_sum
-                                    for partner in t1:
-                                        if partner != p and partner != "Visitor":
-                                            player_stats[p]['partners'].add(partner)
-                        elif row["winner"] == "Team 2":
-                            for p in t2:
-                                if p != "Visitor":
-                                    player_stats[p]['wins'] += 1
-                                    player_stats[p]['gd_sum'] += match_gd_sum
-                                    for partner in t2:
-                                        if partner != p and partner != "Visitor":
-                                            player_stats[p]['partners'].add(partner)
-
-            if player_stats:
-                best_partner_candidate = None
-                max_score = -1
-
-                wins_list = [stats['wins'] for stats in player_stats.values()]
-                gd_list = [stats['gd_sum'] for stats in player_stats.values()]
-                partners_list = [len(stats['partners']) for stats in player_stats.values()]
-
-                max_wins = max(wins_list) if wins_list else 1
-                max_gd = max(gd_list) if gd_list else 1
-                max_partners = max(partners_list) if partners_list else 1
-
-                for player, stats in player_stats.items():
-                    # Normalize scores and create a composite score
-                    normalized_wins = stats['wins'] / max_wins
-                    normalized_gd = stats['gd_sum'] / max_gd
-                    normalized_partners = len(stats['partners']) / max_partners
-
-                    composite_score = normalized_wins + normalized_gd + normalized_partners
-
-                    if composite_score > max_score:
-                        max_score = composite_score
-                        best_partner_candidate = (player, stats)
-
-                if best_partner_candidate:
-                    player_name, stats = best_partner_candidate
-                    player_styled = f"<span style='font-weight:bold; color:#fff500;'>{player_name}</span>"
-                    st.markdown(f"The best player to partner with is {player_styled} based on their high number of wins, game difference sum, and variety of partners. They have:", unsafe_allow_html=True)
-                    st.markdown(f"- **Total Wins**: {stats['wins']}")
-                    st.markdown(f"- **Total Game Difference**: {stats['gd_sum']:.2f}")
-                    st.markdown(f"- **Unique Partners Played With**: {len(stats['partners'])}")
-                else:
-                    st.info("Not enough data to determine the best player to partner with.")
+            best_partner_candidate = nerd_stats["best_partner"]
+            if best_partner_candidate:
+                player_name, stats = best_partner_candidate
+                player_styled = f"<span style='font-weight:bold; color:#fff500;'>{player_name}</span>"
+                st.markdown(f"The best player to partner with is {player_styled} based on their high number of wins, game difference sum, and variety of partners. They have:", unsafe_allow_html=True)
+                st.markdown(f"- **Total Wins**: {stats['wins']}")
+                st.markdown(f"- **Total Game Difference**: {stats['gd_sum']:.2f}")
+                st.markdown(f"- **Unique Partners Played With**: {stats['partners']}")
             else:
                 st.info("No doubles matches have been recorded yet.")
 
@@ -1796,8 +1546,8 @@ with tabs[0]:
 
             # Most Frequent Player
             st.markdown("### 🏟️ Most Frequent Player")
-            if not rank_df.empty:
-                most_frequent_player = rank_df.sort_values(by="Matches", ascending=False).iloc[0]
+            most_frequent_player = nerd_stats["most_frequent_player"]
+            if most_frequent_player:
                 player_styled = f"<span style='font-weight:bold; color:#fff500;'>{most_frequent_player['Player']}</span>"
                 st.markdown(f"{player_styled} has played the most matches, with a total of **{int(most_frequent_player['Matches'])}** matches played.", unsafe_allow_html=True)
             else:
@@ -1807,26 +1557,8 @@ with tabs[0]:
 
             # Player with highest Game Difference
             st.markdown("### 📈 Player with highest Game Difference")
-            cumulative_game_diff = defaultdict(int)
-            for _, row in matches.iterrows():
-                t1 = [row['team1_player1'], row['team1_player2']] if row['match_type'] == 'Doubles' else [row['team1_player1']]
-                t2 = [row['team2_player1'], row['team2_player2']] if row['match_type'] == 'Doubles' else [row['team2_player1']]
-                for set_score in [row['set1'], row['set2'], row['set3']]:
-                    if set_score and '-' in set_score:
-                        try:
-                            team1_games, team2_games = map(int, set_score.split('-'))
-                            set_gd = team1_games - team2_games
-                            for p in t1:
-                                if p != "Visitor":
-                                    cumulative_game_diff[p] += set_gd
-                            for p in t2:
-                                if p != "Visitor":
-                                    cumulative_game_diff[p] -= set_gd
-                        except ValueError:
-                            continue
-
-            if cumulative_game_diff:
-                highest_gd_player, highest_gd_value = max(cumulative_game_diff.items(), key=lambda item: item[1])
+            if nerd_stats["highest_game_diff"]:
+                highest_gd_player, highest_gd_value = nerd_stats["highest_game_diff"]
                 player_styled = f"<span style='font-weight:bold; color:#fff500;'>{highest_gd_player}</span>"
                 st.markdown(f"{player_styled} has the highest cumulative game difference: <span style='font-weight:bold; color:#fff500;'>{highest_gd_value}</span>.", unsafe_allow_html=True)
             else:
@@ -1836,27 +1568,56 @@ with tabs[0]:
 
             # Player with the most wins
             st.markdown(f"### 👑 Player with the Most Wins")
-            most_wins_player = rank_df.sort_values(by="Wins", ascending=False).iloc[0]
-            player_styled = f"<span style='font-weight:bold; color:#fff500;'>{most_wins_player['Player']}</span>"
-            st.markdown(f"{player_styled} holds the record for most wins with **{int(most_wins_player['Wins'])}** wins.", unsafe_allow_html=True)
+            most_wins_player = nerd_stats["most_wins_player"]
+            if most_wins_player:
+                player_styled = f"<span style='font-weight:bold; color:#fff500;'>{most_wins_player['Player']}</span>"
+                st.markdown(f"{player_styled} holds the record for most wins with **{int(most_wins_player['Wins'])}** wins.", unsafe_allow_html=True)
+            else:
+                st.info("No match data available to determine the player with the most wins.")
 
             st.markdown("---") 
 
             # Player with the highest win percentage (minimum 5 matches)
             st.markdown(f"### 🔥 Highest Win Percentage (Min. 5 Matches)")
-            eligible_players = rank_df[rank_df['Matches'] >= 5].sort_values(by="Win %", ascending=False)
-            if not eligible_players.empty:
-                highest_win_percent_player = eligible_players.iloc[0]
+            highest_win_percent_player = nerd_stats["highest_win_percent_player"]
+            if highest_win_percent_player:
                 player_styled = f"<span style='font-weight:bold; color:#fff500;'>{highest_win_percent_player['Player']}</span>"
                 st.markdown(f"{player_styled} has the highest win percentage at **{highest_win_percent_player['Win %']:.2f}%**.", unsafe_allow_html=True)
             else:
                 st.info("No players have played enough matches to calculate a meaningful win percentage.")
 
+            st.markdown("---")
+            st.markdown("### 📈 Elo Ratings")
+            elo_table, elo_deltas = get_elo_ratings()
+            if elo_table.empty:
+                st.info("No rated matches yet.")
+            else:
+                st.dataframe(elo_table, hide_index=True, height=300)
+                elo_player = st.selectbox("Select a player to see their rating history:", [""] + sorted(elo_table["Player"]), key="elo_player_selector")
+                if elo_player:
+                    history = elo_deltas[elo_deltas["player"] == elo_player].iloc[::-1]
+                    st.dataframe(pd.DataFrame({
+                        "Date": pd.to_datetime(history["date"]).dt.strftime("%d %b %Y"),
+                        "Match": history["match_id"],
+                        "Rating Before": history["rating_before"].round(),
+                        "Change": history["delta"].round(1),
+                    }), hide_index=True, height=300)
+
+            st.markdown("---")
+            st.markdown("### ⚔️ Head-to-Head")
+            head_to_head = get_head_to_head()
+            h2h_player = st.selectbox("Select a player to see their rivals:", [""] + head_to_head.faced_players(), key="h2h_player_selector")
+            if h2h_player:
+                rivals = head_to_head.rivals(h2h_player)
+                if rivals.empty:
+                    st.info(f"No opponents recorded for {h2h_player}.")
+                else:
+                    st.dataframe(rivals, hide_index=True, height=300)
+
             st.markdown("---")
             st.markdown(f"### 🗓️ Community Activity : Last 7 Days ")    
 
-            if 'matches_df' in st.session_state and not st.session_state.matches_df.empty:
-                display_community_stats(st.session_state.matches_df)
+            display_community_stats(nerd_stats["community"])
 
             st.markdown("---")
             st.markdown("### 📊 Player Performance Overview")
@@ -1908,17 +1669,15 @@ with tabs[0]:
                 """)
     elif ranking_type == "Table View":
         # Calculate combined rankings
-        rank_df_combined, _ = calculate_rankings(matches)
+        rank_df_combined, _ = calculate_rankings()
         display_rankings_table(rank_df_combined, "Combined")
         
         # Calculate doubles rankings
-        doubles_matches = matches[matches['match_type'] == 'Doubles']
-        rank_df_doubles, _ = calculate_rankings(doubles_matches)
+        rank_df_doubles, _ = calculate_rankings("Doubles")
         display_rankings_table(rank_df_doubles, "Doubles")
         
         # Calculate singles rankings
-        singles_matches = matches[matches['match_type'] == 'Singles']
-        rank_df_singles, _ = calculate_rankings(singles_matches)
+        rank_df_singles, _ = calculate_rankings("Singles")
         display_rankings_table(rank_df_singles, "Singles")
         
         # Add PDF download button
@@ -1937,8 +1696,7 @@ with tabs[0]:
             except Exception as e:
                 st.error(f"Error generating PDF: {str(e)}")
     else:  # Combined view
-        filtered_matches = matches.copy()
-        rank_df, partner_stats = calculate_rankings(filtered_matches)
+        rank_df, partner_stats = calculate_rankings()
         current_date_formatted = datetime.now().strftime("%d/%m")
         #st.subheader(f"Rankings as of {current_date_formatted}")
 
@@ -2057,7 +1815,7 @@ with tabs[0]:
         st.subheader("Player Insights")
         selected_player_rankings = st.selectbox("Select a player for insights", [""] + players, index=0, key="insights_player_rankings_combined")
         if selected_player_rankings:
-            display_player_insights(selected_player_rankings, players_df, filtered_matches, rank_df, partner_stats, key_prefix="rankings_combined_")
+            display_player_insights(selected_player_rankings, rank_df, partner_stats, key_prefix="rankings_combined_")
         else:
             st.info("Player insights will be available once a player is selected.")
 
@@ -2103,7 +1861,7 @@ with tabs[1]:
                     st.error("Set 2 score is required for doubles matches.")
                 else:
                     new_match_date = datetime.now()
-                    match_id_new = generate_match_id(st.session_state.matches_df, new_match_date)
+                    match_id_new = get_match_id_allocator().allocate(new_match_date)[0]
                     image_url_new = ""
                     if match_image_new:
                         image_url_new = upload_image_to_supabase(match_image_new, match_id_new, image_type="match")
@@ -2122,9 +1880,12 @@ with tabs[1]:
                         "match_image_url": image_url_new
                     }
                     matches_to_save = pd.concat([st.session_state.matches_df, pd.DataFrame([new_match_entry])], ignore_index=True)
+                    old_matches_version = st.session_state.get("matches_version", "")
+                    old_matches = st.session_state.matches_df
                     save_matches(matches_to_save)
                     send_email(NOTIFICATION, f"New match created. date:{new_match_date} match ID:{match_id_new} match type:{match_type_new} players:{p1_new} {p2_new} {p3_new} {p4_new}")
                     load_matches()  # Reload data from DB
+                    update_rankings(old_matches_version, old_matches, added_ids=[match_id_new])
                     st.success("Match submitted.")
                     st.session_state.form_key_suffix += 1
                     st.rerun()
@@ -2141,20 +1902,13 @@ with tabs[1]:
         player_search = st.selectbox("Filter by Player", ["All Players"] + players, key="player_search_filter")
 
     # Start with a clean copy of the matches
-    filtered_matches = st.session_state.matches_df.copy()
-
-    # Apply type filter first
+    # A player's matches are a slice of the shared match index; only the selected rows are copied
+    filtered_matches = st.session_state.matches_df
+    if player_search != "All Players":
+        filtered_matches = filtered_matches.iloc[get_match_index().positions_for(player_search)]
     if match_filter != "All":
         filtered_matches = filtered_matches[filtered_matches["match_type"] == match_filter]
-
-    # Apply player search filter on the result
-    if player_search != "All Players":
-        filtered_matches = filtered_matches[
-            (filtered_matches['team1_player1'] == player_search) |
-            (filtered_matches['team1_player2'] == player_search) |
-            (filtered_matches['team2_player1'] == player_search) |
-            (filtered_matches['team2_player2'] == player_search)
-        ]
+    filtered_matches = filtered_matches.copy()
 
     # --- START: Robust Date Handling and Sorting ---
     if not filtered_matches.empty:
@@ -2207,14 +1961,12 @@ with tabs[1]:
 
     def format_match_scores_and_date(row):
         score_parts_plain = []
-        for s in [row['set1'], row['set2'], row['set3']]:
+        for set_col in ['set1', 'set2', 'set3']:
+            s = row[set_col]
             if s:
-                if "Tie Break" in s:
-                    tie_break_scores = s.replace("Tie Break", "").strip().split('-')
-                    if int(tie_break_scores[0]) > int(tie_break_scores[1]):
-                        score_parts_plain.append(f"7-6({s})")
-                    else:
-                        score_parts_plain.append(f"6-7({s})")
+                tb_winner = tie_break_winner(row, set_col)
+                if tb_winner:
+                    score_parts_plain.append(f"7-6({s})" if tb_winner == 1 else f"6-7({s})")
                 else:
                     score_parts_plain.append(s)
 
@@ -2333,7 +2085,11 @@ with tabs[1]:
                 if match_image_edit:
                     image_url_edit = upload_image_to_supabase(match_image_edit, selected_id, image_type="match")
                 combined_datetime = datetime.combine(date_edit, time_edit)
-                st.session_state.matches_df.loc[idx] = {
+                old_matches_version = st.session_state.get("matches_version", "")
+                old_matches = st.session_state.matches_df
+                old_match_row = old_matches.loc[idx]
+                edited_matches = old_matches.copy()  # The loaded frame is shared read-only, so edit a copy
+                edited_matches.loc[idx] = {
                     "match_id": selected_id,
                     "date": combined_datetime,
                     "match_type": match_type_edit,
@@ -2347,13 +2103,18 @@ with tabs[1]:
                     "winner": winner_edit,
                     "match_image_url": image_url_edit
                 }
-                save_matches(st.session_state.matches_df)
+                save_matches(edited_matches)
                 load_matches()
+                update_rankings(old_matches_version, old_matches, removed=[old_match_row], added_ids=[selected_id])
                 st.success("Match updated.")
                 st.rerun()
             if st.button("🗑️ Delete This Match", key=f"delete_match_{selected_id}"):
+                old_matches_version = st.session_state.get("matches_version", "")
+                old_matches = st.session_state.matches_df
+                old_match_row = old_matches.loc[idx].copy()
                 delete_match_from_db(selected_id)
                 load_matches()
+                update_rankings(old_matches_version, old_matches, removed=[old_match_row])
                 st.success("Match deleted.")
                 st.rerun()
 
@@ -2432,12 +2193,7 @@ with tabs[2]:
                             st.warning("The 'Visitor' player cannot be removed.")
                         else:
                             # Check for associated matches
-                            if st.session_state.matches_df[
-                                (st.session_state.matches_df["team1_player1"] == selected_player_manage) |
-                                (st.session_state.matches_df["team1_player2"] == selected_player_manage) |
-                                (st.session_state.matches_df["team2_player1"] == selected_player_manage) |
-                                (st.session_state.matches_df["team2_player2"] == selected_player_manage)
-                            ].shape[0] > 0:
+                            if len(get_match_index().positions_for(selected_player_manage)) > 0:
                                 st.warning(f"Cannot delete {selected_player_manage} because they have associated matches. Delete their matches first.")
                             else:
                                 delete_player_from_db(selected_player_manage)
@@ -2448,9 +2204,9 @@ with tabs[2]:
                                 st.rerun()
     st.markdown("---")
     st.header("Player Insights")
-    rank_df_combined, partner_stats_combined = calculate_rankings(st.session_state.matches_df)
+    rank_df_combined, partner_stats_combined = calculate_rankings()
     if players and not rank_df_combined.empty:
-        display_player_insights(players, st.session_state.players_df, st.session_state.matches_df, rank_df_combined, partner_stats_combined, key_prefix="profile_")
+        display_player_insights(players, rank_df_combined, partner_stats_combined, key_prefix="profile_")
     else:
         st.info("No players available for insights. Please add players above.")
 
@@ -2501,7 +2257,6 @@ with tabs[3]:
 
 
 with tabs[4]:
-    load_bookings()
     with st.expander("Add New Booking", expanded=False, icon="➡️"):
         st.subheader("Add New Booking")
         match_type = st.radio("Match Type", ["Doubles", "Singles"], index=0, key=f"new_booking_match_type_{st.session_state.form_key_suffix}")
@@ -2619,14 +2374,16 @@ with tabs[4]:
             # =====================================================================
             try:
                 # Calculate format-specific rankings for odds calculation
-                doubles_matches_df = st.session_state.matches_df[st.session_state.matches_df['match_type'] == 'Doubles']
-                singles_matches_df = st.session_state.matches_df[st.session_state.matches_df['match_type'] == 'Singles']
-                
-                doubles_rank_df, _ = calculate_rankings(doubles_matches_df)
-                singles_rank_df, _ = calculate_rankings(singles_matches_df)
+                doubles_rank_df, _ = calculate_rankings("Doubles")
+                singles_rank_df, _ = calculate_rankings("Singles")
+                # Pairings and odds for every upcoming booking in one batch
+                odds_by_booking = booking_odds(
+                    upcoming_bookings,
+                    get_performance_scores("Doubles", doubles_rank_df),
+                    get_performance_scores("Singles", singles_rank_df),
+                )
             except Exception as e:
-                doubles_rank_df = pd.DataFrame()
-                singles_rank_df = pd.DataFrame()
+                odds_by_booking = {}
                 st.warning(f"Unable to load rankings for pairing suggestions: {str(e)}")
             # =====================================================================
             # END: MODIFICATION FOR NEW ODDS CALCULATION
@@ -2665,7 +2422,11 @@ with tabs[4]:
                     # START: MODIFICATION FOR NEW ODDS CALCULATION
                     # =====================================================================
                     if row['match_type'] == "Doubles" and len(players) == 4:
-                        suggested_pairing, team1_odds, team2_odds = suggest_balanced_pairing(players, doubles_rank_df)
+                        if row.name in odds_by_booking:
+                            team1, team2, team1_odds, team2_odds = odds_by_booking[row.name]
+                            suggested_pairing = style_doubles_pairing(team1, team2)
+                        else:
+                            suggested_pairing, team1_odds, team2_odds = "Please select four players with doubles match history.", None, None
                         if team1_odds is not None and team2_odds is not None:
                             teams = suggested_pairing.split(' vs ')
                             team1_players = teams[0].replace('Team 1: ', '')
@@ -2683,7 +2444,7 @@ with tabs[4]:
                             )
                             plain_suggestion = f"\n*Suggested Pairing: {re.sub(r'<.*?>', '', suggested_pairing).replace('Suggested Pairing: ', '').strip()}*"
                     elif row['match_type'] == "Singles" and len(players) == 2:
-                        p1_odds, p2_odds = suggest_singles_odds(players, singles_rank_df)
+                        p1_odds, p2_odds = odds_by_booking.get(row.name, (None, None))
                         if p1_odds is not None:
                             p1_styled = f"<span style='font-weight:bold; color:#fff500;'>{players[0]}</span>"
                             p2_styled = f"<span style='font-weight:bold; color:#fff500;'>{players[1]}</span>"
@@ -2738,14 +2499,14 @@ with tabs[4]:
                     visuals_html += f'<a href="{screenshot_url}" target="_blank"><img src="{screenshot_url}" style="width:120px; margin-right:20px; cursor:pointer;" title="Click to view full-size"></a>'
                 visuals_html += '<div style="display: flex; flex-direction: row; align-items: center; flex-wrap: nowrap;">'
                 booking_players = [row['player1'], row['player2'], row['player3'], row['player4'], row.get('standby_player', '')]
-                players_df = st.session_state.players_df
+                players_by_name = get_player_index()
                 image_urls = []
                 placeholder_initials = []
                 for player_name in booking_players:
                     if player_name and isinstance(player_name, str) and player_name.strip() and player_name != "Visitor":
-                        player_data = players_df[players_df["name"] == player_name]
-                        if not player_data.empty:
-                            img_url = player_data.iloc[0].get("profile_image_url")
+                        player_data = players_by_name.get(player_name)
+                        if player_data is not None:
+                            img_url = player_data.get("profile_image_url")
                             if img_url and isinstance(img_url, str) and img_url.strip():
                                 image_urls.append((player_name, img_url))
                             else:
@@ -2975,10 +2736,87 @@ with tabs[4]:
 
 
 
+BRACKET_FORMATS = ["Knockout", "Groups + knockout"]
+
+def tourney_result_pairs(tournament_format):
+    """(team1, team2) of every tournament match that can have a result entered."""
+    if tournament_format == "Round robin":
+        return st.session_state.get("tourney_pairs") or []
+    pairs = []
+    groups = st.session_state.get("tourney_groups")
+    if tournament_format == "Groups + knockout" and groups:
+        pairs += [pair for group_matches in groups.matches for pair in group_matches]
+    bracket = st.session_state.get("tourney_bracket")
+    if tournament_format in BRACKET_FORMATS and bracket:
+        pairs += [bracket.teams(match) for _, round_matches in bracket.rounds() for match, *_ in round_matches if bracket.playable(match)]
+    return pairs
+
+def tourney_result_dates(tournament_format, pair_count):
+    """One datetime per result row: the scheduled start in a round robin, otherwise a minute apart in
+    playing order (groups, then knockout rounds) from when the tournament was organised."""
+    if tournament_format == "Round robin" and st.session_state.get("tourney_starts"):
+        return st.session_state.tourney_starts
+    started = st.session_state.get("tourney_started") or datetime.now().replace(second=0, microsecond=0)
+    return [started + timedelta(minutes=i) for i in range(pair_count)]
+
+def save_tourney_results(results):
+    """Adds a batch of tournament results to the matches table: ids from the shared allocator, then one save and one reload."""
+    results = results.copy()
+    results["date"] = pd.to_datetime(results["date"])
+    results["match_id"] = get_match_id_allocator().allocate_many(results["date"])
+    results["match_image_url"] = ""
+    old_matches_version = st.session_state.get("matches_version", "")
+    old_matches = st.session_state.matches_df
+    save_matches(pd.concat([old_matches, results], ignore_index=True))
+    send_email(NOTIFICATION, f"{len(results)} tournament matches added. match IDs:{', '.join(results['match_id'])}")
+    load_matches()
+    update_rankings(old_matches_version, old_matches, added_ids=results["match_id"].tolist())
+
+def display_group_stage(groups, key_prefix):
+    """Group tables and result pickers; each pick updates only that group's standings.
+    key_prefix is the draw's own id, so picks from an earlier tournament never come back."""
+    st.subheader("Groups")
+    cols = st.columns(min(len(groups.groups), 4))
+    for g, group_matches in enumerate(groups.matches):
+        with cols[g % len(cols)]:
+            st.markdown(f"**Group {chr(ord('A') + g)}**")
+            standings = groups.standings(g)
+            st.dataframe(pd.DataFrame({"Team": standings, "Wins": [groups.wins[t] for t in standings]}), hide_index=True)
+            for m, (team1, team2) in enumerate(group_matches):
+                current = groups.results.get((g, m))
+                winner = st.selectbox(f"{team1} vs {team2}", ["", team1, team2], index=[None, team1, team2].index(current),
+                                      key=f"{key_prefix}group_{g}_{m}")
+                if (winner or None) != current:
+                    groups.record(g, m, winner or None)
+                    st.rerun()
+
+def display_bracket(bracket, key_prefix):
+    """Knockout rounds with a winner picker per playable match; a pick only updates the path to the final.
+    key_prefix is the draw's own id, as for display_group_stage."""
+    st.subheader("Knockout")
+    rounds = bracket.rounds()
+    cols = st.columns(len(rounds))
+    for col, (round_name, round_matches) in zip(cols, rounds):
+        with col:
+            st.markdown(f"**{round_name}**")
+            for match, team1, team2, winner in round_matches:
+                if bracket.playable(match):
+                    picked = st.selectbox(f"{team1} vs {team2}", ["", team1, team2], index=[None, team1, team2].index(winner),
+                                          key=f"{key_prefix}bracket_{match}_{team1}_{team2}")
+                    if (picked or None) != winner:
+                        bracket.record(match, picked or None)
+                        st.rerun()
+                elif BYE in (team1, team2):
+                    st.markdown(f"{winner} — bye")
+                else:
+                    st.markdown(f"{team1 or 'TBD'} vs {team2 or 'TBD'}")
+    if bracket.champion:
+        st.success(f"🏆 Champion: {bracket.champion}")
+
 #--MINI TOURNEY -----------------------
 with tabs[5]:
     st.header("Mini Tournaments Organiser")
-    st.markdown("<small><i>Assignments of teams and courts are done randomly.</i></small>", unsafe_allow_html=True)
+    st.markdown("<small><i>Teams are assigned to courts randomly, or scheduled as a round robin with court rotation and start times.</i></small>", unsafe_allow_html=True)
 
     # Input fields
     st.subheader("Tournament Setup")
@@ -3003,9 +2841,12 @@ with tabs[5]:
             col = cols[i % len(cols)]
             with col:
                 name = st.text_input(f"Team {i+1} Name", key=f"team_{i}")
-                team_names.append(name if name else f"Team {i+1}")
+                team_names.append(name.strip() or f"Team {i+1}")
     else:
         team_names = [f"Team {i+1}" for i in range(num_teams)]
+    duplicate_teams = sorted({name for name in team_names if team_names.count(name) > 1})
+    if duplicate_teams:
+        st.error(f"Team names must be unique: {', '.join(duplicate_teams)} used more than once.")
 
     # Optional court names
     court_names = []
@@ -3020,28 +2861,63 @@ with tabs[5]:
     else:
         court_names = [f"Court {i+1}" for i in range(num_courts)]
 
+    tournament_format = st.radio("Format", ("Random court assignment", "Round robin", "Knockout", "Groups + knockout"), key="tournament_format")
+    if tournament_format == "Round robin":
+        rr_start = st.time_input("First match starts at", value=datetime.strptime("10:00", "%H:%M").time(), key="rr_start")
+        rr_slot_minutes = st.number_input("Minutes per match", min_value=5, value=30, step=5, key="rr_slot_minutes")
+    elif tournament_format == "Groups + knockout":
+        group_count = st.number_input("Number of groups", min_value=1, max_value=max(1, num_teams // 2), value=max(1, min(4, num_teams // 4)), step=1, key="group_count")
+        group_advance = st.number_input("Teams going through from each group", min_value=1, value=2, step=1, key="group_advance")
+    if tournament_format in BRACKET_FORMATS:
+        st.markdown("<small><i>Teams are seeded by the ranking points of the players named in them (e.g. <b>Anna & Ben</b>).</i></small>", unsafe_allow_html=True)
+
     # Optional tournament rules input
     rules = st.text_area("Enter Tournament Rules (optional, supports rich text)")
 
     if num_teams % 2 != 0:
-        st.warning("Number of teams is odd. Consider adding one more team for even distribution.")
-
-    if st.button("Organise Tournament"):
-        random.shuffle(team_names)
-
-        base = len(team_names) // num_courts
-        extras = len(team_names) % num_courts
-
-        courts = []
-        idx = 0
-        for i in range(num_courts):
-            num = base + (1 if i < extras else 0)
-            if num % 2 != 0:
-                if i < num_courts - 1:
-                    num += 1
-            court_teams = team_names[idx:idx+num]
-            courts.append((court_names[i], court_teams))
-            idx += num
+        if tournament_format == "Round robin":
+            st.info("Number of teams is odd: one team has a bye in each round.")
+        else:
+            st.warning("Number of teams is odd. Consider adding one more team for even distribution.")
+
+    organise_tournament = st.button("Organise Tournament", disabled=bool(duplicate_teams))
+    if organise_tournament:
+        st.session_state.tourney_id = uuid.uuid4().hex[:8]  # New draw, new widget keys
+        st.session_state.tourney_started = datetime.now().replace(second=0, microsecond=0)
+    if organise_tournament and tournament_format in BRACKET_FORMATS:
+        overall_rank_df, _ = calculate_rankings()
+        seeded_teams = seed_teams(team_names, overall_rank_df.set_index("Player")["Points"].to_dict() if not overall_rank_df.empty else {})
+        if tournament_format == "Knockout":
+            st.session_state.tourney_groups = None
+            st.session_state.tourney_bracket = Bracket(seeded_teams)
+        else:
+            st.session_state.tourney_groups = GroupStage(seeded_teams, int(group_count), int(group_advance))
+            st.session_state.tourney_bracket = None
+        st.session_state.tourney_bracket_qualifiers = None
+
+    if organise_tournament and tournament_format not in BRACKET_FORMATS:
+        if tournament_format == "Round robin":
+            # Every team plays every other once; courts and start times are assigned slot by slot
+            schedule, byes = round_robin_schedule(team_names, court_names, datetime.combine(datetime.now().date(), rr_start), int(rr_slot_minutes))
+            courts = schedule_by_court(schedule, court_names, byes)
+            st.session_state.tourney_pairs = list(zip(schedule["Team 1"], schedule["Team 2"]))
+            st.session_state.tourney_starts = list(schedule["Start"])
+        else:
+            random.shuffle(team_names)
+
+            base = len(team_names) // num_courts
+            extras = len(team_names) % num_courts
+
+            courts = []
+            idx = 0
+            for i in range(num_courts):
+                num = base + (1 if i < extras else 0)
+                if num % 2 != 0:
+                    if i < num_courts - 1:
+                        num += 1
+                court_teams = team_names[idx:idx+num]
+                courts.append((court_names[i], court_teams))
+                idx += num
 
         st.markdown("---")
         st.subheader("Court Assignments")
@@ -3075,6 +2951,12 @@ with tabs[5]:
                         unsafe_allow_html=True
                     )
 
+        if tournament_format == "Round robin":
+            st.subheader("Round Robin Schedule")
+            schedule_display = schedule.copy()
+            schedule_display["Start"] = schedule_display["Start"].map(lambda start: start.strftime("%H:%M"))
+            st.dataframe(schedule_display, hide_index=True, height=300)
+
         if rules:
             st.subheader("Tournament Rules")
             st.markdown(rules, unsafe_allow_html=True)
@@ -3114,8 +2996,89 @@ with tabs[5]:
             file_name=f"{tournament_name or 'tournament'}.pdf",
             mime='application/pdf'
         )
+
+    if tournament_format == "Groups + knockout" and st.session_state.get("tourney_groups"):
+        display_group_stage(st.session_state.tourney_groups, f"{st.session_state.tourney_id}_")
+        if st.session_state.tourney_groups.complete():
+            knockout = st.session_state.tourney_groups.knockout()
+            qualifiers = tuple(knockout.slots[knockout.size:])
+            if st.session_state.get("tourney_bracket_qualifiers") != qualifiers:  # Redrawn only if the qualifiers change
+                st.session_state.tourney_bracket = knockout
+                st.session_state.tourney_bracket_qualifiers = qualifiers
+                st.session_state.tourney_bracket_id = uuid.uuid4().hex[:8]
+        else:
+            st.info("The knockout draw is made once every group match has a winner.")
+    if tournament_format in BRACKET_FORMATS and st.session_state.get("tourney_bracket"):
+        display_bracket(st.session_state.tourney_bracket, f"{st.session_state.tourney_id}_{st.session_state.get('tourney_bracket_id', '')}_")
+
+    result_pairs = tourney_result_pairs(tournament_format)
+    if result_pairs:
+        st.markdown("---")
+        st.subheader("Enter Results")
+        st.markdown("<small><i>Fill in the matches that were played and save them together. Rows without a first set or a winner are skipped.</i></small>", unsafe_allow_html=True)
+        score_options = [""] + tennis_scores()
+        # A new key after every save starts an empty grid, so saved rows cannot be submitted again
+        results_key = f"tourney_results_{st.session_state.get('tourney_id', '')}_{st.session_state.get('tourney_results_saves', 0)}_{hashlib.md5(repr(result_pairs).encode()).hexdigest()}"
+        results_grid = st.data_editor(
+            result_grid(result_pairs, tourney_result_dates(tournament_format, len(result_pairs))),
+            column_config={
+                "date": st.column_config.DatetimeColumn("Date", format="DD MMM YYYY HH:mm"),
+                "match_type": st.column_config.SelectboxColumn("Type", options=["Doubles", "Singles"]),
+                "team1_player1": st.column_config.TextColumn("Team 1 - Player 1"),
+                "team1_player2": st.column_config.TextColumn("Team 1 - Player 2"),
+                "team2_player1": st.column_config.TextColumn("Team 2 - Player 1"),
+                "team2_player2": st.column_config.TextColumn("Team 2 - Player 2"),
+                "set1": st.column_config.SelectboxColumn("Set 1", options=score_options),
+                "set2": st.column_config.SelectboxColumn("Set 2", options=score_options),
+                "set3": st.column_config.SelectboxColumn("Set 3", options=score_options),
+                "winner": st.column_config.SelectboxColumn("Winner", options=["", "Team 1", "Team 2", "Tie"]),
+            },
+            hide_index=True,
+            num_rows="dynamic",
+            key=results_key,
+        )
+        if st.button("Save All Results", key="save_tourney_results"):
+            results, errors = completed_results(results_grid, set(players))
+            for error in errors:
+                st.error(error)
+            if not errors and results.empty:
+                st.info("No results entered yet.")
+            elif not errors:
+                new_results = unsaved_results(results, st.session_state.matches_df)
+                if new_results.empty:
+                    st.info("These results are already saved.")
+                else:
+                    save_tourney_results(new_results)
+                    st.session_state.pop(results_key, None)
+                    st.session_state.tourney_results_saves = st.session_state.get("tourney_results_saves", 0) + 1
+                    skipped = len(results) - len(new_results)
+                    st.success(f"{len(new_results)} match results saved." + (f" {skipped} already saved were skipped." if skipped else ""))
+                    st.rerun()
         #----MINI TOURNEY-------
 
+    st.markdown("---")
+    st.subheader("Balanced Courts")
+    st.markdown("<small><i>Splits the players present into doubles courts with evenly matched teams, based on doubles performance.</i></small>", unsafe_allow_html=True)
+    available_players = st.multiselect(
+        "Players present (in arrival order; the last ones sit out if courts are full)",
+        sorted(name for name in st.session_state.players_df["name"].dropna() if name != "Visitor"),
+        key="balanced_courts_players",
+    )
+    balanced_court_count = st.number_input("Courts available", min_value=1, value=max(1, len(available_players) // 4), step=1, key="balanced_courts_count")
+    avoid_repeats = st.checkbox("Avoid partnerships played in the last 30 days", value=True, key="balanced_courts_avoid")
+    if st.button("Balance Courts", key="balance_courts_button"):
+        if len(available_players) < 4:
+            st.warning("Select at least four players.")
+        else:
+            doubles_rank_df, _ = calculate_rankings("Doubles")
+            avoid_partners = recent_partner_pairs(st.session_state.matches_df, pd.Timestamp.now() - pd.Timedelta(days=30)) if avoid_repeats else set()
+            balanced, sitting_out = balance_courts(available_players, get_performance_scores("Doubles", doubles_rank_df),
+                                                   courts=int(balanced_court_count), avoid_partners=avoid_partners)
+            for i, (team1, team2) in enumerate(balanced, start=1):
+                st.markdown(f"**Court {i}:** {style_doubles_pairing(team1, team2)}", unsafe_allow_html=True)
+            if sitting_out:
+                st.markdown("**Sitting out:** " + ", ".join(sitting_out))
+
 
 #st.markdown("---")
 
@@ -3124,56 +3087,30 @@ with tabs[5]:
 st.markdown("---")
 st.subheader("Data Backup")
 
-zip_buffer = io.BytesIO()
-with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-    # --- Matches CSV ---
-    matches_csv = st.session_state.matches_df.to_csv(index=False)
-    zip_file.writestr("matches.csv", matches_csv)
-
-    # --- Players CSV ---
-    players_csv = st.session_state.players_df.to_csv(index=False)
-    zip_file.writestr("players.csv", players_csv)
-
-    # --- Bookings CSV ---
-    bookings_csv = st.session_state.bookings_df.to_csv(index=False)
-    zip_file.writestr("bookings.csv", bookings_csv)
-
-    # --- Profile Images ---
-    for _, row in st.session_state.players_df.iterrows():
-        url = row.get("profile_image_url")
-        if url:
-            try:
-                r = requests.get(url, timeout=10)
-                if r.status_code == 200:
-                    # sanitize name for safe filename
-                    safe_name = re.sub(r'[^a-zA-Z0-9_-]', '_', str(row["name"]))
-                    zip_file.writestr(f"profile_images/{safe_name}.jpg", r.content)
-            except Exception as e:
-                st.warning(f"Could not download profile image for {row.get('name')}: {e}")
-
-    # --- Match Images ---
-    for _, row in st.session_state.matches_df.iterrows():
-        url = row.get("match_image_url")
-        if url:
-            try:
-                r = requests.get(url, timeout=10)
-                if r.status_code == 200:
-                    match_id = row.get("match_id", str(uuid.uuid4()))
-                    zip_file.writestr(f"match_images/{match_id}.jpg", r.content)
-            except Exception as e:
-                st.warning(f"Could not download match image for {row.get('match_id')}: {e}")
-
-zip_buffer.seek(0)
-
-# Format current date and time for filename
-current_time = datetime.now().strftime("%Y%m%d-%H%M")
-st.download_button(
-    label="Backup",
-    data=zip_buffer,
-    file_name=f"ar-tennis-data-{current_time}.zip",
-    mime="application/zip",
-    key=f"backup_download_{st.session_state.get('form_key_suffix', 0)}"
-)
+# The archive downloads every profile and match image, so it is only built when
+# requested and is cached per data version; ordinary reruns never touch the network.
+# Images already fetched for an earlier archive are revalidated by ETag and reused from a local cache.
+delta_backup = st.checkbox("Only include images changed since the last full backup", key="delta_backup_checkbox")
+base_manifest = ImageCache().load_manifest() if delta_backup else None
+backup_version = f"{players_version}-{matches_version}-{bookings_version}-{'delta-' + manifest_hash(base_manifest) if delta_backup else 'full'}"
+if st.button("Prepare Backup", key="prepare_backup_button"):
+    st.session_state.backup_version = backup_version
+
+if st.session_state.get("backup_version") == backup_version:
+    backup_data, backup_errors = build_backup_archive(backup_version, delta_backup, st.session_state.players_df, st.session_state.matches_df, st.session_state.bookings_df, base_manifest)
+    if backup_errors:
+        st.warning(f"{len(backup_errors)} image(s) could not be downloaded and are missing from the backup:\n\n" + "\n\n".join(backup_errors))
+    # Format current date and time for filename
+    current_time = datetime.now().strftime("%Y%m%d-%H%M")
+    st.download_button(
+        label="Backup",
+        data=backup_data,
+        file_name=f"ar-tennis-data-{'delta-' if delta_backup else ''}{current_time}.zip",
+        mime="application/zip",
+        key=f"backup_download_{st.session_state.get('form_key_suffix', 0)}"
+    )
+else:
+    st.caption("Click Prepare Backup to bundle all tables and images into a ZIP file.")
 
 
 st.markdown("""
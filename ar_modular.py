@@ -5,6 +5,7 @@ import uuid
 
 # Import functions from other modules
 from config import setup_supabase_client
+from ids import IdAllocator
 from data_manager import (
     load_players, load_matches, save_matches, delete_match_from_db,
     upload_image_to_supabase, save_players
@@ -42,10 +43,10 @@ players = sorted([p for p in players_df["name"].dropna().tolist() if p != "Visit
 # Generate missing match IDs if necessary
 if not matches.empty and ("match_id" not in matches.columns or matches["match_id"].isnull().any()):
     matches['date'] = pd.to_datetime(matches['date'], errors='coerce')
-    for i in matches.index:
-        if pd.isna(matches.at[i, "match_id"]):
-            match_date_for_id = matches.at[i, "date"] if pd.notna(matches.at[i, "date"]) else datetime.now()
-            matches.at[i, "match_id"] = generate_match_id(matches, match_date_for_id)
+    missing_ids = matches["match_id"].isna() if "match_id" in matches.columns else pd.Series(True, index=matches.index)
+    matches.loc[missing_ids, "match_id"] = IdAllocator(matches, "match_id", "AR").allocate_many(
+        matches.loc[missing_ids, "date"].fillna(pd.Timestamp(datetime.now()))
+    )
     save_matches(supabase, matches)
 
 st.image("krakow_tennis_league.jpeg", use_container_width=True)
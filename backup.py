@@ -0,0 +1,315 @@
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+MAX_WORKERS = 8          # Total concurrent downloads
+MAX_PER_HOST = 4         # Concurrent downloads against a single storage host
+REQUEST_TIMEOUT = 10     # Seconds, per request attempt
+CHUNK_SIZE = 64 * 1024
+SPOOL_LIMIT = 1024 * 1024  # Bodies larger than this spill to a temp file instead of staying in memory
+BACKUP_CACHE_DIR = os.path.join(tempfile.gettempdir(), "ar_tennis_backup_cache")
+MANIFEST_NAME = "manifest.json"
+PRUNE_GRACE_SECONDS = 3600  # Objects used more recently than this are never pruned; a concurrent build may be reading them
+_OBJECT_LOCKS = {}  # cache root -> lock shared by every ImageCache on that root
+_OBJECT_LOCKS_GUARD = threading.Lock()
+
+
+def create_session(pool_size=MAX_WORKERS):
+    """Returns a requests session with pooled keep-alive connections and retry/backoff on transient errors."""
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _read_json(path, default):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def manifest_hash(manifest):
+    """Short content hash of a manifest, or "none" without one; identifies the base of a delta backup."""
+    if not manifest:
+        return "none"
+    return hashlib.sha256(json.dumps(manifest, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class ImageCache:
+    """Content-addressed store of downloaded images (keyed by SHA-256) with a URL -> ETag/hash index.
+
+    It also keeps the manifest of the last full archive built, which delta backups are computed
+    against. Every use of an object refreshes its mtime, and prune() leaves objects used within
+    PRUNE_GRACE_SECONDS alone, so a build running at the same time never loses a blob it is reading.
+    """
+
+    def __init__(self, root=BACKUP_CACHE_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.index_path = os.path.join(root, "index.json")
+        self.manifest_path = os.path.join(root, "full_manifest.json")
+        self._lock = threading.Lock()
+        with _OBJECT_LOCKS_GUARD:
+            self._object_lock = _OBJECT_LOCKS.setdefault(os.path.abspath(root), threading.Lock())
+        self._index = _read_json(self.index_path, {})
+
+    def object_path(self, sha256):
+        return os.path.join(self.objects_dir, sha256)
+
+    def lookup(self, url):
+        """Returns the cached entry for a URL if its bytes are still on disk."""
+        with self._lock:
+            entry = self._index.get(url)
+        if not entry:
+            return None
+        with self._object_lock:
+            try:
+                os.utime(self.object_path(entry["sha256"]))  # Marks the object as in use for prune()
+            except OSError:
+                return None
+        return entry
+
+    def store(self, url, etag, chunks):
+        """Streams chunks into the store, hashing as it goes, and records the URL's new entry."""
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.objects_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    tmp.write(chunk)
+            entry = {"sha256": digest.hexdigest(), "etag": etag, "size": size}
+            with self._object_lock:
+                os.replace(tmp_path, self.object_path(entry["sha256"]))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._index[url] = entry
+        return entry
+
+    def prune(self, keep_urls):
+        """Drops index entries for URLs no longer referenced and deletes unreferenced objects that
+        have not been used for PRUNE_GRACE_SECONDS."""
+        with self._lock:
+            self._index = {url: entry for url, entry in self._index.items() if url in keep_urls}
+            referenced = {entry["sha256"] for entry in self._index.values()}
+        cutoff = time.time() - PRUNE_GRACE_SECONDS
+        with self._object_lock:
+            for name in os.listdir(self.objects_dir):
+                if name in referenced or name.endswith(".part"):
+                    continue
+                path = os.path.join(self.objects_dir, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
+
+    def save(self):
+        with self._lock:
+            _write_json(self.index_path, self._index)
+
+    def load_manifest(self):
+        """Manifest of the last full archive, or None before the first one."""
+        return _read_json(self.manifest_path, None)
+
+    def save_manifest(self, manifest):
+        _write_json(self.manifest_path, manifest)
+
+
+class ImageFetcher:
+    """Downloads many images concurrently over one shared session, with a per-host concurrency limit.
+
+    With an ImageCache, images already on disk are revalidated with If-None-Match and only
+    re-downloaded when the storage ETag has changed.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, max_per_host=MAX_PER_HOST, timeout=REQUEST_TIMEOUT, cache=None):
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.cache = cache
+        self.session = create_session(max_workers)
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+    def _host_slot(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_slots[host]
+
+    def _fetch(self, url):
+        """Returns (body, info) where info carries the sha256, etag and size of the image."""
+        cached = self.cache.lookup(url) if self.cache else None
+        headers = {"If-None-Match": cached["etag"]} if cached and cached.get("etag") else {}
+        with self._host_slot(url):
+            with self.session.get(url, timeout=self.timeout, stream=True, headers=headers) as response:
+                if response.status_code == 304 and cached:
+                    return open(self.cache.object_path(cached["sha256"]), "rb"), dict(cached, reused=True)
+                if response.status_code != 200:
+                    raise requests.HTTPError(f"HTTP {response.status_code}")
+                etag = response.headers.get("ETag")
+                chunks = response.iter_content(CHUNK_SIZE)
+                if self.cache:
+                    entry = self.cache.store(url, etag, chunks)
+                    return open(self.cache.object_path(entry["sha256"]), "rb"), dict(entry, reused=False)
+
+                # Stream the body in chunks so a large image never has to sit in memory as one bytes object.
+                body = tempfile.SpooledTemporaryFile(max_size=SPOOL_LIMIT)
+                digest = hashlib.sha256()
+                size = 0
+                try:
+                    for chunk in chunks:
+                        digest.update(chunk)
+                        size += len(chunk)
+                        body.write(chunk)
+                except Exception:
+                    body.close()
+                    raise
+        body.seek(0)
+        return body, {"sha256": digest.hexdigest(), "etag": etag, "size": size, "reused": False}
+
+    def fetch_all(self, jobs):
+        """Yields (archive_name, url, body, info, error) for each (archive_name, url) job as soon as it finishes."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self._fetch, url): (name, url) for name, url in jobs}
+            for future in as_completed(futures):
+                name, url = futures[future]
+                try:
+                    body, info = future.result()
+                    yield name, url, body, info, None
+                except Exception as e:
+                    yield name, url, None, None, f"Failed to download {url}: {e}"
+
+    def close(self):
+        self.session.close()
+
+
+def backup_image_jobs(players_df, matches_df):
+    """Lists (archive_name, url) pairs for every profile and match image referenced by the tables."""
+    jobs = []
+    if "profile_image_url" in players_df.columns:
+        for name, url in zip(players_df["name"], players_df["profile_image_url"]):
+            if isinstance(url, str) and url:
+                safe_name = re.sub(r'[^a-zA-Z0-9_-]', '_', str(name))  # sanitize filename
+                jobs.append((f"profile_images/{safe_name}.jpg", url))
+    if "match_image_url" in matches_df.columns:
+        match_ids = matches_df["match_id"] if "match_id" in matches_df.columns else [None] * len(matches_df)
+        for match_id, url in zip(match_ids, matches_df["match_image_url"]):
+            if isinstance(url, str) and url:
+                if not isinstance(match_id, str) or not match_id:
+                    match_id = str(uuid.uuid4())
+                jobs.append((f"match_images/{match_id}.jpg", url))
+    return jobs
+
+
+def create_backup_zip(players_df, matches_df, bookings_df, fetcher=None, delta=False, base_manifest=None):
+    """Create a zip file with CSV tables + images from Supabase URLs.
+
+    Images are downloaded in parallel and each body is copied into its ZIP entry as soon as it
+    arrives, so the total time tracks the slowest image rather than the sum of all of them.
+    A manifest.json (URL, SHA-256, ETag, size and archive name of every image) is written next
+    to the CSVs. With delta=True, images whose hash is unchanged since the last full archive are
+    listed in the manifest but left out of the ZIP; pass that archive's manifest as base_manifest
+    to pin the base (it is read from the cache otherwise). Only a full archive becomes the base
+    of later deltas, so a delta is never taken against another delta.
+    Returns the buffer and a list of download errors.
+    """
+    own_fetcher = fetcher is None
+    fetcher = fetcher or ImageFetcher(cache=ImageCache())
+    cache = fetcher.cache
+    if not delta:
+        base_manifest = None
+    elif base_manifest is None and cache:
+        base_manifest = cache.load_manifest()
+    base_hashes = {img["archive_name"]: img["sha256"] for img in base_manifest["images"]} if base_manifest else {}
+
+    jobs = backup_image_jobs(players_df, matches_df)
+    errors = []
+    images = []
+    buffer = io.BytesIO()
+    try:
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+            # --- CSVs ---
+            zf.writestr("players.csv", players_df.to_csv(index=False))
+            zf.writestr("matches.csv", matches_df.to_csv(index=False))
+            zf.writestr("bookings.csv", bookings_df.to_csv(index=False))
+
+            # --- Profile and match images ---
+            for name, url, body, info, error in fetcher.fetch_all(jobs):
+                if error:
+                    errors.append(error)
+                    continue
+                with body:
+                    included = base_hashes.get(name) != info["sha256"]
+                    if included:
+                        with zf.open(name, "w") as entry:
+                            shutil.copyfileobj(body, entry, CHUNK_SIZE)
+                images.append({
+                    "archive_name": name,
+                    "url": url,
+                    "sha256": info["sha256"],
+                    "etag": info["etag"],
+                    "size": info["size"],
+                    "included": included,
+                })
+
+            manifest = {
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "delta": base_manifest is not None,
+                "base_created_at": base_manifest["created_at"] if base_manifest else None,
+                "base_manifest_sha256": manifest_hash(base_manifest) if base_manifest else None,
+                "tables": ["players.csv", "matches.csv", "bookings.csv"],
+                "images": sorted(images, key=lambda img: img["archive_name"]),
+            }
+            zf.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+
+        if cache:
+            cache.prune({url for _, url in jobs})
+            cache.save()
+            if base_manifest is None:
+                cache.save_manifest(manifest)
+    finally:
+        if own_fetcher:
+            fetcher.close()
+
+    buffer.seek(0)
+    return buffer, errors
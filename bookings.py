@@ -1,27 +1,31 @@
-
 import pandas as pd
+import streamlit as st
 from datetime import datetime, timedelta, timezone
 from setup_supabase import setup_supase_client
 
 supabase =  setup_supase_client()
 
+CACHE_TTL = 600  # seconds; ar.py clears the cache on every bookings write
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _fetch_bookings(start_date, end_date=None):
+    query = supabase.table("bookings").select("*").gte("date", start_date)
+    if end_date:
+        query = query.lte("date", end_date)
+    response = query.execute()
+    return pd.DataFrame(response.data)
+
+def clear_bookings_cache():
+    _fetch_bookings.clear()
+
 def load_upcoming_bookings():
     today = datetime.now(timezone.utc).date()
     three_days_later = today + timedelta(days=3)
     today_str = today.isoformat()
     three_days_str = three_days_later.isoformat()
-    response = supabase.table("bookings").select("*") \
-    .gte("date", today_str) \
-    .lte("date", three_days_str) \
-    .execute()
-    return pd.DataFrame(response.data)
+    return _fetch_bookings(today_str, three_days_str)
 
 def load_all_bookings():
     today = datetime.now(timezone.utc).date()
-    three_days_later = today + timedelta(days=3)
     today_str = today.isoformat()
-    three_days_str = three_days_later.isoformat()
-    response = supabase.table("bookings").select("*") \
-    .gte("date", today_str) \
-    .execute()
-    return pd.DataFrame(response.data)
\ No newline at end of file
+    return _fetch_bookings(today_str)
@@ -0,0 +1,5 @@
+"""Match-table constants shared by the rankings, ratings and stats modules."""
+
+PLAYER_COLUMNS = ["team1_player1", "team1_player2", "team2_player1", "team2_player2"]
+EXCLUDED_PLAYERS = ["Visitor"]  # Guest slots never appear in rankings, ratings or partner stats
+GD_SCALE = 6  # Game differences per set are kept in sixths: the lowest common multiple of the possible set counts (1, 2, 3)
@@ -3,6 +3,7 @@ import pandas as pd
 from supabase import Client
 from config import PLAYERS_TABLE, MATCHES_TABLE, PROFILE_BUCKET, MATCH_IMAGE_BUCKET
 import io
+from scores import SCORE_COLUMNS, add_score_columns
 
 def load_players(supabase: Client):
     """Loads player data from Supabase into session state."""
@@ -37,14 +38,14 @@ def load_matches(supabase: Client):
         for col in expected_columns:
             if col not in df.columns:
                 df[col] = ""
-        st.session_state.matches_df = df
+        st.session_state.matches_df = add_score_columns(df)
     except Exception as e:
         st.error(f"Error loading matches: {str(e)}")
 
 def save_matches(supabase: Client, df: pd.DataFrame):
     """Saves match data to Supabase."""
     try:
-        df_to_save = df.copy()
+        df_to_save = df.drop(columns=SCORE_COLUMNS, errors="ignore")
         if 'date' in df_to_save.columns:
             # Coerce to datetime, then format, handling potential NaT values
             df_to_save['date'] = pd.to_datetime(df_to_save['date'], errors='coerce')
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+from constants import EXCLUDED_PLAYERS
+from match_index import NO_PLAYER
+
+TEAM_SLOTS = {1: [0, 1], 2: [2, 3]}  # Positions of each team's players in the match index's player matrix
+
+
+class HeadToHead:
+    """Dense players x players head-to-head matrices of wins, losses, ties and matches.
+
+    Cell [i, j] is player i's record against player j, with i and j the player ids of the
+    MatchIndex it is built from. Every player on one team is counted as facing every player on the
+    other; Visitors and empty slots are skipped. The matrices are filled with one vectorized
+    cross-join per pair of team slots over the index's integer player matrix, so a pair lookup is
+    O(1) and a player's rival table is one row of each matrix.
+    """
+
+    def __init__(self, match_index):
+        self.players = match_index.players
+        self.player_ids = match_index.player_ids
+        size = len(self.players)
+
+        codes = match_index.player_matrix.astype(np.int64)
+        excluded = [self.player_ids[name] for name in EXCLUDED_PLAYERS if name in self.player_ids]
+        codes[np.isin(codes, excluded)] = NO_PLAYER
+        winner = match_index.frame["winner"].to_numpy()
+        team1_won = winner == "Team 1"
+        team2_won = winner == "Team 2"
+        tied = ~(team1_won | team2_won)
+
+        wins = np.zeros(size * size, dtype=np.int64)
+        losses = np.zeros(size * size, dtype=np.int64)
+        ties = np.zeros(size * size, dtype=np.int64)
+        for team1_ids in codes[:, TEAM_SLOTS[1]].T:
+            for team2_ids in codes[:, TEAM_SLOTS[2]].T:
+                faced = (team1_ids != NO_PLAYER) & (team2_ids != NO_PLAYER)
+                forward = team1_ids * size + team2_ids  # Team 1 player's cell against the Team 2 player
+                backward = team2_ids * size + team1_ids
+                wins += np.bincount(np.concatenate([forward[faced & team1_won], backward[faced & team2_won]]), minlength=size * size)
+                losses += np.bincount(np.concatenate([backward[faced & team1_won], forward[faced & team2_won]]), minlength=size * size)
+                ties += np.bincount(np.concatenate([forward[faced & tied], backward[faced & tied]]), minlength=size * size)
+        self.wins = wins.reshape(size, size)
+        self.losses = losses.reshape(size, size)
+        self.ties = ties.reshape(size, size)
+        self.matches = self.wins + self.losses + self.ties
+
+    def faced_players(self):
+        """Players with at least one head-to-head record, in name order (Visitors never have one)."""
+        return [self.players[i] for i in np.flatnonzero(self.matches.sum(axis=1))]
+
+    def record(self, player, opponent):
+        """Returns {'wins', 'losses', 'ties', 'matches'} for player against opponent."""
+        i, j = self.player_ids.get(player), self.player_ids.get(opponent)
+        if i is None or j is None:
+            return {'wins': 0, 'losses': 0, 'ties': 0, 'matches': 0}
+        return {
+            'wins': int(self.wins[i, j]), 'losses': int(self.losses[i, j]),
+            'ties': int(self.ties[i, j]), 'matches': int(self.matches[i, j]),
+        }
+
+    def rivals(self, player):
+        """Every opponent the player has faced, most-played first, with the player's record against them."""
+        i = self.player_ids.get(player)
+        if i is None:
+            return pd.DataFrame(columns=["Opponent", "Matches", "Wins", "Losses", "Ties", "Win %"])
+        faced = np.flatnonzero(self.matches[i] > 0)
+        faced = faced[faced != i]
+        table = pd.DataFrame({
+            "Opponent": [self.players[j] for j in faced],
+            "Matches": self.matches[i, faced],
+            "Wins": self.wins[i, faced],
+            "Losses": self.losses[i, faced],
+            "Ties": self.ties[i, faced],
+        })
+        table["Win %"] = (table["Wins"] / table["Matches"] * 100).round(1)
+        return table.sort_values(by=["Matches", "Opponent"], ascending=[False, True], kind="stable").reset_index(drop=True)
+
+    def top_rivalries(self, limit=5):
+        """The most-played pairs as dicts with Players, Matches, Wins1, Wins2 and Ties (first player alphabetically first)."""
+        first, second = np.triu_indices(len(self.players), k=1)
+        played = self.matches[first, second] > 0
+        first, second = first[played], second[played]
+        order = np.argsort(-self.matches[first, second], kind="stable")[:limit]
+        return [
+            {
+                "Players": f"{self.players[i]} vs {self.players[j]}",
+                "Matches": int(self.matches[i, j]),
+                "Wins1": int(self.wins[i, j]),
+                "Wins2": int(self.wins[j, i]),
+                "Ties": int(self.ties[i, j]),
+            }
+            for i, j in zip(first[order], second[order])
+        ]
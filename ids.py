@@ -0,0 +1,53 @@
+import threading
+
+import pandas as pd
+
+
+def get_quarter(month):
+    return f"Q{(month - 1) // 3 + 1}"
+
+
+class IdAllocator:
+    """Hands out quarter-numbered ids such as KRQ12025-07 from per-quarter counters.
+
+    One scan of the table counts its rows per (year, quarter) and collects the ids in use; after
+    that an id costs a counter bump and a set lookup instead of a scan. Numbering is the one the
+    per-call helpers always used: the next id of a quarter is `prefix` + quarter + year + (rows in
+    the quarter + 1), and an id already taken moves on to the next serial with `collision_prefix`.
+    Every id handed out counts as a new row of its quarter, so allocate(when, n) gives the same
+    ids as n single calls with each new row saved in between.
+    """
+
+    def __init__(self, frame, id_column, prefix, collision_prefix=None):
+        self.prefix = prefix
+        self.collision_prefix = collision_prefix or prefix
+        self.counts = {}
+        self.taken = set()
+        if not frame.empty and "date" in frame.columns:
+            dates = pd.to_datetime(frame["date"], errors="coerce")
+            self.counts = {(int(year), int(quarter)): int(size)
+                           for (year, quarter), size in dates.groupby([dates.dt.year, dates.dt.quarter]).size().items()}
+            if id_column in frame.columns:
+                self.taken = set(frame[id_column].dropna())
+        self._lock = threading.Lock()
+
+    def allocate(self, when, count=1):
+        """Returns `count` new ids for rows dated `when`."""
+        quarter = get_quarter(when.month)
+        key = (when.year, int(quarter[1]))
+        new_ids = []
+        with self._lock:
+            for _ in range(count):
+                serial_number = self.counts.get(key, 0) + 1
+                new_id = f"{self.prefix}{quarter}{when.year}-{serial_number:02d}"
+                while new_id in self.taken:
+                    serial_number += 1
+                    new_id = f"{self.collision_prefix}{quarter}{when.year}-{serial_number:02d}"
+                self.counts[key] = self.counts.get(key, 0) + 1
+                self.taken.add(new_id)
+                new_ids.append(new_id)
+        return new_ids
+
+    def allocate_many(self, dates):
+        """Returns one new id per date, in order; the dates may fall in different quarters."""
+        return [self.allocate(when)[0] for when in dates]
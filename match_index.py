@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+from constants import PLAYER_COLUMNS
+from scores import SET_COLUMNS, ensure_score_columns
+
+MATCH_TYPES = ["Doubles", "Singles"]
+WINNERS = ["Team 1", "Team 2", "Tie"]
+NO_PLAYER = -1  # Id of an empty player slot
+SET_GAME_COLUMNS = [f"{col}_{side}" for col in SET_COLUMNS for side in ("t1", "t2")]
+MATCH_GAME_COLUMNS = ["set_count", "t1_games", "t2_games", "match_gd"]
+
+
+class MatchIndex:
+    """Compact, integer-coded copy of the matches frame.
+
+    Player names become small int ids (NO_PLAYER for an empty slot), match_type and winner become
+    categoricals and game counts int16, so player and type filters compare integers instead of
+    strings. Row i of `frame` is row i of the matches frame it was built from and `labels` holds
+    that frame's index labels; player_id() and names() translate between ids and names at the UI edge.
+    """
+
+    def __init__(self, matches):
+        matches = ensure_score_columns(matches)
+        self.labels = matches.index.to_numpy()
+        names = pd.unique(matches[PLAYER_COLUMNS].to_numpy().ravel("K"))
+        self.players = sorted(name for name in names if isinstance(name, str) and name)
+        self.player_ids = {name: i for i, name in enumerate(self.players)}
+
+        frame = pd.DataFrame({
+            "match_id": matches["match_id"].to_numpy(),
+            "date": pd.to_datetime(matches["date"], errors="coerce").to_numpy(),
+            "match_type": pd.Categorical(matches["match_type"], categories=MATCH_TYPES),
+            "winner": pd.Categorical(matches["winner"], categories=WINNERS),
+        })
+        for col in PLAYER_COLUMNS:
+            frame[col] = matches[col].map(self.player_ids).fillna(NO_PLAYER).to_numpy(dtype="int16")
+        for col in SET_GAME_COLUMNS:
+            frame[col] = matches[col].astype("Int16").array
+        for col in MATCH_GAME_COLUMNS:
+            frame[col] = matches[col].to_numpy(dtype="int16")
+        self.frame = frame
+        self.player_matrix = frame[PLAYER_COLUMNS].to_numpy()
+        self.participation = ParticipationIndex(self.player_matrix, len(self.players))
+
+    def __len__(self):
+        return len(self.frame)
+
+    def player_id(self, name):
+        return self.player_ids.get(name, NO_PLAYER)
+
+    def names(self, ids):
+        """Translates player ids back to names ("" for an empty slot)."""
+        return [self.players[i] if i != NO_PLAYER else "" for i in ids]
+
+    def player_mask(self, name, columns=PLAYER_COLUMNS):
+        """Boolean array over the matches marking those where the player sits in any of the given columns."""
+        player_id = self.player_id(name)
+        if player_id == NO_PLAYER:
+            return np.zeros(len(self.frame), dtype=bool)
+        positions = [PLAYER_COLUMNS.index(col) for col in columns]
+        return (self.player_matrix[:, positions] == player_id).any(axis=1)
+
+    def type_mask(self, match_type):
+        return (self.frame["match_type"] == match_type).to_numpy()
+
+    def positions_for(self, name):
+        """Row positions of the matches the player took part in, in frame order."""
+        return self.participation.matches(self.player_id(name))
+
+    def rows_for(self, name):
+        """Index labels (in the source frame) of the matches the player took part in."""
+        return self.labels[self.positions_for(name)]
+
+
+class ParticipationIndex:
+    """Long (player x match) participation table grouped by player, with per-player row offsets.
+
+    The rows of player p are offsets[p]:offsets[p + 1], so "the matches of player p" is a slice
+    rather than a scan. Each row holds the match position and the team (1 or 2) the player was on;
+    a player listed twice in one match counts once, on the first slot's team.
+    """
+
+    def __init__(self, player_matrix, player_count):
+        match_pos = np.repeat(np.arange(len(player_matrix)), player_matrix.shape[1])
+        slot = np.tile(np.arange(player_matrix.shape[1]), len(player_matrix))
+        player = player_matrix.ravel().astype(np.int32)
+        keep = player != NO_PLAYER
+        match_pos, slot, player = match_pos[keep], slot[keep], player[keep]
+
+        order = np.lexsort((slot, match_pos, player))
+        match_pos, slot, player = match_pos[order], slot[order], player[order]
+        first = np.ones(len(player), dtype=bool)
+        first[1:] = (player[1:] != player[:-1]) | (match_pos[1:] != match_pos[:-1])
+
+        self.player = player[first]
+        self.match_pos = match_pos[first]
+        self.team = np.where(slot[first] < 2, 1, 2).astype(np.int8)
+        self.offsets = np.zeros(player_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.player, minlength=player_count), out=self.offsets[1:])
+
+    def _slice(self, player_id):
+        if player_id == NO_PLAYER or player_id + 1 >= len(self.offsets):
+            return slice(0, 0)
+        return slice(self.offsets[player_id], self.offsets[player_id + 1])
+
+    def matches(self, player_id):
+        """Match positions of one player, ascending."""
+        return self.match_pos[self._slice(player_id)]
+
+    def teams(self, player_id):
+        """Team (1 or 2) the player was on, aligned with matches(player_id)."""
+        return self.team[self._slice(player_id)]
+
+    def match_counts(self):
+        """Number of matches per player id."""
+        return np.diff(self.offsets)
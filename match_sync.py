@@ -0,0 +1,148 @@
+"""Incremental sync of the matches table.
+
+Delta sync needs an `updated_at` column that the database keeps current, e.g.:
+
+    alter table matches add column if not exists updated_at timestamptz not null default now();
+    create index if not exists matches_updated_at_idx on matches (updated_at);
+    create or replace function set_updated_at() returns trigger as $$
+    begin new.updated_at = now(); return new; end $$ language plpgsql;
+    create trigger matches_set_updated_at before insert or update on matches
+    for each row execute function set_updated_at();
+
+Without that column every sync falls back to a full select, exactly like before.
+"""
+import threading
+import time
+from datetime import timedelta
+
+import pandas as pd
+
+from scores import SCORE_COLUMNS
+
+WATERMARK_COLUMN = "updated_at"
+# Columns the app never writes back: updated_at is owned by the trigger, the score columns are derived on load
+NON_PERSISTED_COLUMNS = [WATERMARK_COLUMN] + SCORE_COLUMNS
+WRITE_BATCH_SIZE = 500
+WATERMARK_OVERLAP = timedelta(seconds=5)  # Re-read a few seconds back so late-committing writes are not skipped
+RECONCILE_INTERVAL = 15 * 60  # Seconds between id-only passes that drop rows deleted outside this process
+
+
+class MatchSync:
+    """Keeps one in-memory copy of the matches table current by fetching only rows changed since the last sync.
+
+    Deletes made through the app are applied with forget(); rows deleted elsewhere are dropped by a
+    periodic reconciliation that only selects match_id. If that pass finds ids we have never seen,
+    the watermark has missed something and the table is reloaded in full.
+    """
+
+    def __init__(self, supabase, table_name, reconcile_interval=RECONCILE_INTERVAL):
+        self.supabase = supabase
+        self.table_name = table_name
+        self.reconcile_interval = reconcile_interval
+        self.frame = None
+        self.watermark = None
+        self.last_reconcile = 0.0
+        self._lock = threading.Lock()
+
+    def sync(self):
+        """Brings the local copy up to date and returns a copy of it."""
+        with self._lock:
+            if self.frame is None or self.watermark is None:
+                self._full_load()
+            else:
+                self._apply_changes()
+                if time.monotonic() - self.last_reconcile >= self.reconcile_interval:
+                    self._reconcile()
+            return self.frame.copy()
+
+    def forget(self, match_id):
+        """Removes a match deleted through the app from the local copy."""
+        with self._lock:
+            if self.frame is not None and "match_id" in self.frame.columns:
+                self.frame = self.frame[self.frame["match_id"] != match_id].reset_index(drop=True)
+
+    def _full_load(self):
+        response = self.supabase.table(self.table_name).select("*").execute()
+        self.frame = pd.DataFrame(response.data)
+        self.watermark = self._max_watermark(self.frame)
+        self.last_reconcile = time.monotonic()
+
+    def _apply_changes(self):
+        since = (self.watermark - WATERMARK_OVERLAP).isoformat()
+        response = self.supabase.table(self.table_name).select("*").gte(WATERMARK_COLUMN, since).execute()
+        changed = pd.DataFrame(response.data)
+        if changed.empty:
+            return
+        unchanged = self.frame[~self.frame["match_id"].isin(changed["match_id"])]
+        self.frame = pd.concat([unchanged, changed], ignore_index=True)
+        self.watermark = max(self.watermark, self._max_watermark(changed))
+
+    def _reconcile(self):
+        response = self.supabase.table(self.table_name).select("match_id").execute()
+        remote_ids = {row["match_id"] for row in response.data}
+        local_ids = set(self.frame["match_id"])
+        if remote_ids - local_ids:
+            self._full_load()
+            return
+        if local_ids - remote_ids:
+            self.frame = self.frame[self.frame["match_id"].isin(remote_ids)].reset_index(drop=True)
+        self.last_reconcile = time.monotonic()
+
+    @staticmethod
+    def _max_watermark(df):
+        if WATERMARK_COLUMN not in df.columns or "match_id" not in df.columns:
+            return None
+        stamps = pd.to_datetime(df[WATERMARK_COLUMN], errors="coerce", utc=True)
+        latest = stamps.max()
+        return None if pd.isna(latest) else latest.to_pydatetime()
+
+
+def prepare_matches_for_save(df):
+    """Normalizes a matches frame into the rows the database stores: formatted dates, one row per
+    match_id and None instead of NaN. Returns the frame and the list of duplicated match_ids."""
+    df_to_save = df.drop(columns=NON_PERSISTED_COLUMNS, errors="ignore").copy()
+    if 'date' in df_to_save.columns:
+        df_to_save['date'] = pd.to_datetime(df_to_save['date'], errors='coerce')
+        df_to_save = df_to_save.dropna(subset=['date'])
+        df_to_save['date'] = df_to_save['date'].dt.strftime('%Y-%m-%d %H:%M:%S')
+
+    duplicates = df_to_save[df_to_save.duplicated(subset=['match_id'], keep=False)]['match_id'].tolist()
+    if duplicates:
+        df_to_save = df_to_save.drop_duplicates(subset=['match_id'], keep='last')
+
+    # Replace NaN with None for JSON compliance before saving
+    df_to_save = df_to_save.astype(object).where(pd.notna(df_to_save), None)
+    return df_to_save, duplicates
+
+
+def diff_matches(snapshot, current):
+    """Compares two prepared frames and returns the rows of `current` to upsert.
+
+    Rows missing from `current` are not treated as deleted: callers may pass a partial or stale
+    frame, so deletes only go through delete_match_from_db. Without a snapshot every row is
+    treated as changed.
+    """
+    if snapshot is None:
+        return current
+    snap = snapshot.set_index("match_id").reindex(columns=[c for c in current.columns if c != "match_id"])
+    keyed = current.dropna(subset=["match_id"]).set_index("match_id")
+    common = keyed.index.intersection(snap.index)
+    before, after = snap.loc[common], keyed.loc[common]
+    # Missing on both sides (None or NaN) is not an edit; compare everything else as text
+    edited = ((before.astype(str) != after.astype(str)) & ~(before.isna() & after.isna())).any(axis=1)
+    changed_ids = set(keyed.index.difference(snap.index)) | set(edited[edited].index)
+    return current[current["match_id"].isin(changed_ids) | current["match_id"].isna()]
+
+
+def merge_snapshot(snapshot, saved):
+    """Snapshot after saving `saved`: its rows replace theirs and rows it did not cover are kept."""
+    if snapshot is None:
+        return saved
+    kept = snapshot[~snapshot["match_id"].isin(saved["match_id"])]
+    return pd.concat([kept, saved], ignore_index=True)
+
+
+def batched(records, size=WRITE_BATCH_SIZE):
+    """Splits a list into chunks of at most size items."""
+    for start in range(0, len(records), size):
+        yield records[start:start + size]
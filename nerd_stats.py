@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+from constants import EXCLUDED_PLAYERS, PLAYER_COLUMNS
+from scores import regular_set_totals
+
+WIN_PCT_MIN_MATCHES = 5  # Matches needed to appear in the win percentage leader board
+COMMUNITY_TOP_WINNERS = 5
+
+
+def _slot_frame(matches):
+    """One row per (match, player slot) in match then slot order, with the regular-set game
+    difference of the match. Singles use only the first slot of each team; EXCLUDED_PLAYERS and
+    empty slots are dropped, as in the rankings."""
+    gd_sum, set_count = regular_set_totals(matches)
+    is_doubles = (matches["match_type"] == "Doubles").to_numpy()
+    winner = matches["winner"].to_numpy()
+    frames = []
+    for slot, col in enumerate(PLAYER_COLUMNS):
+        frames.append(pd.DataFrame({
+            "match_pos": np.arange(len(matches)),
+            "slot": slot,
+            "team": 1 if slot < 2 else 2,
+            "player": matches[col].to_numpy() if col in matches.columns else None,
+            "is_doubles": is_doubles,
+            "winner": winner,
+            "gd_sum": gd_sum,
+            "set_count": set_count,
+        }))
+    slots = pd.concat(frames, ignore_index=True).sort_values(["match_pos", "slot"], kind="stable")
+    in_play = slots["is_doubles"] | slots["slot"].isin([0, 2])
+    has_player = slots["player"].notna() & (slots["player"].astype(str) != "") & ~slots["player"].isin(EXCLUDED_PLAYERS)
+    return slots[in_play & has_player].reset_index(drop=True)
+
+
+def most_effective_partnership(partner_stats):
+    """Pair with the best win rate + game diff/10 score, as (player, partner, stats) or None."""
+    best = None
+    max_value = -1
+    for player, partners in partner_stats.items():
+        if player in EXCLUDED_PLAYERS:
+            continue
+        for partner, stats in partners.items():
+            if partner in EXCLUDED_PLAYERS or player < partner:  # Avoid double counting
+                win_rate = stats['wins'] / stats['matches'] if stats['matches'] > 0 else 0
+                avg_game_diff = stats['game_diff_sum'] / stats['matches'] if stats['matches'] > 0 else 0
+                score = win_rate + (avg_game_diff / 10)  # Adjust weight of game diff
+                if score > max_value:
+                    max_value = score
+                    best = (player, partner, stats)
+    return best
+
+
+def best_partner_candidate(slots):
+    """Doubles winner with the best normalized wins + game diff + distinct partners composite.
+
+    Only won doubles matches with at least one regular set count. Returns (player, stats) with
+    stats = {'wins', 'gd_sum', 'partners'}, or None.
+    """
+    won = slots[slots["is_doubles"] & (slots["set_count"] > 0)
+                & (slots["winner"] == np.where(slots["team"] == 1, "Team 1", "Team 2"))]
+    if won.empty:
+        return None
+    teammates = won.merge(won[["match_pos", "team", "player"]], on=["match_pos", "team"], suffixes=("", "_partner"))
+    teammates = teammates[teammates["player"] != teammates["player_partner"]]
+    partners = teammates.groupby("player")["player_partner"].nunique()
+
+    per_player = won.groupby("player", sort=False).agg(wins=("match_pos", "size"), gd_sum=("gd_sum", "sum"))
+    per_player["partners"] = partners.reindex(per_player.index, fill_value=0)
+
+    # Normalize each figure by its maximum; a figure whose maximum is 0 contributes nothing
+    composite = pd.Series(0.0, index=per_player.index)
+    for col in ["wins", "gd_sum", "partners"]:
+        col_max = per_player[col].max()
+        if col_max != 0:
+            composite += per_player[col] / col_max
+    if not (composite > -1).any():
+        return None
+    player = composite.idxmax()
+    stats = per_player.loc[player]
+    return player, {'wins': int(stats["wins"]), 'gd_sum': int(stats["gd_sum"]), 'partners': int(stats["partners"])}
+
+
+def highest_cumulative_game_diff(slots):
+    """Player with the largest summed regular-set game difference, as (player, value) or None."""
+    counted = slots[slots["set_count"] > 0]
+    if counted.empty:
+        return None
+    signed = np.where(counted["team"] == 1, counted["gd_sum"], -counted["gd_sum"])
+    totals = pd.Series(signed, index=counted.index).groupby(counted["player"], sort=False).sum()
+    player = totals.idxmax()
+    return player, int(totals[player])
+
+
+def community_stats(match_index, since):
+    """Activity since `since` from the shared match index: {'matches', 'active_players', 'top_winners'}.
+
+    Active players are the distinct names in the recent matches (Visitors included), and
+    top_winners is a Series of win counts for the COMMUNITY_TOP_WINNERS players with the most
+    wins, read off the participation index with one bincount.
+    """
+    recent = (match_index.frame["date"] >= since).to_numpy()
+    participation = match_index.participation
+    in_recent = recent[participation.match_pos]
+    winner = match_index.frame["winner"].to_numpy()
+    winning_team = np.select([winner == "Team 1", winner == "Team 2"], [1, 2], default=0)
+    won = in_recent & (participation.team == winning_team[participation.match_pos])
+
+    wins = np.bincount(participation.player[won], minlength=len(match_index.players))
+    top = np.flatnonzero(wins)
+    top = top[np.lexsort((top, -wins[top]))][:COMMUNITY_TOP_WINNERS]  # Most wins first, then by name
+    return {
+        "matches": int(recent.sum()),
+        "active_players": int(np.unique(participation.player[in_recent]).size),
+        "top_winners": pd.Series(wins[top], index=match_index.names(top), name="count"),
+    }
+
+
+def _top_row(rank_df, by):
+    if rank_df.empty:
+        return None
+    return rank_df.sort_values(by=by, ascending=False).iloc[0].to_dict()
+
+
+def compute_nerd_stats(matches, rank_df, partner_stats, match_index, since):
+    """Computes every Nerd Stuff metric from one player-slot frame plus the rankings, and the
+    community activity since `since` from the match index.
+
+    Game difference figures here use regular sets only; tie breaks are left out.
+    """
+    slots = _slot_frame(matches) if not matches.empty else None
+    eligible = rank_df[rank_df['Matches'] >= WIN_PCT_MIN_MATCHES] if not rank_df.empty else rank_df
+    return {
+        "most_effective_partnership": most_effective_partnership(partner_stats),
+        "best_partner": best_partner_candidate(slots) if slots is not None else None,
+        "most_frequent_player": _top_row(rank_df, "Matches"),
+        "highest_game_diff": highest_cumulative_game_diff(slots) if slots is not None else None,
+        "most_wins_player": _top_row(rank_df, "Wins"),
+        "highest_win_percent_player": _top_row(eligible, "Win %"),
+        "community": community_stats(match_index, since),
+    }
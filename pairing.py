@@ -0,0 +1,236 @@
+"""Balanced pairings and win odds for bookings and club nights.
+
+Odds come from a per-player performance score: a weighted blend of Win % (divided by the best
+Win %), Game Diff Avg (min-max scaled) and Matches (divided by the most matches). The scores are
+computed once per rank_df as a {player: score} map, and the batch functions below then price any
+number of bookings with array operations. balance_courts() splits a larger group of players into
+balanced doubles courts.
+"""
+import random
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+WIN_PERCENT_WEIGHT = 0.50
+GAME_DIFF_WEIGHT = 0.35
+EXPERIENCE_WEIGHT = 0.15  # Matches played
+BOOKING_PLAYER_COLUMNS = ["player1", "player2", "player3", "player4"]
+REPEAT_PARTNER_PENALTY = 0.5  # Score gap a court may give up to avoid one repeated partnership
+EXHAUSTIVE_MAX_PLAYERS = 12  # Up to this many players every grouping is tried; above it local search is used
+LOCAL_SEARCH_RESTARTS = 16  # Shuffled starts tried by the local search besides the score-ordered one
+LOCAL_SEARCH_SEED = 0
+# The three ways to split four players into two teams, team 1 always holding the first player
+DOUBLES_SPLITS = [(team1, tuple(i for i in range(4) if i not in team1)) for team1 in combinations(range(4), 2) if 0 in team1]
+# The 35 ways to split eight players into two courts of four, as (splits, court, position) indices
+COURT_PAIR_SPLITS = np.array([[(0, *others), tuple(i for i in range(1, 8) if i not in others)]
+                              for others in combinations(range(1, 8), 3)])
+
+
+def performance_scores(rank_df):
+    """Returns {player: performance score} for every player of a rank_df."""
+    if rank_df.empty:
+        return {}
+    win_percent = rank_df["Win %"].to_numpy(dtype=float)
+    game_diff = rank_df["Game Diff Avg"].to_numpy(dtype=float)
+    matches = rank_df["Matches"].to_numpy(dtype=float)
+
+    max_wp = win_percent.max()
+    wp_norm = win_percent / max_wp if max_wp > 0 else np.zeros(len(rank_df))
+    max_agd, min_agd = game_diff.max(), game_diff.min()
+    agd_norm = np.full(len(rank_df), 0.5) if max_agd == min_agd else (game_diff - min_agd) / (max_agd - min_agd)
+    max_matches = matches.max()
+    ef_norm = matches / max_matches if max_matches > 0 else np.zeros(len(rank_df))
+
+    score = WIN_PERCENT_WEIGHT * wp_norm + GAME_DIFF_WEIGHT * agd_norm + EXPERIENCE_WEIGHT * ef_norm
+    return dict(zip(rank_df["Player"], score.tolist()))
+
+
+def _odds(team1_score, team2_score):
+    """Each side's share of the combined score in percent, 50/50 when both are 0."""
+    total = team1_score + team2_score
+    team1_odds = np.divide(team1_score * 100, total, out=np.full(len(total), 50.0), where=total > 0)
+    team2_odds = np.divide(team2_score * 100, total, out=np.full(len(total), 50.0), where=total > 0)
+    return team1_odds, team2_odds
+
+
+def doubles_pairings(groups, scores):
+    """For each group of four players, the split with the smallest score gap and its odds.
+
+    Returns one (team1, team2, team1_odds, team2_odds) tuple per group; players without a score count as 0.
+    """
+    if not groups:
+        return []
+    matrix = np.array([[scores.get(p, 0) for p in group] for group in groups], dtype=float)
+    team1_scores = np.stack([matrix[:, list(team1)].sum(axis=1) for team1, _ in DOUBLES_SPLITS], axis=1)
+    team2_scores = np.stack([matrix[:, list(team2)].sum(axis=1) for _, team2 in DOUBLES_SPLITS], axis=1)
+    best = np.abs(team1_scores - team2_scores).argmin(axis=1)  # First of equally balanced splits
+    rows = np.arange(len(groups))
+    team1_odds, team2_odds = _odds(team1_scores[rows, best], team2_scores[rows, best])
+    return [
+        (tuple(group[i] for i in DOUBLES_SPLITS[split][0]), tuple(group[i] for i in DOUBLES_SPLITS[split][1]), t1, t2)
+        for group, split, t1, t2 in zip(groups, best, team1_odds.tolist(), team2_odds.tolist())
+    ]
+
+
+def singles_odds(pairs, scores):
+    """(player 1 odds, player 2 odds) for each pair of players."""
+    if not pairs:
+        return []
+    matrix = np.array([[scores.get(p, 0) for p in pair] for pair in pairs], dtype=float)
+    first_odds, second_odds = _odds(matrix[:, 0], matrix[:, 1])
+    return list(zip(first_odds.tolist(), second_odds.tolist()))
+
+
+def booking_odds(bookings, doubles_scores, singles_scores):
+    """Pairings and odds for every booking in one call, keyed by the bookings' index labels.
+
+    Full doubles bookings map to (team1, team2, team1_odds, team2_odds) and full singles bookings to
+    (player 1 odds, player 2 odds). Bookings that are not full, or whose format has no ranking data
+    yet, are left out.
+    """
+    doubles, singles = {}, {}
+    for label, match_type, *slots in bookings[["match_type"] + BOOKING_PLAYER_COLUMNS].itertuples():
+        players = [p for p in slots if isinstance(p, str) and p]
+        if match_type == "Doubles" and len(players) == 4 and doubles_scores:
+            doubles[label] = players
+        elif match_type == "Singles" and len(players) == 2 and singles_scores:
+            singles[label] = players
+    odds = dict(zip(doubles, doubles_pairings(list(doubles.values()), doubles_scores)))
+    odds.update(zip(singles, singles_odds(list(singles.values()), singles_scores)))
+    return odds
+
+
+def recent_partner_pairs(matches, since):
+    """Doubles partnerships played on or after `since`, as a set of frozenset({player, partner})."""
+    if matches.empty:
+        return set()
+    recent = matches[(matches["match_type"] == "Doubles") & (pd.to_datetime(matches["date"], errors="coerce") >= since)]
+    pairs = set()
+    for team in (["team1_player1", "team1_player2"], ["team2_player1", "team2_player2"]):
+        for player, partner in recent[team].itertuples(index=False):
+            if isinstance(player, str) and isinstance(partner, str) and player and partner and player != partner:
+                pairs.add(frozenset((player, partner)))
+    return pairs
+
+
+class _CourtCosts:
+    """Best split of a group of four and its cost (score gap plus repeat-partner penalties), memoized per group."""
+
+    def __init__(self, scores, avoid_partners, penalty):
+        self.scores = scores
+        self.avoid_partners = avoid_partners
+        self.penalty = penalty
+        self.memo = {}
+
+    def __call__(self, group):
+        key = frozenset(group)
+        if key not in self.memo:
+            group = sorted(group)
+            best = None
+            for team1_pos, team2_pos in DOUBLES_SPLITS:
+                team1 = tuple(group[i] for i in team1_pos)
+                team2 = tuple(group[i] for i in team2_pos)
+                gap = abs(sum(self.scores.get(p, 0) for p in team1) - sum(self.scores.get(p, 0) for p in team2))
+                repeats = (frozenset(team1) in self.avoid_partners) + (frozenset(team2) in self.avoid_partners)
+                cost = gap + self.penalty * repeats
+                if best is None or cost < best[0]:
+                    best = (cost, team1, team2)
+            self.memo[key] = best
+        return self.memo[key]
+
+    def best_resplit(self, players):
+        """(total cost, court a, court b) of the cheapest way to split eight players into two courts,
+        with every split scored at once."""
+        scores = np.array([self.scores.get(p, 0) for p in players], dtype=float)
+        repeats = np.array([[frozenset((p, q)) in self.avoid_partners for q in players] for p in players], dtype=float)
+        courts = COURT_PAIR_SPLITS
+        team1 = courts[..., [list(team1) for team1, _ in DOUBLES_SPLITS]]  # (splits, court, team split, player)
+        team2 = courts[..., [list(team2) for _, team2 in DOUBLES_SPLITS]]
+        cost = (np.abs(scores[team1].sum(axis=-1) - scores[team2].sum(axis=-1))
+                + self.penalty * (repeats[team1[..., 0], team1[..., 1]] + repeats[team2[..., 0], team2[..., 1]]))
+        totals = cost.min(axis=-1).sum(axis=-1)
+        best = int(np.argmin(totals))
+        return totals[best], [players[i] for i in courts[best, 0]], [players[i] for i in courts[best, 1]]
+
+
+def _exhaustive_groups(players, court_cost):
+    """Lowest-cost grouping of the players into fours, searched over every grouping with the
+    remaining-player sets memoized."""
+    memo = {}
+
+    def best(remaining):
+        if not remaining:
+            return 0.0, []
+        if remaining not in memo:
+            first, rest = remaining[0], remaining[1:]
+            found = None
+            for others in combinations(rest, 3):
+                group = (first,) + others
+                left = tuple(p for p in rest if p not in others)
+                cost, groups = best(left)
+                cost += court_cost(group)[0]
+                if found is None or cost < found[0]:
+                    found = (cost, [group] + groups)
+            memo[remaining] = found
+        return memo[remaining]
+
+    return best(tuple(players))[1]
+
+
+def _improve_groups(groups, court_cost):
+    """Re-splits the eight players of two courts in the cheapest way (which covers every one- and
+    two-player swap between them) until no pair of courts can be improved. Only pairs with a court
+    that changed since they were last tried are tried again."""
+    pending = set(combinations(range(len(groups)), 2))
+    while pending:
+        a, b = pending.pop()
+        current = court_cost(groups[a])[0] + court_cost(groups[b])[0]
+        cost, group_a, group_b = court_cost.best_resplit(groups[a] + groups[b])
+        if cost < current - 1e-9:
+            groups[a], groups[b] = group_a, group_b
+            pending.update((min(c, other), max(c, other)) for c in (a, b) for other in range(len(groups)) if other not in (a, b))
+    return groups
+
+
+def _local_search_groups(players, scores, court_cost):
+    """Groups of four improved by swapping one or two players between courts until no swap lowers
+    the total cost, keeping the best of several starts.
+
+    The first start is groups of similar strength (players in score order), which already keeps
+    most courts close; LOCAL_SEARCH_RESTARTS more start from shuffles drawn with a fixed seed, so
+    the same players always get the same courts.
+    """
+    ordered = sorted(players, key=lambda p: -scores.get(p, 0))
+    rng = random.Random(LOCAL_SEARCH_SEED)
+    starts = [ordered] + [rng.sample(ordered, len(ordered)) for _ in range(LOCAL_SEARCH_RESTARTS)]
+    best = None
+    for start in starts:
+        groups = _improve_groups([start[i:i + 4] for i in range(0, len(start), 4)], court_cost)
+        cost = sum(court_cost(group)[0] for group in groups)
+        if best is None or cost < best[0] - 1e-9:
+            best = (cost, groups)
+    return best[1]
+
+
+def balance_courts(players, scores, courts=None, avoid_partners=(), penalty=REPEAT_PARTNER_PENALTY):
+    """Splits the available players into balanced doubles courts.
+
+    Each court is split into the two teams with the closest total score; partnerships listed in
+    avoid_partners (frozenset pairs) cost `penalty` each. Up to EXHAUSTIVE_MAX_PLAYERS players the
+    grouping with the lowest total cost is found exactly, above that by local search. Players are
+    taken in the given order, so when they do not fill whole courts (or fill more than `courts`)
+    the last ones sit out.
+
+    Returns (courts, bench): courts is a list of (team1, team2) tuples, weakest court last.
+    """
+    players = list(dict.fromkeys(players))
+    court_count = len(players) // 4 if courts is None else min(courts, len(players) // 4)
+    playing, bench = players[:court_count * 4], players[court_count * 4:]
+    court_cost = _CourtCosts(scores, set(avoid_partners), penalty)
+    if len(playing) <= EXHAUSTIVE_MAX_PLAYERS:
+        groups = _exhaustive_groups(playing, court_cost)
+    else:
+        groups = _local_search_groups(playing, scores, court_cost)
+    groups.sort(key=lambda group: -sum(scores.get(p, 0) for p in group))
+    return [court_cost(group)[1:] for group in groups], bench
@@ -0,0 +1,371 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from constants import EXCLUDED_PLAYERS, GD_SCALE, PLAYER_COLUMNS
+from ratings import match_strength_terms, solve_strengths, strength_ratings, strength_terms
+from scores import SET_COLUMNS, add_score_columns, ensure_score_columns
+
+TREND_WINDOW = 5  # Matches shown in a player's recent form
+NO_TREND = 'No recent matches'
+RANK_COLUMNS = [
+    "Rank", "Profile", "Player", "Points", "Win %", "Matches", "Doubles Matches", "Singles Matches",
+    "Wins", "Losses", "Games Won", "Game Diff Avg", "Cumulative Game Diff", "Strength", "Recent Trend",
+]
+RANKED_COLUMNS = ["match_id", "date", "match_type", "winner"] + PLAYER_COLUMNS + SET_COLUMNS  # What a ranking is computed from
+
+
+def recent_trends(matches, max_matches=TREND_WINDOW):
+    """Returns {player: recent form} for every player in one pass, e.g. "W L W" newest first.
+
+    Each player's last max_matches matches are taken from a date-sorted long frame with
+    groupby().head(); ties use up a slot but add no letter. Players whose recent matches
+    are all ties are left out, and callers show 'No recent matches' for them.
+    """
+    if matches.empty:
+        return {}
+    matches = matches.reset_index(drop=True)
+    dates = pd.to_datetime(matches["date"], errors="coerce")
+    recency = np.empty(len(matches), dtype=int)
+    recency[dates.sort_values(ascending=False, kind="stable").index.to_numpy()] = np.arange(len(matches))
+
+    long = pd.concat(
+        [pd.DataFrame({"match_pos": np.arange(len(matches)), "player": matches[col].to_numpy()})
+         for col in PLAYER_COLUMNS if col in matches.columns],
+        ignore_index=True,
+    )
+    long = long[long["player"].notna()].drop_duplicates(subset=["match_pos", "player"])
+    long["recency"] = recency[long["match_pos"].to_numpy()]
+    long = long.sort_values("recency", kind="stable").groupby("player", sort=False).head(max_matches)
+
+    pos = long["match_pos"].to_numpy()
+    player = long["player"].to_numpy()
+    is_doubles = (matches["match_type"] == "Doubles").to_numpy()[pos]
+    winner = matches["winner"].to_numpy()[pos]
+    in_team1 = (matches["team1_player1"].to_numpy()[pos] == player) | (is_doubles & (matches["team1_player2"].to_numpy()[pos] == player))
+    in_team2 = (matches["team2_player1"].to_numpy()[pos] == player) | (is_doubles & (matches["team2_player2"].to_numpy()[pos] == player))
+    won = (in_team1 & (winner == "Team 1")) | (in_team2 & (winner == "Team 2"))
+    long["letter"] = np.select([won, winner != "Tie"], ["W", "L"], default="")
+
+    letters = long[long["letter"] != ""]
+    return letters.groupby("player", sort=False)["letter"].agg(" ".join).to_dict()
+
+
+def get_player_trend(player, matches, max_matches=TREND_WINDOW):
+    return recent_trends(matches, max_matches).get(player, NO_TREND)
+
+
+def player_match_frame(matches):
+    """Melts matches into one row per (match, player) with the team, result and game figures seen by that player.
+
+    Singles use only the first player column of each team. Visitors and empty slots are dropped.
+    """
+    matches = ensure_score_columns(matches).reset_index(drop=True)
+    team1_games = matches["t1_games"].to_numpy()
+    team2_games = matches["t2_games"].to_numpy()
+    set_count = matches["set_count"].to_numpy()
+    gd_sum = matches["match_gd"].to_numpy()
+    # Per-set game diff averages are kept in exact sixths (a match has 1-3 sets) so sums never drift
+    gd_avg = np.divide(gd_sum * GD_SCALE, set_count, out=np.zeros(len(matches)), where=set_count > 0).round().astype(int)
+
+    wide = pd.DataFrame({
+        "match_pos": np.arange(len(matches)),
+        "is_doubles": (matches["match_type"] == "Doubles").to_numpy(),
+        "winner": matches["winner"].to_numpy(),
+        "team1_games": team1_games,
+        "team2_games": team2_games,
+        "gd_sum": gd_sum,
+        "gd_avg": gd_avg,
+    })
+    for col in PLAYER_COLUMNS:
+        wide[col] = matches[col].to_numpy() if col in matches.columns else None
+
+    long = wide.melt(
+        id_vars=["match_pos", "is_doubles", "winner", "team1_games", "team2_games", "gd_sum", "gd_avg"],
+        value_vars=PLAYER_COLUMNS, var_name="slot", value_name="player",
+    )
+    long["slot"] = long["slot"].map({col: i for i, col in enumerate(PLAYER_COLUMNS)})
+    long = long.sort_values(["match_pos", "slot"], kind="stable").reset_index(drop=True)
+    in_play = long["is_doubles"] | long["slot"].isin([0, 2])
+    has_player = long["player"].notna() & (long["player"].astype(str) != "") & ~long["player"].isin(EXCLUDED_PLAYERS)
+    long = long[in_play & has_player].reset_index(drop=True)
+
+    long["team"] = np.where(long["slot"] < 2, 1, 2)
+    sign = np.where(long["team"] == 1, 1, -1)
+    long["won"] = long["winner"].to_numpy() == np.where(long["team"] == 1, "Team 1", "Team 2")
+    long["lost"] = long["winner"].to_numpy() == np.where(long["team"] == 1, "Team 2", "Team 1")
+    long["tied"] = ~long["winner"].isin(["Team 1", "Team 2"])
+    long["games"] = np.where(long["team"] == 1, long["team1_games"], long["team2_games"])
+    long["set_diff"] = sign * long["gd_sum"]
+    long["game_diff"] = sign * long["gd_avg"]
+    return long
+
+
+def partner_stats_from(long):
+    """Builds {player: {partner: {'wins', 'losses', 'ties', 'matches', 'game_diff_sum'}}} for doubles teammates.
+
+    Players and partners keep the order in which they first appear in the matches.
+    """
+    doubles = long[long["is_doubles"]]
+    pairs = doubles.merge(doubles[["match_pos", "team", "player", "slot"]], on=["match_pos", "team"], suffixes=("", "_partner"))
+    pairs = pairs[pairs["player"] != pairs["player_partner"]].sort_values(["match_pos", "slot", "slot_partner"], kind="stable")
+    grouped = pairs.groupby(["player", "player_partner"], sort=False).agg(
+        wins=("won", "sum"), losses=("lost", "sum"), ties=("tied", "sum"),
+        matches=("match_pos", "size"), game_diff_sum=("set_diff", "sum"),
+    )
+    partner_stats = {}
+    for (player, partner), row in zip(grouped.index, grouped.itertuples(index=False)):
+        partner_stats.setdefault(player, {})[partner] = {
+            'wins': int(row.wins), 'losses': int(row.losses), 'ties': int(row.ties),
+            'matches': int(row.matches), 'game_diff_sum': int(row.game_diff_sum),
+        }
+    return partner_stats
+
+
+def filter_matches(matches, match_type=None, date_window=None):
+    """Selects the matches a ranking view covers: one match_type (None for all) and an inclusive (start, end) date window."""
+    if match_type:
+        matches = matches[matches["match_type"] == match_type]
+    if date_window:
+        start, end = date_window
+        dates = pd.to_datetime(matches["date"], errors="coerce")
+        in_window = dates.notna()
+        if start is not None:
+            in_window &= dates >= pd.Timestamp(start)
+        if end is not None:
+            in_window &= dates <= pd.Timestamp(end)
+        matches = matches[in_window]
+    return matches
+
+
+def _ranked_row_hashes(matches):
+    """One hash per match over RANKED_COLUMNS, in match_id order, with dates compared as timestamps."""
+    matches = matches.reindex(columns=RANKED_COLUMNS).sort_values("match_id", kind="stable")
+    matches = matches.assign(date=pd.to_datetime(matches["date"], errors="coerce"))
+    return pd.util.hash_pandas_object(matches.astype(str), index=False).to_numpy()
+
+
+def differs_only_by(before, after, removed_ids=(), added_ids=()):
+    """True if `after` is `before` with exactly the removed_ids rows taken out and the added_ids rows
+    put in (an edit removes and adds the same id).
+
+    A reload after a write can also pick up other sessions' writes; counters moved forward by only
+    our own rows would then be wrong for the reloaded data, so any other difference returns False.
+    This hashes every unchanged row of both frames, so it is O(n) in the number of matches.
+    """
+    changed = set(removed_ids) | set(added_ids)
+    before_changed = before["match_id"].isin(changed).to_numpy()
+    after_changed = after["match_id"].isin(changed).to_numpy()
+    if sorted(map(str, before["match_id"][before_changed])) != sorted(map(str, removed_ids)):
+        return False
+    if sorted(map(str, after["match_id"][after_changed])) != sorted(map(str, added_ids)):
+        return False
+    rest_before, rest_after = before[~before_changed], after[~after_changed]
+    if len(rest_before) != len(rest_after):
+        return False
+    return bool((_ranked_row_hashes(rest_before) == _ranked_row_hashes(rest_after)).all())
+
+
+def player_totals(long):
+    """Aggregates a player-match frame into per-player counters, in first-appearance order."""
+    long = long.assign(points=np.select([long["won"], long["lost"]], [3.0, 1.0], default=1.5))
+    return long.groupby("player", sort=False).agg(
+        points=("points", "sum"), wins=("won", "sum"), losses=("lost", "sum"), matches=("match_pos", "size"),
+        doubles=("is_doubles", "sum"), games_won=("games", "sum"), game_diff=("game_diff", "sum"),
+        cumulative_game_diff=("set_diff", "sum"),
+    )
+
+
+def player_index(players_df):
+    """Maps each player name to its players_df row as a dict; the first row wins for duplicated names."""
+    if "name" not in players_df.columns:
+        return {}
+    first_rows = players_df.drop_duplicates(subset="name")
+    return dict(zip(first_rows["name"], first_rows.to_dict("records")))
+
+
+def rank_frame(stats, players_df, trends, strengths=None):
+    """Builds the sorted rank_df from per-player counters (a frame shaped like player_totals)
+    plus {player: recent form} and {player: strength rating}."""
+    if stats.empty:
+        return pd.DataFrame()
+    profiles = {name: info.get("profile_image_url", "") for name, info in player_index(players_df).items()}
+    strengths = strengths or {}
+
+    players = stats.index.tolist()
+    matches = stats["matches"].astype(int)
+    rank_df = pd.DataFrame({
+        "Rank": [f"🏆 {i}" for i in range(1, len(players) + 1)],
+        "Profile": [profiles.get(p, "") for p in players],
+        "Player": players,
+        "Points": stats["points"].astype(float).to_numpy(),
+        "Win %": [round(w / m * 100, 2) for w, m in zip(stats["wins"], matches)],
+        "Matches": matches.to_numpy(),
+        "Doubles Matches": stats["doubles"].astype(int).to_numpy(),
+        "Singles Matches": (matches - stats["doubles"]).astype(int).to_numpy(),
+        "Wins": stats["wins"].astype(int).to_numpy(),
+        "Losses": stats["losses"].astype(int).to_numpy(),
+        "Games Won": stats["games_won"].astype(int).to_numpy(),
+        "Game Diff Avg": [round(gd / (GD_SCALE * m), 2) for gd, m in zip(stats["game_diff"], matches)],
+        "Cumulative Game Diff": stats["cumulative_game_diff"].astype(int).to_numpy(),
+        "Strength": [strengths.get(p, 0.0) for p in players],
+        "Recent Trend": [trends.get(p, NO_TREND) for p in players],
+    }, columns=RANK_COLUMNS)
+
+    rank_df = rank_df.sort_values(
+        by=["Points", "Win %", "Game Diff Avg", "Games Won", "Player"],
+        ascending=[False, False, False, False, True]
+    ).reset_index(drop=True)
+    rank_df["Rank"] = [f"🏆 {i}" for i in range(1, len(rank_df) + 1)]
+    return rank_df
+
+
+def compute_rankings(matches_to_rank, players_df, trend_window=TREND_WINDOW):
+    """Ranks players over the given matches and returns (rank_df, partner_stats).
+
+    Win = 3 points, loss = 1, tie = 1.5. Game Diff Avg is the mean per-set game difference of each
+    match, averaged over matches; Cumulative Game Diff sums the raw set differences. Strength is the
+    opponent-adjusted rating from ratings.strength_ratings().
+    """
+    if matches_to_rank.empty:
+        return pd.DataFrame(), {}
+    long = player_match_frame(matches_to_rank)
+    if long.empty:
+        return pd.DataFrame(), {}
+    rank_df = rank_frame(player_totals(long), players_df, recent_trends(matches_to_rank, trend_window), strength_ratings(long))
+    return rank_df, partner_stats_from(long)
+
+
+class RankingAccumulator:
+    """Per-player ranking counters, partner_stats and the Strength fit's normal equations that can
+    take or give back one match at a time.
+
+    rebuild() loads the counters from a full matches frame; apply() and retract() add or remove a
+    single match (a row with the parsed score columns), touching only the counters of its players.
+    results() then only has to solve the players x players Strength system, not re-melt the matches.
+    `version` records which data version the counters reflect, so a caller that finds it stale
+    simply rebuilds.
+    """
+
+    def __init__(self, match_type=None):
+        self.match_type = match_type
+        self.version = None
+        self.counters = {}
+        self.partner_stats = {}
+        self.strength_normal = {}  # (player, other) -> coefficient, see ratings.strength_terms
+        self.strength_rhs = {}
+        self._lock = threading.RLock()
+
+    def covers(self, row):
+        return self.match_type is None or row.get("match_type") == self.match_type
+
+    def rebuild(self, matches, version):
+        long = player_match_frame(filter_matches(matches, self.match_type)) if not matches.empty else None
+        has_rows = long is not None and not long.empty
+        with self._lock:
+            self.counters = player_totals(long).to_dict("index") if has_rows else {}
+            self.partner_stats = partner_stats_from(long) if has_rows else {}
+            self.strength_normal, self.strength_rhs = strength_terms(long) if has_rows else ({}, {})
+            self.version = version
+
+    def apply(self, row, sign=1):
+        """Adds one match to the counters (sign=-1 removes it again), with the same figures
+        player_match_frame() and player_totals() give that match."""
+        if not self.covers(row):
+            return
+        if "match_gd" not in row:
+            row = add_score_columns(pd.DataFrame([dict(row)])).iloc[0]
+        is_doubles = row.get("match_type") == "Doubles"
+        winner = row.get("winner")
+        set_count, gd_sum = int(row["set_count"]), int(row["match_gd"])
+        gd_avg = round(gd_sum * GD_SCALE / set_count) if set_count > 0 else 0
+        games = {1: int(row["t1_games"]), 2: int(row["t2_games"])}
+
+        teams = {1: [], 2: []}
+        for slot, col in enumerate(PLAYER_COLUMNS):
+            player = row.get(col)
+            if (is_doubles or slot in (0, 2)) and isinstance(player, str) and player and player not in EXCLUDED_PLAYERS:
+                teams[1 if slot < 2 else 2].append(player)
+        if not teams[1] and not teams[2]:
+            return
+
+        with self._lock:
+            normal, rhs = match_strength_terms(teams, gd_avg)
+            for key, value in normal.items():
+                self.strength_normal[key] = self.strength_normal.get(key, 0.0) + sign * value
+            for player, value in rhs.items():
+                self.strength_rhs[player] = self.strength_rhs.get(player, 0.0) + sign * value
+            for team, players in teams.items():
+                won, lost = winner == f"Team {team}", winner == f"Team {3 - team}"
+                side = 1 if team == 1 else -1
+                totals = {
+                    "points": 3.0 if won else 1.0 if lost else 1.5, "wins": int(won), "losses": int(lost),
+                    "matches": 1, "doubles": int(is_doubles), "games_won": games[team],
+                    "game_diff": side * gd_avg, "cumulative_game_diff": side * gd_sum,
+                }
+                for player in players:
+                    current = self.counters.setdefault(player, dict.fromkeys(totals, 0))
+                    for key, value in totals.items():
+                        current[key] += sign * value
+                    if current["matches"] <= 0:
+                        del self.counters[player]
+                        self.strength_rhs.pop(player, None)
+                        self.strength_normal = {pair: value for pair, value in self.strength_normal.items() if player not in pair}
+                if not is_doubles:
+                    continue
+                stats = {
+                    "wins": int(won), "losses": int(lost), "ties": int(not won and not lost),
+                    "matches": 1, "game_diff_sum": side * gd_sum,
+                }
+                for player in players:
+                    for partner in players:
+                        if partner == player:
+                            continue
+                        current = self.partner_stats.setdefault(player, {}).setdefault(partner, dict.fromkeys(stats, 0))
+                        for key, value in stats.items():
+                            current[key] += sign * value
+                        if current["matches"] <= 0:
+                            del self.partner_stats[player][partner]
+                        if not self.partner_stats[player]:
+                            del self.partner_stats[player]
+
+    def retract(self, row):
+        self.apply(row, sign=-1)
+
+    def advance(self, from_version, to_version, removed=(), added=()):
+        """Retracts removed rows and applies added ones if the counters are at from_version.
+
+        Returns False and leaves the counters untouched (stale) if they are at any other version.
+        The caller must only advance when to_version is from_version plus exactly these rows
+        (see differs_only_by()); otherwise it leaves the counters stale so the next read rebuilds.
+        """
+        with self._lock:
+            if self.version != from_version:
+                return False
+            for row in removed:
+                self.retract(row)
+            for row in added:
+                self.apply(row)
+            self.version = to_version
+            return True
+
+    def snapshot(self, matches, players_df, version, trend_window=TREND_WINDOW):
+        """results() for the given data version, checked, rebuilt from `matches` if the counters are
+        at any other version, and read in one critical section so another version can't slip in."""
+        with self._lock:
+            if self.version != version:
+                self.rebuild(matches, version)
+            return self.results(matches, players_df, trend_window)
+
+    def results(self, matches, players_df, trend_window=TREND_WINDOW):
+        """Returns (rank_df, partner_stats) from the current counters; trends come from the given matches."""
+        with self._lock:
+            stats = pd.DataFrame.from_dict(self.counters, orient="index")
+            partner_stats = {player: {partner: dict(s) for partner, s in partners.items()}
+                             for player, partners in self.partner_stats.items()}
+            strengths = solve_strengths(self.strength_normal, self.strength_rhs)
+        if stats.empty:
+            return pd.DataFrame(), {}
+        trends = recent_trends(filter_matches(matches, self.match_type), trend_window)
+        return rank_frame(stats, players_df, trends, strengths), partner_stats
@@ -0,0 +1,202 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from constants import EXCLUDED_PLAYERS, GD_SCALE, PLAYER_COLUMNS
+
+STRENGTH_RIDGE = 1.0  # Pulls players with few matches towards the average (0)
+ELO_START = 1500.0
+ELO_K = 32.0  # Largest rating change a team can get from one match
+ELO_SCALE = 400.0  # Rating gap at which the stronger side is expected to win 10 times out of 11
+ELO_DELTA_COLUMNS = ["match_id", "date", "player", "team", "rating_before", "delta"]
+
+
+def strength_terms(long):
+    """Normal equations of the strength fit for a player_match_frame, as ({(player, other): coefficient},
+    {player: right-hand side}).
+
+    Each match says "team 1's average strength minus team 2's average strength is about the
+    per-set game difference of the match". All matches together form a least-squares problem
+    over the match graph whose normal equations are sums over the (player, player) pairs that
+    share a match, so they can also be kept up to date one match at a time (match_strength_terms).
+    """
+    if long.empty:
+        return {}, {}
+    players, player_pos = np.unique(long["player"].to_numpy(), return_inverse=True)
+    size = len(players)
+    team_size = long.groupby(["match_pos", "team"])["player"].transform("size").to_numpy()
+    weight = np.where(long["team"].to_numpy() == 1, 1.0, -1.0) / team_size
+    # game_diff is already signed from the player's side, so weight * margin = game_diff / team_size
+    rhs = np.bincount(player_pos, weights=long["game_diff"].to_numpy() / (GD_SCALE * team_size), minlength=size)
+
+    rows = pd.DataFrame({"match_pos": long["match_pos"].to_numpy(), "player_pos": player_pos, "weight": weight})
+    pairs = rows.merge(rows, on="match_pos", suffixes=("", "_other"))
+    normal = np.bincount(
+        pairs["player_pos"].to_numpy() * size + pairs["player_pos_other"].to_numpy(),
+        weights=pairs["weight"].to_numpy() * pairs["weight_other"].to_numpy(),
+        minlength=size * size,
+    ).reshape(size, size)
+    names = players.tolist()
+    first, second = np.nonzero(normal)
+    return ({(names[i], names[j]): float(normal[i, j]) for i, j in zip(first, second)},
+            dict(zip(names, rhs.tolist())))
+
+
+def match_strength_terms(teams, gd_avg):
+    """One match's contribution to strength_terms(): teams maps 1 and 2 to their rated players and
+    gd_avg is the match's per-set game difference in GD_SCALE units, from team 1's side."""
+    weights = {}
+    rhs = {}
+    for team, players in teams.items():
+        side = 1 if team == 1 else -1
+        for player in players:
+            weights.setdefault(player, 0.0)
+            weights[player] += side / len(players)
+            rhs[player] = rhs.get(player, 0.0) + side * gd_avg / (GD_SCALE * len(players))
+    normal = {(player, other): w * w_other for player, w in weights.items() for other, w_other in weights.items()}
+    return normal, rhs
+
+
+def solve_strengths(normal, rhs):
+    """Returns {player: strength} from strength_terms()-shaped normal equations, solved once with a
+    small ridge term. A strength of 1.5 means the player is worth 1.5 games per set more than an
+    average player against the same opponents."""
+    if not rhs:
+        return {}
+    players = sorted(rhs)
+    positions = {player: i for i, player in enumerate(players)}
+    matrix = STRENGTH_RIDGE * np.eye(len(players))
+    for (player, other), value in normal.items():
+        if player in positions and other in positions:
+            matrix[positions[player], positions[other]] += value
+    strength = np.linalg.solve(matrix, np.array([rhs[player] for player in players]))
+    return dict(zip(players, strength.round(2).tolist()))
+
+
+def strength_ratings(long):
+    """Returns {player: strength} from a player_match_frame, adjusting results for the opposition faced
+    (see strength_terms and solve_strengths)."""
+    return solve_strengths(*strength_terms(long))
+
+
+def _elo_teams(match_type, team1_player1, team1_player2, team2_player1, team2_player2):
+    """Rated players of each team; singles use only the first slot, Visitors and empty slots are skipped."""
+    if match_type != "Doubles":
+        team1_player2 = team2_player2 = None
+    team1 = [p for p in (team1_player1, team1_player2) if isinstance(p, str) and p and p not in EXCLUDED_PLAYERS]
+    team2 = [p for p in (team2_player1, team2_player2) if isinstance(p, str) and p and p not in EXCLUDED_PLAYERS]
+    return team1, team2
+
+
+class EloRatings:
+    """Sequential Elo ratings over singles and doubles, with every player's rating change in every match.
+
+    Matches are played in date order (same-date matches in table order). A doubles team is rated as
+    the average of its players and each player gets the team's full change. rebuild() replays a
+    whole matches frame; apply() plays one match dated on or after the last one without replaying.
+    `version` records which data version the ratings reflect, as in RankingAccumulator.
+    """
+
+    def __init__(self, k=ELO_K, start=ELO_START):
+        self.k = k
+        self.start = start
+        self.version = None
+        self.ratings = {}
+        self.matches_played = {}
+        self.deltas = []  # (match_id, date, player, team, rating_before, delta) in play order
+        self.last_date = None
+        self._lock = threading.RLock()
+
+    def _reset(self):
+        self.ratings = {}
+        self.matches_played = {}
+        self.deltas = []
+        self.last_date = None
+
+    def _play(self, match_id, date, match_type, winner, *players):
+        team1, team2 = _elo_teams(match_type, *players)
+        if not team1 or not team2:
+            return
+        ratings = self.ratings
+        team1_rating = sum(ratings.get(p, self.start) for p in team1) / len(team1)
+        team2_rating = sum(ratings.get(p, self.start) for p in team2) / len(team2)
+        expected = 1 / (1 + 10 ** ((team2_rating - team1_rating) / ELO_SCALE))
+        score = 1.0 if winner == "Team 1" else 0.0 if winner == "Team 2" else 0.5
+        change = self.k * (score - expected)
+        for team, players_, delta in ((1, team1, change), (2, team2, -change)):
+            for player in players_:
+                before = ratings.get(player, self.start)
+                ratings[player] = before + delta
+                self.matches_played[player] = self.matches_played.get(player, 0) + 1
+                self.deltas.append((match_id, date, player, team, before, delta))
+
+    def rebuild(self, matches, version):
+        """Replays every match from the starting rating."""
+        dates = pd.to_datetime(matches["date"], errors="coerce") if not matches.empty else pd.Series(dtype="datetime64[ns]")
+        order = np.argsort(dates.to_numpy(), kind="stable")
+        columns = [matches[col].to_numpy()[order] if col in matches.columns else [None] * len(order)
+                   for col in ["match_id", "match_type", "winner"] + PLAYER_COLUMNS]
+        with self._lock:
+            self._reset()
+            for date, (match_id, match_type, winner, *players) in zip(dates.to_numpy()[order], zip(*columns)):
+                self._play(match_id, date, match_type, winner, *players)
+            self.last_date = dates.max() if dates.notna().any() else None
+            self.version = version
+
+    def can_apply(self, row):
+        date = pd.to_datetime(row.get("date"), errors="coerce")
+        return self.last_date is None or (not pd.isna(date) and date >= self.last_date)
+
+    def apply(self, row):
+        """Plays one match on top of the current ratings. Returns False (and changes nothing) if
+        the match is dated before the last one played, since it would change later results."""
+        with self._lock:
+            if not self.can_apply(row):
+                return False
+            date = pd.to_datetime(row.get("date"), errors="coerce")
+            self._play(row.get("match_id"), date, row.get("match_type"), row.get("winner"),
+                       *(row.get(col) for col in PLAYER_COLUMNS))
+            self.last_date = date
+            return True
+
+    def advance(self, from_version, to_version, removed=(), added=()):
+        """Plays the added rows if the ratings are at from_version and nothing was removed or back-dated.
+
+        Returns False and leaves the ratings untouched otherwise; the caller then rebuilds.
+        """
+        with self._lock:
+            if self.version != from_version or removed:
+                return False
+            added = sorted(added, key=lambda row: pd.to_datetime(row.get("date"), errors="coerce"))
+            if added and not self.can_apply(added[0]):
+                return False
+            for row in added:
+                self.apply(row)
+            self.version = to_version
+            return True
+
+    def snapshot(self, matches, version):
+        """(table(), deltas_frame()) for the given data version, read together under the lock after
+        rebuilding from `matches` if the ratings are at any other version."""
+        with self._lock:
+            if self.version != version:
+                self.rebuild(matches, version)
+            return self.table(), self.deltas_frame()
+
+    def deltas_frame(self):
+        """Every player's rating before and change in each match, in play order."""
+        with self._lock:
+            return pd.DataFrame(self.deltas, columns=ELO_DELTA_COLUMNS)
+
+    def table(self):
+        """Players by current rating, with matches rated and the change from their latest match."""
+        with self._lock:
+            last_change = {player: delta for _, _, player, _, _, delta in self.deltas}
+            table = pd.DataFrame({
+                "Player": list(self.ratings),
+                "Elo": [round(r) for r in self.ratings.values()],
+                "Matches": [self.matches_played[p] for p in self.ratings],
+                "Last Change": [round(last_change[p], 1) for p in self.ratings],
+            })
+        return table.sort_values(by=["Elo", "Player"], ascending=[False, True]).reset_index(drop=True)
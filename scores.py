@@ -0,0 +1,94 @@
+"""Parsed set scores.
+
+Set strings such as "6-4", "7-6(5)" or "Tie Break 10-7" are parsed once, when matches are loaded,
+into typed columns so the rankings, stats and share links read numbers instead of splitting text:
+
+    set{n}_t1, set{n}_t2        games per side (a tie break counts as 7-6 to its winner), <NA> if empty/invalid
+    set{n}_tb                   True if the set was a tie break
+    set{n}_tb_t1, set{n}_tb_t2  tie-break points, <NA> for regular sets
+    set_count                   number of valid sets in the match
+    t1_games, t2_games          games per side over the valid sets
+    match_gd                    t1_games - t2_games
+"""
+import numpy as np
+import pandas as pd
+
+SET_COLUMNS = ["set1", "set2", "set3"]
+TIE_BREAK_LABEL = "Tie Break"
+SET_SCORE_PATTERN = r"^\s*(\d+)\s*-\s*(\d+)\s*(?:\(\d+\))?\s*$"  # "7-6(5)": the loser's tie-break points are ignored
+SET_FIELDS = ["t1", "t2", "tb", "tb_t1", "tb_t2"]
+MATCH_SCORE_COLUMNS = ["set_count", "t1_games", "t2_games", "match_gd"]
+SCORE_COLUMNS = [f"{col}_{field}" for col in SET_COLUMNS for field in SET_FIELDS] + MATCH_SCORE_COLUMNS
+
+
+def parse_set_column(set_scores):
+    """Parses one set column into a frame with the t1, t2, tb, tb_t1 and tb_t2 fields."""
+    text = set_scores.where(set_scores.map(lambda s: isinstance(s, str)), "").astype(str)
+    is_tie_break = text.str.contains(TIE_BREAK_LABEL, regex=False).to_numpy()
+    regular = text.str.extract(SET_SCORE_PATTERN).astype(float)
+    points = text.str.replace(TIE_BREAK_LABEL, "", regex=False).str.extract(SET_SCORE_PATTERN).astype(float)
+    tb_valid = is_tie_break & points[0].notna().to_numpy()
+    tb_team1_won = (points[0] > points[1]).to_numpy()
+
+    team1 = np.where(is_tie_break, np.where(tb_team1_won, 7.0, 6.0), regular[0].to_numpy())
+    team2 = np.where(is_tie_break, np.where(tb_team1_won, 6.0, 7.0), regular[1].to_numpy())
+    valid = np.where(is_tie_break, tb_valid, regular[0].notna().to_numpy())
+    parsed = pd.DataFrame({
+        "t1": np.where(valid, team1, np.nan),
+        "t2": np.where(valid, team2, np.nan),
+        "tb": is_tie_break,
+        "tb_t1": np.where(tb_valid, points[0], np.nan),
+        "tb_t2": np.where(tb_valid, points[1], np.nan),
+    }, index=set_scores.index)
+    for field in ["t1", "t2", "tb_t1", "tb_t2"]:
+        parsed[field] = parsed[field].astype("Int64")
+    return parsed
+
+
+def add_score_columns(matches):
+    """Returns a copy of matches with the parsed score columns (re)computed from set1..set3."""
+    matches = matches.drop(columns=SCORE_COLUMNS, errors="ignore").copy()
+    set_count = np.zeros(len(matches), dtype=int)
+    t1_games = np.zeros(len(matches), dtype=int)
+    t2_games = np.zeros(len(matches), dtype=int)
+    for col in SET_COLUMNS:
+        set_scores = matches[col] if col in matches.columns else pd.Series("", index=matches.index)
+        parsed = parse_set_column(set_scores)
+        for field in SET_FIELDS:
+            matches[f"{col}_{field}"] = parsed[field]
+        valid = parsed["t1"].notna().to_numpy()
+        set_count += valid
+        t1_games += parsed["t1"].fillna(0).to_numpy(dtype=int)
+        t2_games += parsed["t2"].fillna(0).to_numpy(dtype=int)
+    matches["set_count"] = set_count
+    matches["t1_games"] = t1_games
+    matches["t2_games"] = t2_games
+    matches["match_gd"] = t1_games - t2_games
+    return matches
+
+
+def ensure_score_columns(matches):
+    """Adds the parsed score columns if they are missing (e.g. a frame built by hand)."""
+    if all(col in matches.columns for col in SCORE_COLUMNS):
+        return matches
+    return add_score_columns(matches)
+
+
+def regular_set_totals(matches):
+    """Returns (game difference, set count) per match over regular sets only, leaving tie breaks out."""
+    matches = ensure_score_columns(matches)
+    gd_sum = np.zeros(len(matches), dtype=int)
+    set_count = np.zeros(len(matches), dtype=int)
+    for col in SET_COLUMNS:
+        regular = (matches[f"{col}_t1"].notna() & ~matches[f"{col}_tb"]).to_numpy()
+        diff = (matches[f"{col}_t1"] - matches[f"{col}_t2"]).fillna(0).to_numpy(dtype=int)
+        gd_sum += np.where(regular, diff, 0)
+        set_count += regular
+    return gd_sum, set_count
+
+
+def tie_break_winner(row, set_col):
+    """Returns 1 or 2 for the side that won a tie-break set, or None if the set is not a parsed tie break."""
+    if not row.get(f"{set_col}_tb") or pd.isna(row.get(f"{set_col}_tb_t1")):
+        return None
+    return 1 if row[f"{set_col}_tb_t1"] > row[f"{set_col}_tb_t2"] else 2
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from constants import EXCLUDED_PLAYERS, PLAYER_COLUMNS
+
+STREAK_COLUMNS = ["Player", "Current Streak", "Longest Win Streak", "Longest Losing Streak"]
+
+
+def _results(matches):
+    """One row per (player, match) with the match date and +1 for a win, -1 for a loss, 0 for a tie.
+
+    Every non-empty, non-Visitor slot counts; a player listed twice in one match counts once.
+    """
+    dates = pd.to_datetime(matches["date"], errors="coerce").to_numpy()
+    winner = matches["winner"].to_numpy()
+    frames = []
+    for slot, col in enumerate(PLAYER_COLUMNS):
+        if col not in matches.columns:
+            continue
+        team_won = "Team 1" if slot < 2 else "Team 2"
+        team_lost = "Team 2" if slot < 2 else "Team 1"
+        frames.append(pd.DataFrame({
+            "match_pos": np.arange(len(matches)),
+            "date": dates,
+            "player": matches[col].to_numpy(),
+            "result": np.select([winner == team_won, winner == team_lost], [1, -1], 0),
+        }))
+    results = pd.concat(frames, ignore_index=True)
+    has_player = results["player"].map(lambda p: isinstance(p, str) and p != "" and p not in EXCLUDED_PLAYERS)
+    return results[has_player].drop_duplicates(["player", "match_pos"])
+
+
+def compute_streaks(matches):
+    """Current, longest win and longest losing streak for every player, from one run-length pass.
+
+    Each player's results are put in date order (ties of the same date in table order) and ties are
+    dropped, so a tie neither extends nor breaks a streak. Runs of equal results are then found for
+    all players at once: a run starts wherever the player or the result changes. Current Streak is
+    the length of the player's latest run, positive for wins and negative for losses.
+    """
+    if matches.empty:
+        return pd.DataFrame(columns=STREAK_COLUMNS)
+    results = _results(matches)
+    results = results[results["result"] != 0]
+    if results.empty:
+        return pd.DataFrame(columns=STREAK_COLUMNS)
+    results = results.sort_values(["player", "date", "match_pos"], kind="stable", na_position="first")
+    player = results["player"].to_numpy()
+    result = results["result"].to_numpy()
+
+    run_start = np.ones(len(result), dtype=bool)
+    run_start[1:] = (player[1:] != player[:-1]) | (result[1:] != result[:-1])
+    starts = np.flatnonzero(run_start)
+    runs = pd.DataFrame({
+        "player": player[starts],
+        "result": result[starts],
+        "length": np.diff(np.append(starts, len(result))),
+    })
+
+    latest = runs.groupby("player").tail(1).set_index("player")
+    longest = runs.pivot_table(index="player", columns="result", values="length", aggfunc="max", fill_value=0)
+    streaks = pd.DataFrame({
+        "Current Streak": latest["result"] * latest["length"],
+        "Longest Win Streak": longest.get(1, 0),
+        "Longest Losing Streak": longest.get(-1, 0),
+    }).fillna(0).astype(int)
+    return streaks.rename_axis("Player").reset_index()[STREAK_COLUMNS]
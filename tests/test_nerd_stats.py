@@ -0,0 +1,54 @@
+import pandas as pd
+
+from match_index import MatchIndex
+from nerd_stats import _slot_frame, compute_nerd_stats
+from rankings import compute_rankings
+from scores import add_score_columns
+
+COLUMNS = ["match_id", "date", "match_type", "team1_player1", "team1_player2", "team2_player1", "team2_player2",
+           "set1", "set2", "set3", "winner"]
+MATCHES = add_score_columns(pd.DataFrame([
+    ["M1", "2026-01-01 10:00", "Singles", "Anna", "", "Ben", "", "6-4", "6-3", "", "Team 1"],
+    ["M2", "2026-01-02 10:00", "Doubles", "Anna", "Carl", "Ben", "Dora", "4-6", "6-3", "Tie Break 10-7", "Team 1"],
+    ["M3", "2026-01-03 10:00", "Doubles", "Carl", "Visitor", "Dora", "Ben", "2-6", "3-6", "", "Team 2"],
+    ["M4", "2026-01-04 10:00", "Singles", "Carl", "", "Dora", "", "", "", "", "Tie"],
+    ["M5", "2026-01-05 10:00", "Singles", "Visitor", "", "Anna", "", "0-6", "", "", "Team 2"],
+    ["M6", "2026-01-06 10:00", "Doubles", "Visitor", "Dora", "Anna", "Ben", "6-0", "6-0", "", "Team 1"],
+], columns=COLUMNS))
+PLAYERS = pd.DataFrame({"name": ["Anna", "Ben", "Carl", "Dora", "Visitor"]})
+
+
+def test_slot_frame_drops_visitors_empty_slots_and_singles_partners():
+    slots = _slot_frame(MATCHES)
+    assert "Visitor" not in set(slots["player"])
+    assert slots.groupby("match_pos")["player"].apply(list).tolist() == [
+        ["Anna", "Ben"], ["Anna", "Carl", "Ben", "Dora"], ["Carl", "Dora", "Ben"], ["Carl", "Dora"], ["Anna"], ["Dora", "Anna", "Ben"],
+    ]
+
+
+def test_compute_nerd_stats():
+    rank_df, partner_stats = compute_rankings(MATCHES, PLAYERS)
+    stats = compute_nerd_stats(MATCHES, rank_df, partner_stats, MatchIndex(MATCHES), pd.Timestamp("2026-01-04"))
+
+    assert stats["most_effective_partnership"] == (
+        "Anna", "Carl", {"wins": 1, "losses": 0, "ties": 0, "matches": 1, "game_diff_sum": 2})
+    # Dora won M3 with Ben (-7 regular-set games from team 1's side) and M6 with a Visitor (+12);
+    # the Visitor is not counted as a partner
+    assert stats["best_partner"] == ("Dora", {"wins": 2, "gd_sum": 5, "partners": 1})
+    # Regular sets only, from each player's side: Dora -1 + 7 + 12 in M2, M3 and M6
+    assert stats["highest_game_diff"] == ("Dora", 18)
+    assert stats["most_frequent_player"]["Matches"] == 4
+    assert stats["most_wins_player"]["Player"] == "Anna"
+    assert stats["highest_win_percent_player"] is None  # Nobody has played 5 matches yet
+
+    community = stats["community"]
+    assert community["matches"] == 3
+    assert community["active_players"] == 5  # Visitors count as active here
+    assert community["top_winners"].to_dict() == {"Anna": 1, "Dora": 1, "Visitor": 1}
+
+
+def test_compute_nerd_stats_of_no_matches():
+    empty = MATCHES.iloc[:0]
+    stats = compute_nerd_stats(empty, pd.DataFrame(), {}, MatchIndex(empty), pd.Timestamp("2026-01-04"))
+    assert stats["best_partner"] is None and stats["highest_game_diff"] is None
+    assert stats["most_wins_player"] is None and stats["community"]["matches"] == 0
@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from pairing import REPEAT_PARTNER_PENALTY, _CourtCosts, _exhaustive_groups, _local_search_groups, balance_courts
+
+
+def total_cost(groups, court_cost):
+    return sum(court_cost(group)[0] for group in groups)
+
+
+def sample(rng, player_count):
+    players = [f"P{i}" for i in range(player_count)]
+    scores = {player: rng.random() for player in players}
+    avoid = {frozenset(rng.sample(players, 2)) for _ in range(rng.randrange(6))}
+    return players, scores, _CourtCosts(scores, avoid, REPEAT_PARTNER_PENALTY)
+
+
+@pytest.mark.parametrize("player_count", [8, 12])
+def test_local_search_stays_close_to_the_exhaustive_optimum(player_count):
+    rng = random.Random(player_count)
+    gaps = []
+    for _ in range(60):
+        players, scores, court_cost = sample(rng, player_count)
+        optimum = total_cost(_exhaustive_groups(players, court_cost), court_cost)
+        found = _local_search_groups(players, scores, court_cost)
+        assert sorted(p for group in found for p in group) == sorted(players)
+        gaps.append(total_cost(found, court_cost) - optimum)
+    assert max(gaps) < 0.02  # Scores run from 0 to 1
+    assert sum(gap > 1e-9 for gap in gaps) <= 2
+    if player_count == 8:
+        assert max(gaps) < 1e-9  # Re-splitting two courts is already exhaustive
+
+
+def test_local_search_is_repeatable():
+    players, scores, court_cost = sample(random.Random(1), 24)
+    assert _local_search_groups(players, scores, court_cost) == _local_search_groups(players, scores, court_cost)
+
+
+def test_balance_courts_benches_late_arrivals():
+    players = [f"P{i}" for i in range(18)]
+    courts, bench = balance_courts(players, {player: i / 18 for i, player in enumerate(players)})
+    assert bench == ["P16", "P17"]
+    assert sorted(p for team1, team2 in courts for p in team1 + team2) == sorted(players[:16])
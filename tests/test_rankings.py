@@ -0,0 +1,116 @@
+import pandas as pd
+import pytest
+
+from rankings import RankingAccumulator, compute_rankings, filter_matches, recent_trends
+from scores import add_score_columns
+
+COLUMNS = ["match_id", "date", "match_type", "team1_player1", "team1_player2", "team2_player1", "team2_player2",
+           "set1", "set2", "set3", "winner"]
+# Games per match, from team 1's side: M1 +5 over 2 sets, M2 +2 over 3 (the tie break counts 7-6),
+# M3 -7 over 2, M4 no valid sets, M5 -6 over 1 set
+MATCHES = pd.DataFrame([
+    ["M1", "2026-01-01 10:00", "Singles", "Anna", "", "Ben", "", "6-4", "6-3", "", "Team 1"],
+    ["M2", "2026-01-02 10:00", "Doubles", "Anna", "Carl", "Ben", "Dora", "4-6", "6-3", "Tie Break 10-7", "Team 1"],
+    ["M3", "2026-01-03 10:00", "Doubles", "Carl", "Visitor", "Dora", "Ben", "2-6", "3-6", "", "Team 2"],
+    ["M4", "2026-01-04 10:00", "Singles", "Carl", "", "Dora", "", "", "", "", "Tie"],
+    ["M5", "2026-01-05 10:00", "Singles", "Visitor", "", "Anna", "", "0-6", "", "", "Team 2"],
+], columns=COLUMNS)
+PLAYERS = pd.DataFrame({"name": ["Anna", "Ben", "Carl", "Dora", "Visitor"],
+                        "profile_image_url": ["a.png", "", "", "", ""]})
+
+
+def by_player(rank_df):
+    return rank_df.set_index("Player")
+
+
+def test_compute_rankings_matches_hand_computed_figures():
+    rank_df, partner_stats = compute_rankings(add_score_columns(MATCHES), PLAYERS)
+
+    assert rank_df["Player"].tolist() == ["Anna", "Dora", "Carl", "Ben"]  # Dora beats Carl on Game Diff Avg
+    assert rank_df["Rank"].tolist() == ["🏆 1", "🏆 2", "🏆 3", "🏆 4"]
+    ranks = by_player(rank_df)
+    assert ranks.loc["Anna", "Profile"] == "a.png"
+    assert ranks["Points"].to_dict() == {"Anna": 9.0, "Dora": 5.5, "Carl": 5.5, "Ben": 5.0}
+    assert ranks["Win %"].to_dict() == {"Anna": 100.0, "Dora": 33.33, "Carl": 33.33, "Ben": 33.33}
+    assert ranks["Matches"].to_dict() == {"Anna": 3, "Dora": 3, "Carl": 3, "Ben": 3}
+    assert ranks["Doubles Matches"].to_dict() == {"Anna": 1, "Dora": 2, "Carl": 2, "Ben": 2}
+    assert ranks["Singles Matches"].to_dict() == {"Anna": 2, "Dora": 1, "Carl": 1, "Ben": 1}
+    assert ranks["Wins"].to_dict() == {"Anna": 3, "Dora": 1, "Carl": 1, "Ben": 1}
+    assert ranks["Losses"].to_dict() == {"Anna": 0, "Dora": 1, "Carl": 1, "Ben": 2}
+    assert ranks["Games Won"].to_dict() == {"Anna": 35, "Dora": 27, "Carl": 22, "Ben": 34}
+    # Per-match averages in sixths: Anna 15 + 4 + 36 = 55 over 3 matches -> 55 / 18 = 3.0556
+    assert ranks["Game Diff Avg"].to_dict() == {"Anna": 3.06, "Dora": 0.94, "Carl": -0.94, "Ben": 0.11}
+    assert ranks["Cumulative Game Diff"].to_dict() == {"Anna": 13, "Dora": 5, "Carl": -5, "Ben": 0}
+    assert ranks["Recent Trend"].to_dict() == {"Anna": "W W W", "Dora": "W L", "Carl": "L W", "Ben": "W L L"}
+    assert "Visitor" not in ranks.index
+
+    assert partner_stats == {
+        "Anna": {"Carl": {"wins": 1, "losses": 0, "ties": 0, "matches": 1, "game_diff_sum": 2}},
+        "Carl": {"Anna": {"wins": 1, "losses": 0, "ties": 0, "matches": 1, "game_diff_sum": 2}},
+        "Ben": {"Dora": {"wins": 1, "losses": 1, "ties": 0, "matches": 2, "game_diff_sum": 5}},
+        "Dora": {"Ben": {"wins": 1, "losses": 1, "ties": 0, "matches": 2, "game_diff_sum": 5}},
+    }
+
+
+def test_singles_view_and_trend_window():
+    rank_df, partner_stats = compute_rankings(filter_matches(add_score_columns(MATCHES), "Singles"), PLAYERS)
+    ranks = by_player(rank_df)
+    assert ranks["Points"].to_dict() == {"Anna": 6.0, "Carl": 1.5, "Dora": 1.5, "Ben": 1.0}
+    assert partner_stats == {}
+    assert recent_trends(MATCHES, 2)["Anna"] == "W W"
+    assert "Carl" in recent_trends(MATCHES, 2) and recent_trends(MATCHES, 1).get("Carl") is None  # A tie uses the slot
+
+
+def test_compute_rankings_of_nothing():
+    assert compute_rankings(MATCHES.iloc[:0], PLAYERS)[0].empty
+    visitors_only = MATCHES.iloc[[4]].assign(team2_player1="Visitor")
+    rank_df, partner_stats = compute_rankings(visitors_only, PLAYERS)
+    assert rank_df.empty and partner_stats == {}
+
+
+@pytest.mark.parametrize("match_type", [None, "Doubles", "Singles"])
+def test_accumulator_apply_and_retract_match_a_rebuild(match_type):
+    matches = add_score_columns(MATCHES)
+    expected, expected_partners = compute_rankings(filter_matches(matches, match_type), PLAYERS)
+
+    rebuilt = RankingAccumulator(match_type)
+    rebuilt.rebuild(matches, "v1")
+    pd.testing.assert_frame_equal(rebuilt.results(matches, PLAYERS)[0], expected)
+
+    incremental = RankingAccumulator(match_type)
+    incremental.rebuild(matches.iloc[:2], "v0")
+    for _, row in matches.iloc[2:].iterrows():
+        incremental.apply(row)
+    rank_df, partner_stats = incremental.results(matches, PLAYERS)
+    pd.testing.assert_frame_equal(rank_df, expected, check_exact=False, atol=1e-9)
+    assert partner_stats == expected_partners
+
+    # Taking M2 back out again gives the rankings of the other four matches
+    incremental.retract(matches.iloc[1])
+    rest = matches.drop(index=1)
+    pd.testing.assert_frame_equal(incremental.results(rest, PLAYERS)[0],
+                                  compute_rankings(filter_matches(rest, match_type), PLAYERS)[0],
+                                  check_exact=False, atol=1e-9)
+
+
+def test_accumulator_snapshot_follows_the_requested_version():
+    matches = add_score_columns(MATCHES)
+    accumulator = RankingAccumulator()
+    accumulator.rebuild(matches.iloc[:4], "v1")
+    assert accumulator.advance("v1", "v2", added=[matches.iloc[4]])
+    assert not accumulator.advance("v1", "v3")
+    pd.testing.assert_frame_equal(accumulator.snapshot(matches, PLAYERS, "v2")[0], compute_rankings(matches, PLAYERS)[0],
+                                  check_exact=False, atol=1e-9)
+    pd.testing.assert_frame_equal(accumulator.snapshot(matches.iloc[:3], PLAYERS, "v9")[0],
+                                  compute_rankings(matches.iloc[:3], PLAYERS)[0])
+    assert accumulator.version == "v9"
+
+
+def test_set_win_percentage_skips_tie_breaks_and_visitors():
+    pytest.importorskip("streamlit")
+    from ui import calculate_set_win_percentage
+
+    set_wins = calculate_set_win_percentage(MATCHES)
+    assert "Visitor" not in set_wins
+    assert set_wins["Anna"] == pytest.approx(80.0)  # 2 of 2, then 1 of 2 regular sets, then 1 of 1
+    assert set_wins["Ben"] == pytest.approx(100 * 3 / 6)
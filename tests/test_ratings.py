@@ -0,0 +1,79 @@
+import pandas as pd
+import pytest
+
+from rankings import player_match_frame
+from ratings import ELO_K, ELO_SCALE, ELO_START, EloRatings, match_strength_terms, solve_strengths, strength_ratings, strength_terms
+
+COLUMNS = ["match_id", "date", "match_type", "team1_player1", "team1_player2", "team2_player1", "team2_player2",
+           "set1", "set2", "set3", "winner"]
+MATCHES = pd.DataFrame([
+    ["M1", "2026-02-01 10:00", "Singles", "Anna", "", "Ben", "", "6-4", "6-2", "", "Team 1"],
+    ["M2", "2026-02-02 10:00", "Doubles", "Anna", "Carl", "Ben", "Dora", "4-6", "3-6", "", "Team 2"],
+], columns=COLUMNS)
+
+
+def expected_score(rating, other):
+    return 1 / (1 + 10 ** ((other - rating) / ELO_SCALE))
+
+
+def test_solve_strengths_of_a_known_system():
+    # Ridge 1 on top of [[1, -1], [-1, 1]]: [[2, -1], [-1, 2]] x = [2, -2] gives x = [2/3, -2/3]
+    normal = {("A", "A"): 1.0, ("A", "B"): -1.0, ("B", "A"): -1.0, ("B", "B"): 1.0}
+    assert solve_strengths(normal, {"A": 2.0, "B": -2.0}) == {"A": 0.67, "B": -0.67}
+    assert solve_strengths({}, {}) == {}
+
+
+def test_strength_ratings_of_one_match():
+    # +6 games over 2 sets is +3 a set; with the ridge that splits into +1 and -1
+    long = player_match_frame(MATCHES.iloc[[0]])
+    assert strength_ratings(long) == {"Anna": 1.0, "Ben": -1.0}
+    normal, rhs = strength_terms(long)
+    assert (normal, rhs) == match_strength_terms({1: ["Anna"], 2: ["Ben"]}, 18)
+
+
+def test_elo_after_one_and_two_matches():
+    engine = EloRatings()
+    engine.rebuild(MATCHES.iloc[[0]], "v1")
+    assert engine.ratings == {"Anna": ELO_START + ELO_K / 2, "Ben": ELO_START - ELO_K / 2}
+
+    assert engine.apply(MATCHES.iloc[1])
+    team1 = (ELO_START + ELO_K / 2 + ELO_START) / 2
+    team2 = (ELO_START - ELO_K / 2 + ELO_START) / 2
+    change = ELO_K * (0 - expected_score(team1, team2))  # Team 2 won as the underdog
+    assert engine.ratings["Anna"] == pytest.approx(ELO_START + ELO_K / 2 + change)
+    assert engine.ratings["Carl"] == pytest.approx(ELO_START + change)
+    assert engine.ratings["Ben"] == pytest.approx(ELO_START - ELO_K / 2 - change)
+    assert engine.ratings["Dora"] == pytest.approx(ELO_START - change)
+    assert engine.matches_played == {"Anna": 2, "Ben": 2, "Carl": 1, "Dora": 1}
+
+    deltas = engine.deltas_frame()
+    assert deltas[deltas["player"] == "Anna"]["delta"].tolist() == pytest.approx([ELO_K / 2, change])
+    assert engine.table()["Player"].tolist() == ["Dora", "Ben", "Anna", "Carl"]
+
+
+def test_elo_skips_visitors_and_scores_ties_as_half():
+    matches = MATCHES.iloc[[0]].assign(team2_player1="Visitor")
+    engine = EloRatings()
+    engine.rebuild(pd.concat([matches, MATCHES.iloc[[0]].assign(winner="Tie")]), "v1")
+    assert engine.ratings == {"Anna": ELO_START, "Ben": ELO_START}
+
+
+def test_elo_snapshot_follows_the_requested_version():
+    engine = EloRatings()
+    engine.rebuild(MATCHES.iloc[[0]], "v1")
+    assert engine.advance("v1", "v2", added=[MATCHES.iloc[1]])
+    full = EloRatings()
+    full.rebuild(MATCHES, "v2")
+
+    table, deltas = engine.snapshot(MATCHES, "v2")
+    pd.testing.assert_frame_equal(table, full.table())
+    pd.testing.assert_frame_equal(deltas, full.deltas_frame())
+
+    # A back-dated match can't be played on top; the engine stays at v2 until a snapshot rebuilds it
+    back_dated = MATCHES.iloc[0].copy()
+    back_dated["date"] = "2026-01-01 10:00"
+    assert not engine.advance("v2", "v3", added=[back_dated])
+    assert engine.version == "v2"
+    table, deltas = engine.snapshot(MATCHES.iloc[[0]], "v1")
+    assert engine.version == "v1"
+    assert table["Player"].tolist() == ["Anna", "Ben"] and len(deltas) == 2
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scores import add_score_columns, parse_set_column, regular_set_totals, tie_break_winner
+
+
+@pytest.mark.parametrize("score, expected", [
+    ("6-4", (6, 4, False, None, None)),
+    (" 4 - 6 ", (4, 6, False, None, None)),
+    ("7-6(5)", (7, 6, False, None, None)),
+    ("6-7(3)", (6, 7, False, None, None)),
+    ("Tie Break 10-7", (7, 6, True, 10, 7)),
+    ("Tie Break 8-10", (6, 7, True, 8, 10)),
+])
+def test_parse_set_column_reads_valid_sets(score, expected):
+    parsed = parse_set_column(pd.Series([score])).iloc[0]
+    values = tuple(None if pd.isna(parsed[field]) else parsed[field] for field in ["t1", "t2", "tb", "tb_t1", "tb_t2"])
+    assert values == expected
+
+
+@pytest.mark.parametrize("score", ["", None, np.nan, "abc", "6-", "6:4", "6-4-2", "7-6(", "Tie Break", "Tie Break x-y"])
+def test_parse_set_column_treats_empty_and_malformed_sets_as_missing(score):
+    parsed = parse_set_column(pd.Series([score], dtype=object)).iloc[0]
+    assert pd.isna(parsed["t1"]) and pd.isna(parsed["t2"])
+    assert pd.isna(parsed["tb_t1"]) and pd.isna(parsed["tb_t2"])
+
+
+def test_add_score_columns_totals_only_valid_sets():
+    matches = pd.DataFrame({
+        "set1": ["6-4", "7-6(5)", "", None],
+        "set2": ["3-6", "bad", "", "6-0"],
+        "set3": ["Tie Break 10-8", np.nan, "", ""],
+    })
+    scored = add_score_columns(matches)
+    assert scored["set_count"].tolist() == [3, 1, 0, 1]
+    assert scored["t1_games"].tolist() == [6 + 3 + 7, 7, 0, 6]
+    assert scored["t2_games"].tolist() == [4 + 6 + 6, 6, 0, 0]
+    assert scored["match_gd"].tolist() == [0, 1, 0, 6]
+    # Tie breaks are left out of the regular-set totals
+    gd_sum, set_count = regular_set_totals(scored)
+    assert gd_sum.tolist() == [-1, 1, 0, 6]
+    assert set_count.tolist() == [2, 1, 0, 1]
+    # Re-adding replaces the parsed columns rather than duplicating them
+    assert add_score_columns(scored).columns.tolist() == scored.columns.tolist()
+
+
+def test_set_winners():
+    scored = add_score_columns(pd.DataFrame({"set1": ["6-4", "Tie Break 7-10"], "set2": ["4-6", "6-3"], "set3": ["Tie Break 10-8", ""]}))
+    set_winners = [[1 if t1 > t2 else 2 for t1, t2 in zip(scored[f"{col}_t1"], scored[f"{col}_t2"]) if not pd.isna(t1)]
+                   for col in ["set1", "set2"]]
+    assert set_winners == [[1, 2], [2, 1]]
+    first, second = scored.iloc[0], scored.iloc[1]
+    assert tie_break_winner(first, "set3") == 1
+    assert tie_break_winner(second, "set1") == 2
+    assert tie_break_winner(first, "set1") is None  # Not a tie break
+    assert tie_break_winner(second, "set3") is None  # Empty
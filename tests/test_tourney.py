@@ -0,0 +1,88 @@
+import time
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from tourney import completed_results, result_grid, round_robin_schedule, unsaved_results
+
+
+def court_counts(schedule):
+    """Matches per team (rows) and court (columns), zero where a team never plays on a court."""
+    appearances = pd.concat([
+        schedule[["Team 1", "Court"]].set_axis(["Team", "Court"], axis=1),
+        schedule[["Team 2", "Court"]].set_axis(["Team", "Court"], axis=1),
+    ])
+    return appearances.groupby(["Team", "Court"]).size().unstack(fill_value=0)
+
+
+@pytest.mark.parametrize("team_count, court_count, max_spread", [
+    (8, 2, 1),
+    (8, 4, 2),
+    (16, 4, 1),
+    (6, 3, 1),
+    (10, 2, 1),
+    (9, 2, 2),
+    (11, 4, 2),
+    (20, 5, 2),
+])
+def test_round_robin_balances_courts_per_team(team_count, court_count, max_spread):
+    teams = [f"Team {i}" for i in range(team_count)]
+    courts = [f"Court {i}" for i in range(court_count)]
+    schedule, _ = round_robin_schedule(teams, courts)
+
+    counts = court_counts(schedule).reindex(index=teams, columns=courts, fill_value=0)
+    spread = counts.max(axis=1) - counts.min(axis=1)
+    assert spread.max() <= max_spread
+    # Every team has at least as many matches as there are courts, so it should see every court
+    assert (counts > 0).all().all()
+
+
+@pytest.mark.parametrize("team_count, court_count, budget_seconds", [(64, 16, 1), (128, 16, 2), (128, 4, 2)])
+def test_round_robin_schedules_large_draws_quickly(team_count, court_count, budget_seconds):
+    teams = [f"Team {i}" for i in range(team_count)]
+    courts = [f"Court {i}" for i in range(court_count)]
+    started = time.perf_counter()
+    schedule, _ = round_robin_schedule(teams, courts)
+    assert time.perf_counter() - started < budget_seconds
+    assert len(schedule) == team_count * (team_count - 1) // 2
+    counts = court_counts(schedule)
+    assert (counts.max(axis=1) - counts.min(axis=1)).max() <= 2
+
+
+@pytest.mark.parametrize("team_count, court_count", [(2, 1), (5, 2), (8, 3), (9, 4), (16, 4)])
+def test_round_robin_plays_every_pair_once_without_clashes(team_count, court_count):
+    teams = [f"Team {i}" for i in range(team_count)]
+    schedule, byes = round_robin_schedule(teams, [f"Court {i}" for i in range(court_count)])
+
+    pairs = [frozenset(pair) for pair in zip(schedule["Team 1"], schedule["Team 2"])]
+    assert len(pairs) == len(set(pairs)) == team_count * (team_count - 1) // 2
+    assert schedule.groupby(["Slot", "Court"]).size().max() == 1
+    for _, round_matches in schedule.groupby("Round"):
+        playing = list(round_matches["Team 1"]) + list(round_matches["Team 2"])
+        assert len(playing) == len(set(playing))
+    assert sorted(byes.values()) == (sorted(teams) if team_count % 2 else [])
+
+
+def test_unsaved_results_skips_matches_already_stored_that_day():
+    grid = result_grid([("Anna & Ben", "Carl & Dora"), ("Anna & Carl", "Ben & Dora")],
+                       [datetime(2026, 5, 1, 10), datetime(2026, 5, 1, 11)])
+    grid[["set1", "set2", "winner"]] = [["6-4", "6-3", "Team 1"], ["4-6", "6-4", "Team 2"]]
+    stored = grid.iloc[[0]].assign(date=datetime(2026, 5, 1, 18), team1_player1="Ben", team1_player2="Anna")
+
+    assert unsaved_results(grid, stored).index.tolist() == [1]
+    assert unsaved_results(grid, stored.assign(date=datetime(2026, 5, 2, 10))).index.tolist() == [0, 1]
+    assert unsaved_results(grid, stored.assign(set2="6-2")).index.tolist() == [0, 1]
+
+
+@pytest.mark.parametrize("date", [None, pd.NaT, "", "not a date"])
+def test_completed_results_requires_a_date(date):
+    grid = result_grid([("Anna & Ben", "Carl & Dora")], [datetime(2026, 5, 1, 10)])
+    added = grid.iloc[[0]].assign(date=date, team1_player1="Ben", team1_player2="Anna")
+    grid = pd.concat([grid, added], ignore_index=True)
+    grid[["set1", "set2", "winner"]] = [["6-4", "6-3", "Team 1"], ["4-6", "6-4", "Team 2"]]
+
+    results, errors = completed_results(grid, {"Anna", "Ben", "Carl", "Dora"})
+    assert errors == ["Row 2: date is required."]
+    assert results.index.tolist() == [0]
+    assert results["date"].tolist() == [pd.Timestamp(2026, 5, 1, 10)]
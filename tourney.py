@@ -0,0 +1,340 @@
+"""Schedules and brackets for the Mini Tourney tab."""
+import re
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+BYE = "BYE"
+SCHEDULE_COLUMNS = ["Round", "Slot", "Start", "Court", "Team 1", "Team 2"]
+RESULT_COLUMNS = ["date", "match_type", "team1_player1", "team1_player2", "team2_player1", "team2_player2", "set1", "set2", "set3", "winner"]
+WINNERS = ["Team 1", "Team 2", "Tie"]
+COURT_PASSES = 2  # Rounds of court-balancing swaps in a round robin
+
+
+def circle_pairings(team_count):
+    """Circle-method pairings as two (rounds x matches per round) arrays of team positions.
+
+    Position 0 stays put while the others rotate one place per round, so every team meets every
+    other team exactly once. With an odd team count a phantom position `team_count` is added and
+    whoever meets it has the bye. The fixed team switches sides every round.
+    """
+    size = team_count + team_count % 2
+    rounds = np.arange(size - 1)[:, None]
+    rotating = 1 + (np.arange(size - 1)[None, :] + rounds) % (size - 1)
+    circle = np.hstack([np.zeros((size - 1, 1), dtype=int), rotating])
+    team1 = circle[:, :size // 2].copy()
+    team2 = circle[:, ::-1][:, :size // 2].copy()
+    flip = rounds[:, 0] % 2 == 1
+    team1[flip, 0], team2[flip, 0] = team2[flip, 0], team1[flip, 0]
+    return team1, team2
+
+
+def place_on_courts(team1, team2, team_count, courts):
+    """Places each round's matches in the round's (slot, court) cells so every team plays about
+    equally often on every court, as a (rounds x matches per round) array of cell numbers
+    (slot = cell // courts, court = cell % courts).
+
+    Each round starts from the match order rotated back one cell per round; then, while it helps,
+    the two cells of the round (or a match and an idle cell) whose swap most lowers the sum of
+    squared per-team court counts trade places. All swaps of a round are scored at once, a round
+    makes at most one swap per cell and the rounds are revisited COURT_PASSES times in all, so the
+    work stays bounded however many teams play. The pairings themselves are not touched, only where
+    and when within its round each match is played.
+    """
+    round_count, per_round = team1.shape
+    cell_count = -(-per_round // courts) * courts
+    cell_court = np.arange(cell_count) % courts
+    played = np.zeros((team_count, courts), dtype=int)
+    occupant = np.full((round_count, cell_count), -1)
+
+    def improve(round_no):
+        occupied = occupant[round_no] >= 0
+        match = np.maximum(occupant[round_no], 0)
+        first, second = team1[round_no, match], team2[round_no, match]
+        for _ in range(cell_count):
+            # Half the change in squared counts if the match in cell a moved to court c
+            here = played[first, cell_court] + played[second, cell_court]
+            move = np.where(occupied[:, None], played[first] + played[second] - here[:, None] + 2, 0)
+            gain = move[:, cell_court] + move[:, cell_court].T
+            a, b = np.unravel_index(np.argmin(gain), gain.shape)
+            if gain[a, b] >= 0:
+                return
+            for cell, other in ((a, b), (b, a)):
+                if occupied[cell]:
+                    played[[first[cell], second[cell]], cell_court[cell]] -= 1
+                    played[[first[cell], second[cell]], cell_court[other]] += 1
+            for row in (occupant[round_no], occupied, first, second):
+                row[[a, b]] = row[[b, a]]
+
+    for round_no in range(round_count):
+        cells = (np.arange(per_round) - round_no) % cell_count
+        occupant[round_no, cells] = np.arange(per_round)
+        np.add.at(played, (team1[round_no], cell_court[cells]), 1)
+        np.add.at(played, (team2[round_no], cell_court[cells]), 1)
+        improve(round_no)
+    for _ in range(COURT_PASSES - 1):
+        for round_no in range(round_count):
+            improve(round_no)
+
+    cells = np.empty((round_count, per_round), dtype=int)
+    round_no, cell = np.nonzero(occupant >= 0)
+    cells[round_no, occupant[round_no, cell]] = cell
+    return cells
+
+
+def round_robin_schedule(teams, court_names, start=None, slot_minutes=60):
+    """Full round robin on the given courts, as (schedule, byes).
+
+    Each round's matches are spread over the courts in slots of up to len(court_names) matches,
+    placed by place_on_courts so that every team gets about as many matches on each court as on any
+    other. schedule has one row per match with SCHEDULE_COLUMNS, in slot and court order (Start is
+    empty without a start time), and byes maps round number to the team sitting out.
+    """
+    if len(teams) < 2 or not court_names:
+        return pd.DataFrame(columns=SCHEDULE_COLUMNS), {}
+    team1, team2 = circle_pairings(len(teams))
+    round_count = len(team1)
+    has_bye = len(teams) % 2 == 1
+    byes = {}
+    if has_bye:
+        bye_mask = (team1 == len(teams)) | (team2 == len(teams))
+        bye_teams = np.where(team1 == len(teams), team2, team1)[bye_mask]
+        byes = {round_no + 1: teams[pos] for round_no, pos in enumerate(bye_teams)}
+        team1 = team1[~bye_mask].reshape(round_count, -1)
+        team2 = team2[~bye_mask].reshape(round_count, -1)
+
+    per_round = team1.shape[1]
+    courts = len(court_names)
+    cells = place_on_courts(team1, team2, len(teams), courts)
+    slots_per_round = -(-per_round // courts)
+    round_no = np.repeat(np.arange(round_count), per_round)
+    slot = round_no * slots_per_round + cells.ravel() // courts
+
+    team_names = np.asarray(teams, dtype=object)
+    schedule = pd.DataFrame({
+        "Round": round_no + 1,
+        "Slot": slot + 1,
+        "Start": None,
+        "Court": np.asarray(court_names, dtype=object)[cells.ravel() % courts],
+        "Team 1": team_names[team1.ravel()],
+        "Team 2": team_names[team2.ravel()],
+    }, columns=SCHEDULE_COLUMNS)
+    schedule = schedule.iloc[np.lexsort((cells.ravel() % courts, slot))].reset_index(drop=True)
+    if start is not None:
+        schedule["Start"] = [start + timedelta(minutes=slot_minutes * (int(s) - 1)) for s in schedule["Slot"]]
+    return schedule, byes
+
+
+def schedule_by_court(schedule, court_names, byes=None):
+    """Groups a schedule into [(court name, [match lines])] for court cards and the PDF export."""
+    lines = {name: [] for name in court_names}
+    for round_no, start, court, team1, team2 in schedule[["Round", "Start", "Court", "Team 1", "Team 2"]].itertuples(index=False):
+        when = f" {start:%H:%M}" if isinstance(start, datetime) else ""
+        lines[court].append(f"R{round_no}{when}: {team1} vs {team2}")
+    courts = list(lines.items())
+    if byes:
+        courts.append((BYE, [f"R{round_no}: {team}" for round_no, team in byes.items()]))
+    return courts
+
+
+def team_players(team):
+    """Player names in a team name such as "Anna & Ben", "Anna/Ben" or "Anna"."""
+    return [name.strip() for name in re.split(r"[&/+,]", team) if name.strip()]
+
+
+def seed_teams(teams, ratings):
+    """Orders teams by strength, strongest first, for seeding.
+
+    A team's strength is the sum of the ratings (e.g. ranking Points) of the players named in it;
+    "Anna & Ben", "Anna/Ben" and "Anna" all work. Teams without a rated player keep their entry
+    order at the bottom.
+    """
+    def strength(team):
+        return sum(ratings.get(name, 0) for name in team_players(team))
+
+    return sorted(teams, key=strength, reverse=True)
+
+
+def bracket_order(size):
+    """Seed numbers in bracket position order for a power-of-two size, e.g. 8 -> 1 8 4 5 2 7 3 6,
+    so the top seeds can only meet in the last rounds."""
+    order = [1]
+    while len(order) < size:
+        order = [seed for s in order for seed in (s, 2 * len(order) + 1 - s)]
+    return order
+
+
+class Bracket:
+    """Single-elimination bracket kept as a binary tree in one list.
+
+    Match k is played between the occupants of slots 2k and 2k+1 and its winner goes into slot k;
+    the first-round slots hold the seeded teams (BYE where the draw is short) and slot 1 ends up
+    holding the champion. Top seeds get the byes and go through automatically. Recording or
+    correcting a result only touches the path from that match to the final.
+    """
+
+    def __init__(self, seeded_teams):
+        size = 2
+        while size < len(seeded_teams):
+            size *= 2
+        self.size = size
+        self.slots = [None] * (2 * size)
+        for position, seed in enumerate(bracket_order(size)):
+            self.slots[size + position] = seeded_teams[seed - 1] if seed <= len(seeded_teams) else BYE
+        for match in range(size // 2, size):
+            team1, team2 = self.teams(match)
+            if BYE in (team1, team2):
+                self.slots[match] = team2 if team1 == BYE else team1
+
+    def teams(self, match):
+        return self.slots[2 * match], self.slots[2 * match + 1]
+
+    def playable(self, match):
+        """True if both teams of the match are known and neither is a bye."""
+        return all(team is not None and team != BYE for team in self.teams(match))
+
+    def record(self, match, winner):
+        """Sets the winner of a match (None clears it). Later results that depended on the
+        previous winner are cleared, walking up towards the final only as far as needed."""
+        if winner is not None and (winner == BYE or winner not in self.teams(match)):
+            raise ValueError(f"{winner} is not playing match {match}")
+        self.slots[match] = winner
+        match //= 2
+        while match >= 1 and self.slots[match] is not None and self.slots[match] not in self.teams(match):
+            self.slots[match] = None
+            match //= 2
+
+    @property
+    def champion(self):
+        return self.slots[1]
+
+    def rounds(self):
+        """[(round name, [(match, team1, team2, winner)])] from the first round to the final."""
+        rounds = []
+        first = self.size // 2
+        while first >= 1:
+            name = {1: "Final", 2: "Semi-finals", 4: "Quarter-finals"}.get(first, f"Round of {2 * first}")
+            rounds.append((name, [(match, *self.teams(match), self.slots[match]) for match in range(first, 2 * first)]))
+            first //= 2
+        return rounds
+
+
+class GroupStage:
+    """Round-robin groups whose top finishers go through to a knockout Bracket.
+
+    Seeds are dealt into groups snake-fashion (1 2 3 4 4 3 2 1 ...) so the groups are even. Each
+    group plays a circle-method round robin; standings are kept as win counts that record()
+    updates one result at a time, ties in wins falling back to seeding.
+    """
+
+    def __init__(self, seeded_teams, group_count, advance=2):
+        self.advance = advance
+        self.groups = [[] for _ in range(group_count)]
+        for i, team in enumerate(seeded_teams):
+            lap, offset = divmod(i, group_count)
+            self.groups[offset if lap % 2 == 0 else group_count - 1 - offset].append(team)
+        self.matches = []
+        for group in self.groups:
+            team1, team2 = circle_pairings(len(group)) if len(group) > 1 else (np.empty((0, 0), dtype=int),) * 2
+            real = (team1 < len(group)) & (team2 < len(group))
+            self.matches.append([(group[a], group[b]) for a, b in zip(team1[real], team2[real])])
+        self.results = {}  # (group, match number) -> winner
+        self.wins = {team: 0 for team in seeded_teams}
+        self.seed = {team: i for i, team in enumerate(seeded_teams)}
+
+    def record(self, group, match, winner):
+        """Sets the winner of one group match (None clears it) and updates that group's standings."""
+        if winner is not None and winner not in self.matches[group][match]:
+            raise ValueError(f"{winner} is not playing group match {match}")
+        previous = self.results.pop((group, match), None)
+        if previous is not None:
+            self.wins[previous] -= 1
+        if winner is not None:
+            self.results[(group, match)] = winner
+            self.wins[winner] += 1
+
+    def standings(self, group):
+        return sorted(self.groups[group], key=lambda team: (-self.wins[team], self.seed[team]))
+
+    def complete(self):
+        return len(self.results) == sum(len(matches) for matches in self.matches)
+
+    def knockout(self):
+        """Bracket of the qualifiers: every group winner, then every runner-up, and so on."""
+        standings = [self.standings(group) for group in range(len(self.groups))]
+        qualifiers = [table[place] for place in range(self.advance) for table in standings if place < len(table)]
+        return Bracket(qualifiers)
+
+
+def result_grid(pairs, dates):
+    """Result-entry rows (RESULT_COLUMNS) for tournament matches, players filled in from the team names.
+
+    dates holds one datetime per pair, so matches keep their playing order once saved. A match is
+    doubles if either team names two players; scores and winner are left blank.
+    """
+    rows = []
+    for (team1, team2), date in zip(pairs, dates):
+        team1_players, team2_players = team_players(team1)[:2], team_players(team2)[:2]
+        doubles = len(team1_players) > 1 or len(team2_players) > 1
+        team1_players += [""] * (2 - len(team1_players))
+        team2_players += [""] * (2 - len(team2_players))
+        rows.append({
+            "date": date,
+            "match_type": "Doubles" if doubles else "Singles",
+            "team1_player1": team1_players[0], "team1_player2": team1_players[1] if doubles else "",
+            "team2_player1": team2_players[0], "team2_player2": team2_players[1] if doubles else "",
+            "set1": "", "set2": "", "set3": "", "winner": "",
+        })
+    return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+
+def completed_results(grid, known_players):
+    """Splits a result grid into the rows ready to save and an error message per started but invalid row.
+
+    Rows with neither a first set nor a winner are treated as not played yet and skipped quietly.
+    The rows ready to save have their dates parsed.
+    """
+    ready, errors = [], []
+    dates = pd.to_datetime(grid["date"], errors="coerce")
+    for number, (row, date) in enumerate(zip(grid.drop(columns="date").fillna("").itertuples(index=False), dates), start=1):
+        if not row.set1 and not row.winner:
+            continue
+        doubles = row.match_type == "Doubles"
+        players = [row.team1_player1, row.team2_player1] + ([row.team1_player2, row.team2_player2] if doubles else [])
+        if pd.isna(date):
+            errors.append(f"Row {number}: date is required.")
+        elif any(p not in known_players for p in players):
+            errors.append(f"Row {number}: every player must be a registered player.")
+        elif len(set(players)) != len(players):
+            errors.append(f"Row {number}: a player appears more than once.")
+        elif not row.set1 or (doubles and not row.set2):
+            errors.append(f"Row {number}: set 1{' and set 2 are' if doubles else ' is'} required.")
+        elif row.winner not in WINNERS:
+            errors.append(f"Row {number}: pick a winner.")
+        else:
+            ready.append(number - 1)
+    results = grid.iloc[ready].copy()
+    results["date"] = dates.iloc[ready]
+    results.loc[results["match_type"] != "Doubles", ["team1_player2", "team2_player2"]] = ""
+    return results, errors
+
+
+def result_keys(frame):
+    """(day, team 1 players, team 2 players, set1, set2, set3) of every row of a matches-shaped frame."""
+    days = pd.to_datetime(frame["date"], errors="coerce").dt.normalize()
+    filled = frame[RESULT_COLUMNS[2:9]].fillna("").astype(str)
+    return [(day, frozenset({p1, p2} - {""}), frozenset({p3, p4} - {""}), set1, set2, set3)
+            for day, (p1, p2, p3, p4, set1, set2, set3) in zip(days, filled.itertuples(index=False))]
+
+
+def unsaved_results(results, matches):
+    """The rows of results that matches does not already hold: the same teams with the same set
+    scores on the same day count as one match saved twice."""
+    if results.empty or matches.empty:
+        return results
+    same_days = matches[pd.to_datetime(matches["date"], errors="coerce").dt.normalize().isin(
+        pd.to_datetime(results["date"]).dt.normalize())]
+    stored = set(result_keys(same_days))
+    return results[[key not in stored for key in result_keys(results)]]
+
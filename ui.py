@@ -4,6 +4,12 @@ from datetime import datetime
 import re
 from collections import defaultdict
 from utils import get_player_trend, generate_whatsapp_link, tennis_scores
+from scores import SET_COLUMNS, ensure_score_columns
+from head_to_head import HeadToHead
+from match_index import MatchIndex
+from streaks import compute_streaks
+from rankings import player_match_frame
+from ratings import strength_ratings
 from data_manager import delete_match_from_db, upload_image_to_supabase, save_matches, load_matches
 
 def apply_custom_css():
@@ -240,97 +246,44 @@ def display_player_insights(selected_players, players_df, matches_df, rank_df, p
     st.markdown('</div></div>', unsafe_allow_html=True)
 
 def calculate_head_to_head(matches_df):
-    """Calculates head-to-head records between players."""
-    head_to_head = defaultdict(lambda: defaultdict(lambda: {'wins': 0, 'losses': 0, 'ties': 0, 'matches': 0}))
-    for _, row in matches_df.iterrows():
-        team1 = [p for p in [row['team1_player1'], row.get('team1_player2')] if p and p != "Visitor"]
-        team2 = [p for p in [row['team2_player1'], row.get('team2_player2')] if p and p != "Visitor"]
-        
-        for p1 in team1:
-            for p2 in team2:
-                head_to_head[p1][p2]['matches'] += 1
-                head_to_head[p2][p1]['matches'] += 1
-                if row['winner'] == "Team 1":
-                    head_to_head[p1][p2]['wins'] += 1
-                    head_to_head[p2][p1]['losses'] += 1
-                elif row['winner'] == "Team 2":
-                    head_to_head[p1][p2]['losses'] += 1
-                    head_to_head[p2][p1]['wins'] += 1
-                else:
-                    head_to_head[p1][p2]['ties'] += 1
-                    head_to_head[p2][p1]['ties'] += 1
-    return head_to_head
+    """Calculates head-to-head records between players as a HeadToHead matrix (O(1) pair lookups, per-player rival tables)."""
+    return HeadToHead(MatchIndex(matches_df))
 
 def calculate_set_win_percentage(matches_df):
     """Calculates the percentage of sets won by each player."""
     set_wins = defaultdict(int)
     total_sets = defaultdict(int)
+    matches_df = ensure_score_columns(matches_df)
     for _, row in matches_df.iterrows():
         team1 = [p for p in [row['team1_player1'], row.get('team1_player2')] if p and p != "Visitor"]
         team2 = [p for p in [row['team2_player1'], row.get('team2_player2')] if p and p != "Visitor"]
-        for set_score in [row['set1'], row['set2'], row['set3']]:
-            if isinstance(set_score, str) and '-' in set_score:
-                try:
-                    g1, g2 = map(int, set_score.split('-'))
-                    total_sets_played = 1
-                    for p in team1:
-                        total_sets[p] += total_sets_played
-                        if g1 > g2:
-                            set_wins[p] += 1
-                    for p in team2:
-                        total_sets[p] += total_sets_played
-                        if g2 > g1:
-                            set_wins[p] += 1
-                except ValueError:
-                    continue
+        for set_col in SET_COLUMNS:
+            g1, g2 = row[f'{set_col}_t1'], row[f'{set_col}_t2']
+            if pd.isna(g1) or row[f'{set_col}_tb']:  # Tie breaks are not counted here
+                continue
+            for p in team1:
+                total_sets[p] += 1
+                if g1 > g2:
+                    set_wins[p] += 1
+            for p in team2:
+                total_sets[p] += 1
+                if g2 > g1:
+                    set_wins[p] += 1
     set_win_pct = {p: (set_wins[p] / total_sets[p] * 100) if total_sets[p] > 0 else 0 for p in set_wins}
     return set_win_pct
 
 def calculate_win_streak(matches_df):
-    """Calculates the longest current win streak for each player."""
-    win_streaks = defaultdict(int)
-    current_streak = defaultdict(int)
-    matches_df = matches_df.sort_values(by='date', ascending=False)
-    for _, row in matches_df.iterrows():
-        team1 = [p for p in [row['team1_player1'], row.get('team1_player2')] if p and p != "Visitor"]
-        team2 = [p for p in [row['team2_player1'], row.get('team2_player2')] if p and p != "Visitor"]
-        for p in team1 + team2:
-            if p not in current_streak:  # Only count streaks that haven't been broken
-                if row['winner'] == "Team 1" and p in team1:
-                    current_streak[p] += 1
-                elif row['winner'] == "Team 2" and p in team2:
-                    current_streak[p] += 1
-                elif row['winner'] == "Tie":
-                    continue
-                else:
-                    current_streak[p] = 0
-                win_streaks[p] = max(win_streaks[p], current_streak[p])
-    return win_streaks
+    """Calculates the current, longest win and longest losing streak for each player (ties are skipped)."""
+    return compute_streaks(matches_df)
 
 def calculate_opponent_adjusted_points(matches_df, rank_df):
-    """Calculates points adjusted for opponent strength."""
-    adjusted_points = defaultdict(float)
-    rank_dict = rank_df.set_index('Player')['Points'].to_dict()
-    for _, row in matches_df.iterrows():
-        team1 = [p for p in [row['team1_player1'], row.get('team1_player2')] if p and p != "Visitor"]
-        team2 = [p for p in [row['team2_player1'], row.get('team2_player2')] if p and p != "Visitor"]
-        team1_points = sum(rank_dict.get(p, 0) for p in team1) / len(team1) if team1 else 0
-        team2_points = sum(rank_dict.get(p, 0) for p in team2) / len(team2) if team2 else 0
-        for p in team1:
-            if row['winner'] == "Team 1":
-                adjusted_points[p] += 3 * (team2_points / 10)  # Scale by opponent strength
-            elif row['winner'] == "Team 2":
-                adjusted_points[p] += 1 * (team2_points / 10)
-            else:
-                adjusted_points[p] += 1.5 * (team2_points / 10)
-        for p in team2:
-            if row['winner'] == "Team 2":
-                adjusted_points[p] += 3 * (team1_points / 10)
-            elif row['winner'] == "Team 1":
-                adjusted_points[p] += 1 * (team1_points / 10)
-            else:
-                adjusted_points[p] += 1.5 * (team1_points / 10)
-    return adjusted_points
+    """Calculates each player's opponent-adjusted strength (games per set above an average player).
+
+    Uses the Strength column of rank_df when it is there, otherwise rates the matches directly.
+    """
+    if 'Strength' in rank_df.columns:
+        return rank_df.set_index('Player')['Strength'].to_dict()
+    return strength_ratings(player_match_frame(matches_df)) if not matches_df.empty else {}
 
 def display_nerd_stuff(rank_df, partner_stats, matches):
     """Displays various interesting statistics and insights."""
@@ -370,20 +323,10 @@ def display_nerd_stuff(rank_df, partner_stats, matches):
     st.markdown("---")
     st.markdown("### 🤼 Head-to-Head Records")
     head_to_head = calculate_head_to_head(matches)
-    h2h_data = []
-    for p1 in head_to_head:
-        for p2, stats in head_to_head[p1].items():
-            if stats['matches'] > 0 and p1 < p2:  # Avoid duplicates
-                h2h_data.append({
-                    "Players": f"{p1} vs {p2}",
-                    "Matches": stats['matches'],
-                    "Wins1": stats['wins'],
-                    "Wins2": head_to_head[p2][p1]['wins'],
-                    "Ties": stats['ties']
-                })
+    h2h_data = head_to_head.top_rivalries(5)
     if h2h_data:
         st.markdown('<div class="rankings-table-container"><div class="rankings-table-scroll">', unsafe_allow_html=True)
-        for record in sorted(h2h_data, key=lambda x: x['Matches'], reverse=True)[:5]:  # Top 5 rivalries
+        for record in h2h_data:  # Top 5 rivalries
             st.markdown(f"""
             <div class="ranking-row">
                 <div class="player-col">{record['Players']}</div>
@@ -395,6 +338,13 @@ def display_nerd_stuff(rank_df, partner_stats, matches):
         st.markdown('</div></div>', unsafe_allow_html=True)
     else:
         st.info("No head-to-head data available.")
+    rival_player = st.selectbox("Rivals of", [""] + head_to_head.faced_players(), key="h2h_rivals_player")
+    if rival_player:
+        rivals = head_to_head.rivals(rival_player)
+        if rivals.empty:
+            st.info(f"No opponents recorded for {rival_player}.")
+        else:
+            st.dataframe(rivals, hide_index=True, use_container_width=True)
 
     st.markdown("---")
     st.markdown("### 🎾 Set Win Percentage")
@@ -418,41 +368,42 @@ def display_nerd_stuff(rank_df, partner_stats, matches):
 
     st.markdown("---")
     st.markdown("### 🔥 Longest Win Streak")
-    win_streaks = calculate_win_streak(matches)
-    if win_streaks:
-        streak_data = [
-            {"Player": p, "Win Streak": streak} for p, streak in win_streaks.items() if streak > 0
-        ]
-        streak_df = pd.DataFrame(streak_data).sort_values(by="Win Streak", ascending=False)
+    streak_df = calculate_win_streak(matches)
+    if not streak_df.empty:
+        streak_df = streak_df[streak_df["Longest Win Streak"] > 0].sort_values(by="Longest Win Streak", ascending=False, kind="stable")
         if not streak_df.empty:
             st.markdown('<div class="rankings-table-container"><div class="rankings-table-scroll">', unsafe_allow_html=True)
             for _, row in streak_df.head(5).iterrows():  # Top 5
+                current = row['Current Streak']
+                current_label = f"W{current}" if current > 0 else f"L{-current}" if current < 0 else "-"
                 st.markdown(f"""
                 <div class="ranking-row">
                     <div class="player-col">{row['Player']}</div>
-                    <div class="wins-col">{row['Win Streak']} matches</div>
+                    <div class="wins-col">{row['Longest Win Streak']} matches</div>
+                    <div style="color:#fff500;"><span style='font-weight:bold; color:#bbbbbb;'>Longest Losing Streak: </span>{row['Longest Losing Streak']} matches</div>
+                    <div style="color:#fff500;"><span style='font-weight:bold; color:#bbbbbb;'>Current Streak: </span>{current_label}</div>
                 </div>
                 """, unsafe_allow_html=True)
             st.markdown('</div></div>', unsafe_allow_html=True)
         else:
-            st.info("No current win streaks.")
+            st.info("No win streaks yet.")
     else:
         st.info("No win streak data available.")
 
     st.markdown("---")
-    st.markdown("### 🏅 Opponent-Adjusted Points")
+    st.markdown("### 🏅 Opponent-Adjusted Strength")
     adjusted_points = calculate_opponent_adjusted_points(matches, rank_df)
     if adjusted_points:
         adj_points_data = [
-            {"Player": p, "Adjusted Points": points} for p, points in adjusted_points.items()
+            {"Player": p, "Strength": points} for p, points in adjusted_points.items()
         ]
-        adj_points_df = pd.DataFrame(adj_points_data).sort_values(by="Adjusted Points", ascending=False)
+        adj_points_df = pd.DataFrame(adj_points_data).sort_values(by="Strength", ascending=False)
         st.markdown('<div class="rankings-table-container"><div class="rankings-table-scroll">', unsafe_allow_html=True)
         for _, row in adj_points_df.head(5).iterrows():  # Top 5
             st.markdown(f"""
             <div class="ranking-row">
                 <div class="player-col">{row['Player']}</div>
-                <div class="points-col">{row['Adjusted Points']:.1f}</div>
+                <div style="color:#fff500;"><span style='font-weight:bold; color:#bbbbbb;'>Strength: </span>{row['Strength']:+.2f} games/set</div>
             </div>
             """, unsafe_allow_html=True)
         st.markdown('</div></div>', unsafe_allow_html=True)
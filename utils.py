@@ -3,42 +3,15 @@ from datetime import datetime
 from collections import defaultdict
 import urllib.parse
 import streamlit as st
+from ids import IdAllocator
 
 def tennis_scores():
     """Returns a list of valid tennis set scores."""
     return ["6-0", "6-1", "6-2", "6-3", "6-4", "7-5", "7-6", "0-6", "1-6", "2-6", "3-6", "4-6", "5-7", "6-7"]
 
-def get_quarter(month: int) -> str:
-    """Determines the financial quarter from a given month."""
-    if 1 <= month <= 3: return "Q1"
-    if 4 <= month <= 6: return "Q2"
-    if 7 <= month <= 9: return "Q3"
-    return "Q4"
-
 def generate_match_id(matches_df: pd.DataFrame, match_datetime: datetime) -> str:
     """Generates a unique match ID based on the quarter and year."""
-    year = match_datetime.year
-    quarter = get_quarter(match_datetime.month)
-    
-    if not matches_df.empty and 'date' in matches_df.columns:
-        matches_df['date'] = pd.to_datetime(matches_df['date'], errors='coerce')
-        # Filter matches for the same year and quarter
-        filtered_matches = matches_df[
-            (matches_df['date'].dt.year == year) &
-            (matches_df['date'].apply(lambda d: get_quarter(d.month) == quarter if pd.notna(d) else False))
-        ]
-        serial_number = len(filtered_matches) + 1
-    else:
-        serial_number = 1
-        
-    new_id = f"AR{quarter}{year}-{serial_number:02d}"
-    
-    # Ensure the ID is unique by incrementing the serial number if a collision occurs
-    while not matches_df.empty and 'match_id' in matches_df.columns and new_id in matches_df['match_id'].values:
-        serial_number += 1
-        new_id = f"AR{quarter}{year}-{serial_number:02d}"
-        
-    return new_id
+    return IdAllocator(matches_df, "match_id", "AR").allocate(match_datetime)[0]
 
 def get_player_trend(player: str, matches: pd.DataFrame, max_matches=5) -> str:
     """Calculates the recent match trend (W/L) for a player."""